@@ -1,10 +1,29 @@
 import databento as db
 import pandas as pd
 from datetime import datetime, timezone
-import numpy as np
 
-# Client with your key
-client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
+from pipeline import (
+    CachedHistorical, build_bars, build_bars_streaming, compute_indicators, enable_profiling,
+    normalize_trades, stage, write_output,
+)
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Set to a number of trades (e.g. 1_000_000) to aggregate the pull that many
+# trades at a time instead of loading it whole - memory stays bounded for
+# long ranges (see pipeline/streaming.py)
+BATCH_SIZE = None
+
+# Set to True to print per-stage wall time, rows/s and memory at the end
+# and save them as JSON (see pipeline/profiling.py)
+PROFILE = False
+if PROFILE:
+    profiler = enable_profiling()
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
 
 # Step 1: Download raw trades
 data = client.timeseries.get_range(
@@ -16,124 +35,29 @@ data = client.timeseries.get_range(
     stype_in='raw_symbol'
 )
 
-# Convert to DataFrame
-df_trades = data.to_df()
-print(f"Downloaded {len(df_trades)} trades")
-
-# Ensure ts_event is datetime with proper timezone handling
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
-
-# Step 2: Calculate delta
-def calculate_delta(row):
-    if row['side'] == 'B':  # bid-hit = buy pressure
-        return int(row['size'])
-    elif row['side'] == 'A':  # ask-hit = sell pressure
-        return -int(row['size'])
-    else:  # 'N' or any other value
-        return 0
-
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1).astype(int)
-
-# Calculate running CVD at trade level
-df_trades['running_cvd'] = df_trades['delta'].cumsum()
-
-# Step 3: Create minute buckets
-df_trades['minute_bucket'] = df_trades['ts_event'].dt.floor('1min')
-
-# Get proper CVD OHLC values for each bar
-def get_cvd_ohlc(group):
-    """Get true OHLC values for CVD within a bar"""
-    if len(group) == 0:
-        return pd.Series({
-            'cvd_open': 0, 'cvd_high': 0, 'cvd_low': 0, 'cvd_close': 0
-        })
-    
-    cvd_values = group['running_cvd'].values
-    
-    return pd.Series({
-        'cvd_open': cvd_values[0],    # First CVD value
-        'cvd_high': cvd_values.max(),  # Highest CVD value
-        'cvd_low': cvd_values.min(),   # Lowest CVD value
-        'cvd_close': cvd_values[-1]    # Last CVD value
-    })
-
-# Calculate CVD OHLC for each bar
-cvd_ohlc = df_trades.groupby('minute_bucket').apply(get_cvd_ohlc)
-
-# Aggregate to 1-min bars for price
-temp_bars = df_trades.groupby('minute_bucket').agg({
-    'price': ['first', 'max', 'min', 'last'],
-    'size': 'sum',
-    'delta': 'sum'
-}).dropna()
-
-# Flatten column names
-temp_bars.columns = ['open', 'high', 'low', 'close', 'volume', 'delta']
-
-# Join the CVD OHLC
-bars = temp_bars.join(cvd_ohlc)
-
-# Convert types
-bars[['delta', 'volume']] = bars[['delta', 'volume']].astype(int)
-
-# Step 4: Calculate ADX (Average Directional Index)
-def calculate_adx(df, period=14):
-    """
-    Calculate ADX indicator
-    Returns: +DI, -DI, and ADX values
-    """
-    # Calculate True Range (TR)
-    df['h_l'] = df['high'] - df['low']
-    df['h_pc'] = abs(df['high'] - df['close'].shift(1))
-    df['l_pc'] = abs(df['low'] - df['close'].shift(1))
-    df['tr'] = df[['h_l', 'h_pc', 'l_pc']].max(axis=1)
-    
-    # Calculate Directional Movement
-    df['high_diff'] = df['high'] - df['high'].shift(1)
-    df['low_diff'] = df['low'].shift(1) - df['low']
-    
-    # +DM and -DM
-    df['+dm'] = np.where((df['high_diff'] > df['low_diff']) & (df['high_diff'] > 0), df['high_diff'], 0)
-    df['-dm'] = np.where((df['low_diff'] > df['high_diff']) & (df['low_diff'] > 0), df['low_diff'], 0)
-    
-    # Smooth TR, +DM, -DM using Wilder's smoothing (EMA with alpha = 1/period)
-    df['atr'] = df['tr'].ewm(alpha=1/period, adjust=False).mean()
-    df['+dm_smooth'] = df['+dm'].ewm(alpha=1/period, adjust=False).mean()
-    df['-dm_smooth'] = df['-dm'].ewm(alpha=1/period, adjust=False).mean()
-    
-    # Calculate +DI and -DI
-    df['+di'] = 100 * df['+dm_smooth'] / df['atr']
-    df['-di'] = 100 * df['-dm_smooth'] / df['atr']
-    
-    # Calculate DX
-    df['di_diff'] = abs(df['+di'] - df['-di'])
-    df['di_sum'] = df['+di'] + df['-di']
-    df['dx'] = 100 * df['di_diff'] / df['di_sum']
-    
-    # Calculate ADX (smoothed DX)
-    df['adx'] = df['dx'].ewm(alpha=1/period, adjust=False).mean()
-    
-    # Clean up temporary columns
-    temp_cols = ['h_l', 'h_pc', 'l_pc', 'tr', 'high_diff', 'low_diff', 
-                 '+dm', '-dm', 'atr', '+dm_smooth', '-dm_smooth', 
-                 'di_diff', 'di_sum', 'dx']
-    df.drop(columns=temp_cols, inplace=True)
-    
-    return df
-
-# Calculate ADX
-bars = calculate_adx(bars.copy())
-
-# Step 5: Calculate EMAs for traditional bars
-ema_periods = [8, 9, 13, 21, 22, 50, 100, 200]
-
-# Calculate EMAs for close price
-for period in ema_periods:
-    bars[f'ema_{period}'] = bars['close'].ewm(span=period, adjust=False).mean()
-
-# Calculate EMAs for CVD close
-for period in ema_periods:
-    bars[f'cvd_ema_{period}'] = bars['cvd_close'].ewm(span=period, adjust=False).mean()
+if BATCH_SIZE is None:
+    # Convert to DataFrame
+    with stage('to_df') as record:
+        df_trades = data.to_df()
+        record.rows_out = len(df_trades)
+    print(f"Downloaded {len(df_trades)} trades")
+
+    # Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+    # (B = bid-hit = buy pressure, A = ask-hit = sell pressure, N = 0)
+    normalize_trades(df_trades)
+
+    # Step 3: Aggregate to 1-min bars - price OHLCV, delta and true CVD OHLC
+    # (first/max/min/last of the running CVD within each bar) in one pass
+    bars = build_bars(df_trades, freq='1min')
+else:
+    # Steps 2-3 batch by batch: the cached pull is read from disk BATCH_SIZE
+    # trades at a time, CVD and open bars carry across batches
+    bars = build_bars_streaming(data, '1min', BATCH_SIZE)
+    print(f"Streamed {int(bars['volume'].sum()):,} contracts in batches of {BATCH_SIZE:,}")
+
+# Step 4: Calculate ADX (+DI, -DI, ADX with Wilder smoothing) and the EMAs of
+# close and CVD close for every period in EMA_PERIODS in one indicator pass
+bars = bars.join(compute_indicators(bars))
 
 # Create output DataFrame with logical column ordering
 output_df = pd.DataFrame({
@@ -175,7 +99,7 @@ output_df = pd.DataFrame({
 })
 
 # Save traditional bars output
-output_df.to_csv('mesu5_traditional_1min_with_emas_adx.csv', index=False)
+write_output(output_df, 'mesu5_traditional_1min_with_emas_adx', OUTPUT_FORMATS)
 
 # Print summary statistics
 print(f"\nTraditional Bars Summary:")
@@ -214,4 +138,9 @@ print(f"Trend Direction: {trend_direction}")
 print(f"\nPrice - Current: {last_bar['close']:.2f}")
 print(f"  EMA 8: {last_bar['ema_8']:.2f} (Diff: {last_bar['close'] - last_bar['ema_8']:.2f})")
 print(f"  EMA 21: {last_bar['ema_21']:.2f} (Diff: {last_bar['close'] - last_bar['ema_21']:.2f})")
-print(f"  EMA 50: {last_bar['ema_50']:.2f} (Diff: {last_bar['close'] - last_bar['ema_50']:.2f})")
\ No newline at end of file
+print(f"  EMA 50: {last_bar['ema_50']:.2f} (Diff: {last_bar['close'] - last_bar['ema_50']:.2f})")
+
+if PROFILE:
+    print("\nPipeline profile:")
+    print(profiler.table())
+    profiler.to_json('mesu5_traditional_1min_profile.json')
@@ -1,10 +1,24 @@
 import databento as db
 import pandas as pd
 from datetime import datetime, timezone
-import numpy as np
 
-# Client with your key
-client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
+from pipeline import (
+    HA_ADX_COLUMNS, HA_EMA_SOURCES, CachedHistorical, build_bars, compute_indicators,
+    enable_profiling, heikin_ashi, normalize_trades, stage, write_output,
+)
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Set to True to print per-stage wall time, rows/s and memory at the end
+# and save them as JSON (see pipeline/profiling.py)
+PROFILE = False
+if PROFILE:
+    profiler = enable_profiling()
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
 
 # Step 1: Download raw trades
 data = client.timeseries.get_range(
@@ -17,166 +31,28 @@ data = client.timeseries.get_range(
 )
 
 # Convert to DataFrame
-df_trades = data.to_df()
+with stage('to_df') as record:
+    df_trades = data.to_df()
+    record.rows_out = len(df_trades)
 print(f"Downloaded {len(df_trades)} trades")
 
-# Ensure ts_event is datetime with proper timezone handling
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
-
-# Step 2: Calculate delta
-def calculate_delta(row):
-    if row['side'] == 'B':  # bid-hit = buy pressure
-        return int(row['size'])
-    elif row['side'] == 'A':  # ask-hit = sell pressure
-        return -int(row['size'])
-    else:  # 'N' or any other value
-        return 0
-
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1).astype(int)
-
-# Calculate running CVD at trade level
-df_trades['running_cvd'] = df_trades['delta'].cumsum()
-
-# Step 3: Create minute buckets
-df_trades['minute_bucket'] = df_trades['ts_event'].dt.floor('1min')
-
-# Get proper CVD OHLC values for each bar
-def get_cvd_ohlc(group):
-    """Get true OHLC values for CVD within a bar"""
-    if len(group) == 0:
-        return pd.Series({
-            'cvd_open': 0, 'cvd_high': 0, 'cvd_low': 0, 'cvd_close': 0
-        })
-    
-    cvd_values = group['running_cvd'].values
-    
-    return pd.Series({
-        'cvd_open': cvd_values[0],    # First CVD value
-        'cvd_high': cvd_values.max(),  # Highest CVD value
-        'cvd_low': cvd_values.min(),   # Lowest CVD value
-        'cvd_close': cvd_values[-1]    # Last CVD value
-    })
-
-# Calculate CVD OHLC for each bar
-cvd_ohlc = df_trades.groupby('minute_bucket').apply(get_cvd_ohlc)
-
-# Aggregate to 1-min bars for price
-temp_bars = df_trades.groupby('minute_bucket').agg({
-    'price': ['first', 'max', 'min', 'last'],
-    'size': 'sum',
-    'delta': 'sum'
-}).dropna()
+# Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+# (B = bid-hit = buy pressure, A = ask-hit = sell pressure, N = 0)
+normalize_trades(df_trades)
 
-# Flatten column names
-temp_bars.columns = ['open', 'high', 'low', 'close', 'volume', 'delta']
+# Step 3: Aggregate to 1-min bars - price OHLCV, delta and true CVD OHLC
+# (first/max/min/last of the running CVD within each bar) in one pass
+bars = build_bars(df_trades, freq='1min')
 
-# Join the CVD OHLC
-bars = temp_bars.join(cvd_ohlc)
+# Step 4: Compute Heikin Ashi candles for price (ha_*) and CVD (ha_cvd_*)
+# in one pass - see pipeline/heikin_ashi.py for the formula, then combine
+# with volume and delta
+ha_bars = pd.concat([heikin_ashi(bars), bars[['volume', 'delta']]], axis=1)
 
-# Convert types
-bars[['delta', 'volume']] = bars[['delta', 'volume']].astype(int)
-
-# Step 4: Compute Heikin Ashi candles
-def compute_heikin_ashi(df, open_col='open', high_col='high', low_col='low', close_col='close'):
-    """
-    Compute Heikin Ashi values following the standard formula:
-    HA-Close = (Open + High + Low + Close) / 4
-    HA-Open = (Previous HA-Open + Previous HA-Close) / 2
-    HA-High = Max(High, HA-Open, HA-Close)
-    HA-Low = Min(Low, HA-Open, HA-Close)
-    """
-    ha = pd.DataFrame(index=df.index)
-    
-    # HA Close = (Open + High + Low + Close) / 4
-    ha['close'] = (df[open_col] + df[high_col] + df[low_col] + df[close_col]) / 4
-    
-    # Initialize HA Open for first bar
-    ha['open'] = 0.0
-    ha.iloc[0, ha.columns.get_loc('open')] = (df[open_col].iloc[0] + df[close_col].iloc[0]) / 2
-    
-    # HA Open = (Previous HA Open + Previous HA Close) / 2
-    for i in range(1, len(df)):
-        ha.iloc[i, ha.columns.get_loc('open')] = (
-            ha.iloc[i-1]['open'] + ha.iloc[i-1]['close']
-        ) / 2
-    
-    # HA High = Max(High, HA Open, HA Close)
-    ha['high'] = df[[high_col]].join(ha[['open', 'close']]).max(axis=1)
-    
-    # HA Low = Min(Low, HA Open, HA Close)
-    ha['low'] = df[[low_col]].join(ha[['open', 'close']]).min(axis=1)
-    
-    return ha
-
-# Compute Heikin Ashi for price
-ha_price = compute_heikin_ashi(bars)
-ha_price.columns = ['ha_open', 'ha_high', 'ha_low', 'ha_close']
-
-# Compute Heikin Ashi for CVD
-ha_cvd = compute_heikin_ashi(bars, 'cvd_open', 'cvd_high', 'cvd_low', 'cvd_close')
-ha_cvd.columns = ['ha_cvd_open', 'ha_cvd_high', 'ha_cvd_low', 'ha_cvd_close']
-
-# Combine HA data with volume and delta
-ha_bars = pd.concat([ha_price, ha_cvd, bars[['volume', 'delta']]], axis=1)
-
-# Step 5: Calculate ADX for Heikin Ashi bars
-def calculate_adx_ha(df, period=14):
-    """
-    Calculate ADX indicator for Heikin Ashi bars
-    Returns: +DI, -DI, and ADX values
-    """
-    # Calculate True Range (TR) using HA values
-    df['h_l'] = df['ha_high'] - df['ha_low']
-    df['h_pc'] = abs(df['ha_high'] - df['ha_close'].shift(1))
-    df['l_pc'] = abs(df['ha_low'] - df['ha_close'].shift(1))
-    df['tr'] = df[['h_l', 'h_pc', 'l_pc']].max(axis=1)
-    
-    # Calculate Directional Movement using HA values
-    df['high_diff'] = df['ha_high'] - df['ha_high'].shift(1)
-    df['low_diff'] = df['ha_low'].shift(1) - df['ha_low']
-    
-    # +DM and -DM
-    df['+dm'] = np.where((df['high_diff'] > df['low_diff']) & (df['high_diff'] > 0), df['high_diff'], 0)
-    df['-dm'] = np.where((df['low_diff'] > df['high_diff']) & (df['low_diff'] > 0), df['low_diff'], 0)
-    
-    # Smooth TR, +DM, -DM using Wilder's smoothing (EMA with alpha = 1/period)
-    df['atr'] = df['tr'].ewm(alpha=1/period, adjust=False).mean()
-    df['+dm_smooth'] = df['+dm'].ewm(alpha=1/period, adjust=False).mean()
-    df['-dm_smooth'] = df['-dm'].ewm(alpha=1/period, adjust=False).mean()
-    
-    # Calculate +DI and -DI
-    df['ha_+di'] = 100 * df['+dm_smooth'] / df['atr']
-    df['ha_-di'] = 100 * df['-dm_smooth'] / df['atr']
-    
-    # Calculate DX
-    df['di_diff'] = abs(df['ha_+di'] - df['ha_-di'])
-    df['di_sum'] = df['ha_+di'] + df['ha_-di']
-    df['dx'] = 100 * df['di_diff'] / df['di_sum']
-    
-    # Calculate ADX (smoothed DX)
-    df['ha_adx'] = df['dx'].ewm(alpha=1/period, adjust=False).mean()
-    
-    # Clean up temporary columns
-    temp_cols = ['h_l', 'h_pc', 'l_pc', 'tr', 'high_diff', 'low_diff', 
-                 '+dm', '-dm', 'atr', '+dm_smooth', '-dm_smooth', 
-                 'di_diff', 'di_sum', 'dx']
-    df.drop(columns=temp_cols, inplace=True)
-    
-    return df
-
-# Calculate ADX for HA bars
-ha_bars = calculate_adx_ha(ha_bars.copy())
-
-# Step 6: Calculate EMAs for Heikin Ashi bars
-ema_periods = [8, 9, 13, 21, 22, 50, 100, 200]
-
-# Calculate EMAs for HA close price
-for period in ema_periods:
-    ha_bars[f'ha_ema_{period}'] = ha_bars['ha_close'].ewm(span=period, adjust=False).mean()
-
-# Calculate EMAs for HA CVD close
-for period in ema_periods:
-    ha_bars[f'ha_cvd_ema_{period}'] = ha_bars['ha_cvd_close'].ewm(span=period, adjust=False).mean()
+# Step 5: Calculate ADX and EMAs for Heikin Ashi bars in one indicator pass
+ha_bars = ha_bars.join(compute_indicators(
+    ha_bars, HA_EMA_SOURCES, adx_columns=HA_ADX_COLUMNS, adx_prefix='ha_'
+))
 
 # Create output DataFrame with logical column ordering
 output_df = pd.DataFrame({
@@ -218,7 +94,7 @@ output_df = pd.DataFrame({
 })
 
 # Save Heikin Ashi bars output
-output_df.to_csv('mesu5_heikin_ashi_1min_with_emas_adx.csv', index=False)
+write_output(output_df, 'mesu5_heikin_ashi_1min_with_emas_adx', OUTPUT_FORMATS)
 
 # Print summary statistics
 print(f"\nHeikin Ashi Bars Summary:")
@@ -273,4 +149,9 @@ def analyze_trend(row):
         return 'Neutral/Consolidating'
 
 last_trend = analyze_trend(last_bar)
-print(f"\nCurrent HA Trend Analysis: {last_trend}")
\ No newline at end of file
+print(f"\nCurrent HA Trend Analysis: {last_trend}")
+
+if PROFILE:
+    print("\nPipeline profile:")
+    print(profiler.table())
+    profiler.to_json('mesu5_heikin_ashi_1min_profile.json')
@@ -0,0 +1,47 @@
+import databento as db
+
+from pipeline import (
+    CachedHistorical, activity_bars, heikin_ashi_bars, normalize_trades, traditional_bars,
+    write_output,
+)
+
+# Bar type and size: 'tick' (trades), 'volume' (contracts), 'range' (points)
+# or 'dollar' (notional) - 700-tick bars match PastVersions/algo700tick.ts
+BAR_KIND = 'tick'
+THRESHOLD = 700
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
+
+# Step 1: Download raw trades
+data = client.timeseries.get_range(
+    dataset='GLBX.MDP3',
+    symbols=['MESU5'],
+    schema='trades',
+    start='2025-07-14T13:30:00Z',  # 9:30 AM EDT
+    end='2025-07-14T17:00:00Z',    # 1:00 PM EDT
+    stype_in='raw_symbol'
+)
+
+df_trades = data.to_df()
+print(f"Downloaded {len(df_trades)} trades")
+
+# Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+normalize_trades(df_trades)
+
+# Step 3: Segment the trade stream into activity bars (timestamp = first trade)
+bars = activity_bars(df_trades, BAR_KIND, THRESHOLD)
+
+# Step 4: Same indicator columns as the 1-min outputs
+label = f'{THRESHOLD:g}{BAR_KIND}'
+write_output(traditional_bars(bars), f'mesu5_traditional_{label}_with_emas_adx', OUTPUT_FORMATS)
+write_output(heikin_ashi_bars(bars), f'mesu5_heikin_ashi_{label}_with_emas_adx', OUTPUT_FORMATS)
+
+print(f"\n{label} bars: {len(bars)}")
+print(f"Time range: {bars.index[0]} to {bars.index[-1]}")
+print(f"Final CVD: {bars['cvd_close'].iloc[-1]}")
+print(f"Total Volume: {bars['volume'].sum():,}")
@@ -2,6 +2,10 @@ import databento as db
 import pandas as pd
 from datetime import datetime, timezone
 import pytz
+import os
+
+from pipeline import TradeIndex, normalize_trades
+from pipeline.parity import compare_bars
 
 # Client with your key
 client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
@@ -24,22 +28,9 @@ print(f"Downloaded {len(df_trades)} trades")
 neutral_count = (df_trades['side'] == 'N').sum()
 print(f"Neutral trades found: {neutral_count}")
 
-# Ensure ts_event is datetime with proper timezone handling
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
-
-# Step 2: Calculate delta EXACTLY like TypeScript
-def calculate_delta(row):
-    if row['side'] == 'B':  # bid-hit = buy pressure
-        return int(row['size'])  # Ensure integer
-    elif row['side'] == 'A':  # ask-hit = sell pressure
-        return -int(row['size'])  # Ensure integer
-    else:  # 'N' or any other value
-        return 0
-
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1).astype(int)
-
-# Calculate running CVD at trade level
-df_trades['running_cvd'] = df_trades['delta'].cumsum()
+# Step 2: Normalize trades EXACTLY like TypeScript - UTC timestamps,
+# int64 size (no uint64 overflow), delta and running CVD
+normalize_trades(df_trades)
 
 # Step 3: Create minute buckets EXACTLY like TypeScript
 # TypeScript: dt.setSeconds(0, 0) - sets seconds and milliseconds to 0
@@ -85,7 +76,9 @@ bars.to_csv('aggregated-1MIN-FIXED-CVD.csv')
 
 print(f"\nFinal CVD: {bars['cvd'].iloc[-1]}")
 
-# Additional debugging for specific problem bars
+# Additional debugging for specific problem bars - the trade index keeps each
+# bar's [start, end) trade offsets (see pipeline/drilldown.py)
+trade_index = TradeIndex(df_trades)
 problem_bars = [10, 35, 40, 55]  # Bars where differences were noted
 print("\n--- Detailed info for problem bars ---")
 for bar_idx in problem_bars:
@@ -93,18 +86,18 @@ for bar_idx in problem_bars:
         bar = bars.iloc[bar_idx - 1]
         print(f"\nBar {bar_idx}: Delta={bar['delta']}, CVD={bar['cvd']}")
         
-        # Show all trades in this minute
+        # Show all trades in this minute (offset lookup, no scan)
         minute_start = bars.index[bar_idx - 1]
-        minute_end = minute_start + pd.Timedelta(minutes=1)
-        minute_trades = df_trades[
-            (df_trades['minute_bucket'] == minute_start)
-        ]
-        
+        minute_trades = trade_index.trades(minute_start)
+
         if len(minute_trades) > 0:
+            volume = trade_index.side_volume(minute_start)
             print(f"  {len(minute_trades)} trades in this minute:")
-            print(f"  Total buy volume: {int(minute_trades[minute_trades['side'] == 'B']['size'].sum())}")
-            print(f"  Total sell volume: {int(minute_trades[minute_trades['side'] == 'A']['size'].sum())}")
-            print(f"  Total neutral volume: {int(minute_trades[minute_trades['side'] == 'N']['size'].sum())}")
+            print(f"  Total buy volume: {volume['buy_volume']}")
+            print(f"  Total sell volume: {volume['sell_volume']}")
+            print(f"  Total neutral volume: {volume['neutral_volume']}")
+            cvd_path = trade_index.cvd_path(minute_start)
+            print(f"  Intra-bar CVD: {cvd_path[0]} -> {cvd_path[-1]}")
 
 # Create a comparison DataFrame
 print("\n--- Creating comparison file ---")
@@ -120,6 +113,12 @@ comparison_df = pd.DataFrame({
 })
 comparison_df.to_csv('cvd_comparison_python.csv', index=False)
 
+# Compare against the TypeScript streamBars bars (timestamp, open, ..., cvd)
+# if they have been saved next to this script
+TS_BARS = 'cvd_comparison_ts.csv'
+if os.path.exists(TS_BARS):
+    print(compare_bars(comparison_df, TS_BARS).summary())
+
 # Also create a detailed trade-level CSV for the first few minutes for debugging
 debug_trades = df_trades.head(1000).copy()
 debug_trades['et_time'] = debug_trades['ts_event'].dt.tz_convert('America/New_York')
@@ -0,0 +1,42 @@
+import time
+
+import databento as db
+
+from pipeline import CachedHistorical, TradeArchive, archive_frame, compact_bars
+
+# Raw trades are archived here, one memory-mapped file per symbol per UTC day
+# (see pipeline/archive.py)
+ARCHIVE_DIR = 'trade_archive'
+SYMBOL = 'MESU5'
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
+archive = TradeArchive(ARCHIVE_DIR)
+
+# Step 1: Download the day's raw trades and archive them (a pull replaces
+# the archived trades of its window and merges with the rest)
+START = '2025-07-14T00:00:00Z'
+END = '2025-07-15T00:00:00Z'
+data = client.timeseries.get_range(
+    dataset='GLBX.MDP3',
+    symbols=[SYMBOL],
+    schema='trades',
+    start=START,
+    end=END,
+    stype_in='raw_symbol'
+)
+written = archive.write(SYMBOL, data, START, END)
+day = archive.open_day(SYMBOL, '2025-07-14')
+print(f"Archived {len(day):,} trades ({len(written)} files written)")
+
+# Step 2: Any window straight from the archive - no parsing, no download
+t0 = time.perf_counter()
+trades = archive.slice(SYMBOL, '2025-07-14T13:40:00Z', '2025-07-14T13:41:00Z')
+elapsed = time.perf_counter() - t0
+print(f"13:40-13:41: {len(trades)} trades in {elapsed * 1e6:.0f} us")
+
+# Step 3: 1-min bar for the window from the archived trades
+bars = compact_bars(archive_frame(trades), '1min')
+print("\nAggregated bar:")
+print(bars)
@@ -0,0 +1,58 @@
+"""
+Per-trade latency of the live bar engine.
+
+Run from the MarketDownload directory:
+
+    python -m benchmarks.bench_live --trades 1000000
+
+Reports mean and tail latency of ``LiveBarEngine.on_trade`` (including the
+calls that close a bar and update every indicator) and throughput of the
+micro-batch path.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from pipeline import LiveBarEngine, synthetic_trades
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trades', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_trades(args.trades, seed=args.seed)
+    ts = df['ts_event'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    price, size, side = df['price'].to_numpy(), df['size'].to_numpy(), df['side'].to_numpy()
+    trades = list(zip(ts.tolist(), price.tolist(), size.tolist(), side.tolist()))
+
+    engine = LiveBarEngine()
+    latencies = np.empty(len(trades))
+    clock = time.perf_counter_ns
+    bars = 0
+    for i, trade in enumerate(trades):
+        start = clock()
+        closed = engine.on_trade(*trade)
+        latencies[i] = clock() - start
+        bars += len(closed)
+    bars += len(engine.flush())
+
+    print(f"on_trade over {len(trades):,} trades ({bars:,} bars):")
+    print(f"  mean {latencies.mean() / 1e3:.2f}us  p50 {np.percentile(latencies, 50) / 1e3:.2f}us  "
+          f"p99 {np.percentile(latencies, 99) / 1e3:.2f}us  max {latencies.max() / 1e3:.1f}us")
+
+    engine = LiveBarEngine()
+    start = time.perf_counter()
+    for i in range(0, len(ts), args.batch):
+        engine.on_trades(ts[i:i + args.batch], price[i:i + args.batch],
+                         size[i:i + args.batch], side[i:i + args.batch])
+    engine.flush()
+    elapsed = time.perf_counter() - start
+    print(f"on_trades in batches of {args.batch}: {len(ts) / elapsed:,.0f} trades/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Throughput benchmark for trade normalization.
+
+Run from the MarketDownload directory:
+
+    python -m benchmarks.bench_normalize --trades 10000000
+
+The legacy ``df.apply(calculate_delta, axis=1)`` path is timed on a
+subsample (it takes minutes at full size) and reported per trade.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from pipeline import normalize_trades, synthetic_trades
+
+
+def calculate_delta(row):
+    if row['side'] == 'B':
+        return int(row['size'])
+    elif row['side'] == 'A':
+        return -int(row['size'])
+    else:
+        return 0
+
+
+def time_it(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trades', type=int, default=10_000_000)
+    parser.add_argument('--legacy-sample', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_trades(args.trades, seed=args.seed)
+    print(f"Generated {len(df):,} synthetic trades")
+
+    elapsed, df = time_it(lambda: normalize_trades(df))
+    print(f"normalize_trades: {elapsed:.3f}s ({len(df) / elapsed:,.0f} trades/s)")
+
+    categorical = df[['ts_event', 'price', 'size', 'side']].copy()
+    categorical['side'] = categorical['side'].astype('category')
+    elapsed_cat, categorical = time_it(lambda: normalize_trades(categorical))
+    print(f"normalize_trades (categorical side): {elapsed_cat:.3f}s "
+          f"({len(categorical) / elapsed_cat:,.0f} trades/s)")
+
+    sample = df.head(args.legacy_sample)[['side', 'size']]
+    elapsed_legacy, legacy = time_it(
+        lambda: sample.apply(calculate_delta, axis=1).astype(int)
+    )
+    assert np.array_equal(legacy.to_numpy(), df['delta'].to_numpy()[:len(sample)])
+    legacy_rate = len(sample) / elapsed_legacy
+    print(f"legacy apply ({len(sample):,} sample): {elapsed_legacy:.3f}s "
+          f"({legacy_rate:,.0f} trades/s, ~{len(df) / legacy_rate:.0f}s at full size)")
+    print(f"Speedup: {(len(df) / elapsed) / legacy_rate:,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Stage-by-stage benchmark of the bar pipeline on synthetic trades.
+
+Run from the MarketDownload directory:
+
+    python -m benchmarks.bench_pipeline --trades 100000 1000000 10000000
+
+Each size gets a fresh deterministic trade set (same seed, same trades) and
+the stages are timed separately: delta (normalize_trades), bar build, CVD
+OHLC, Heikin Ashi, ADX, EMA bank and CSV write. The best of ``--repeat``
+runs is kept. Results go to ``{out}.json`` and ``{out}.csv`` (one row per
+size and stage) so runs can be diffed or charted.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import (
+    EMA_PERIODS, EMA_SOURCES, build_bars, ema_bank, heikin_ashi, normalize_trades,
+    synthetic_trades, traditional_bars, wilder_adx_into, write_csv,
+)
+from pipeline.bars import ohlc_segments, segment_starts, timestamps_ns
+
+STAGES = ['delta', 'bar_build', 'cvd_ohlc', 'heikin_ashi', 'adx', 'ema_bank', 'csv_write']
+
+
+def best_of(fn, repeat):
+    """Fastest of ``repeat`` calls and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_stages(df, freq, repeat, tmp_dir):
+    """Time every stage on one trade set; returns {stage: (seconds, rows_in, rows_out)}"""
+    n = len(df)
+    timings = {}
+
+    # normalize_trades works in place, so time it on fresh copies
+    raw = df[['ts_event', 'price', 'size', 'side']]
+    elapsed, trades = best_of(lambda: normalize_trades(raw.copy()), repeat)
+    copy_time, _ = best_of(lambda: raw.copy(), repeat)
+    timings['delta'] = (max(elapsed - copy_time, 0.0), n, n)
+
+    elapsed, bars = best_of(lambda: build_bars(trades, freq), repeat)
+    timings['bar_build'] = (elapsed, n, len(bars))
+
+    # The CVD OHLC share of the bar build, on the same segments
+    keys = timestamps_ns(trades['ts_event']) // pd.Timedelta(freq).value
+    starts = segment_starts(keys)
+    running_cvd = trades['running_cvd'].to_numpy()
+    elapsed, _ = best_of(lambda: ohlc_segments(starts, running_cvd), repeat)
+    timings['cvd_ohlc'] = (elapsed, n, len(starts))
+
+    m = len(bars)
+    elapsed, _ = best_of(lambda: heikin_ashi(bars), repeat)
+    timings['heikin_ashi'] = (elapsed, m, m)
+
+    high, low, close = (bars[c].to_numpy(dtype=np.float64) for c in ('high', 'low', 'close'))
+    adx_out = np.empty((m, 3))
+    elapsed, _ = best_of(lambda: wilder_adx_into(adx_out, high, low, close), repeat)
+    timings['adx'] = (elapsed, m, m)
+
+    sources = np.column_stack([bars[c].to_numpy(dtype=np.float64) for c in EMA_SOURCES])
+    elapsed, _ = best_of(lambda: ema_bank(sources, EMA_PERIODS), repeat)
+    timings['ema_bank'] = (elapsed, m, m)
+
+    output = traditional_bars(bars)
+    path = os.path.join(tmp_dir, 'bench.csv')
+    elapsed, _ = best_of(lambda: write_csv(output, path), repeat)
+    timings['csv_write'] = (elapsed, m, m)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trades', type=float, nargs='+', default=[1e5, 1e6, 1e7],
+                        help='trade counts to run (1e5 to 1e8)')
+    parser.add_argument('--freq', default='1min')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_pipeline',
+                        help='results path stem; writes .json and .csv')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in (int(t) for t in args.trades):
+            df = synthetic_trades(n, seed=args.seed)
+            timings = run_stages(df, args.freq, args.repeat, tmp_dir)
+            del df
+
+            print(f"\n{n:,} trades ({args.freq} bars, best of {args.repeat})")
+            for stage in STAGES:
+                seconds, rows_in, rows_out = timings[stage]
+                rate = rows_in / seconds if seconds > 0 else float('inf')
+                print(f"  {stage:<12} {seconds * 1e3:10.2f} ms  {rows_in:>12,} -> {rows_out:<10,} "
+                      f"{rate:>16,.0f} rows/s")
+                rows.append({
+                    'trades': n, 'stage': stage, 'seconds': seconds,
+                    'rows_in': rows_in, 'rows_out': rows_out, 'rows_per_s': rate,
+                })
+
+    results = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'freq': args.freq,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': rows,
+    }
+    with open(f'{args.out}.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    pd.DataFrame(rows).to_csv(f'{args.out}.csv', index=False)
+    print(f"\nWrote {args.out}.json and {args.out}.csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,10 @@ import databento as db
 import pandas as pd
 from datetime import datetime, timezone
 import pytz
+import os
+
+from pipeline import TradeIndex, normalize_trades
+from pipeline.parity import compare_bars
 
 # Connect to Databento
 client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
@@ -24,23 +28,9 @@ print(f"Downloaded {len(df_trades)} trades")
 neutral_count = (df_trades['side'] == 'N').sum()
 print(f"Neutral trades found: {neutral_count}")
 
-# Ensure proper datetime parsing
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
-
-# Step 2: Calculate delta EXACTLY like TS (fix applied!)
-def calculate_delta(row):
-    if row['side'] == 'B':
-        return int(row['size'])  # Buy = +size
-    elif row['side'] == 'A':
-        return -int(row['size'])  # Sell = -size
-    else:
-        return 0  # Neutral or unknown
-
-# ✅ FIX: Ensure Python int to avoid uint64 overflow
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1).astype(int)
-
-# Step 3: Calculate per-trade running CVD
-df_trades['running_cvd'] = df_trades['delta'].cumsum()
+# Step 2-3: Delta EXACTLY like TS and per-trade running CVD
+# ✅ FIX: size is widened to int64 first to avoid uint64 overflow
+normalize_trades(df_trades)
 
 # Step 4: Assign each trade to a minute bucket like TS
 df_trades['minute_bucket'] = df_trades['ts_event'].dt.floor('1min')
@@ -81,7 +71,9 @@ print(f"Bar {idx+1:2d} ({et_time}): Delta={int(row['delta']):+6d}, CVD={int(row[
 bars.to_csv('aggregated-1MIN-FIXED-CVD.csv')
 print(f"\nFinal CVD: {bars['cvd'].iloc[-1]}")
 
-# Step 6: Debug known problem bars
+# Step 6: Debug known problem bars - each bar's trades are looked up by
+# offset instead of scanning df_trades (see pipeline/drilldown.py)
+trade_index = TradeIndex(df_trades)
 problem_bars = [10, 35, 40, 55]
 print("\n--- Detailed info for problem bars ---")
 for bar_idx in problem_bars:
@@ -89,12 +81,15 @@ for bar_idx in problem_bars:
         bar = bars.iloc[bar_idx - 1]
         print(f"\nBar {bar_idx}: Delta={bar['delta']}, CVD={bar['cvd']}")
         minute_start = bars.index[bar_idx - 1]
-        minute_trades = df_trades[df_trades['minute_bucket'] == minute_start]
+        minute_trades = trade_index.trades(minute_start)
         if len(minute_trades) > 0:
+            volume = trade_index.side_volume(minute_start)
             print(f"  Trades: {len(minute_trades)}")
-            print(f"  Buy vol: {int(minute_trades[minute_trades['side'] == 'B']['size'].sum())}")
-            print(f"  Sell vol: {int(minute_trades[minute_trades['side'] == 'A']['size'].sum())}")
-            print(f"  Neutral vol: {int(minute_trades[minute_trades['side'] == 'N']['size'].sum())}")
+            print(f"  Buy vol: {volume['buy_volume']}")
+            print(f"  Sell vol: {volume['sell_volume']}")
+            print(f"  Neutral vol: {volume['neutral_volume']}")
+            cvd_path = trade_index.cvd_path(minute_start)
+            print(f"  Intra-bar CVD: {cvd_path[0]} -> {cvd_path[-1]}")
 
 # Step 7: Save comparison CSV
 print("\n--- Creating comparison file ---")
@@ -110,6 +105,12 @@ comparison_df = pd.DataFrame({
 })
 comparison_df.to_csv('cvd_comparison_python.csv', index=False)
 
+# Compare against the TypeScript streamBars bars (timestamp, open, ..., cvd)
+# if they have been saved next to this script
+TS_BARS = 'cvd_comparison_ts.csv'
+if os.path.exists(TS_BARS):
+    print(compare_bars(comparison_df, TS_BARS).summary())
+
 # Optional: Save debug trade file for early bars
 debug_trades = df_trades.head(1000).copy()
 debug_trades['et_time'] = debug_trades['ts_event'].dt.tz_convert('America/New_York')
@@ -1,6 +1,8 @@
 import databento as db
 import pandas as pd
 
+from pipeline import normalize_trades
+
 # Client with your key
 client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
 
@@ -26,21 +28,9 @@ print(df_trades.columns.tolist())
 print("\nUnique sides:")
 print(df_trades['side'].value_counts())
 
-# Ensure ts_event is datetime
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'])
-
-# Step 2: Calculate delta with clear logic
-def calculate_delta(row):
-    if row['side'] == 'B':  # Buy aggressor (hit ask)
-        return row['size']
-    elif row['side'] == 'A':  # Sell aggressor (hit bid)
-        return -row['size']
-    else:
-        print(f"Unknown side: {row['side']}")
-        return 0
-
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1)
-df_trades['cvd'] = df_trades['delta'].cumsum()
+# Step 2: Calculate delta and CVD (B = buy aggressor, A = sell aggressor)
+normalize_trades(df_trades, cvd_col='cvd')
+print(f"Unknown side trades: {(~df_trades['side'].isin(['B', 'A'])).sum()}")
 
 # Debug: Check delta calculations
 print("\nDelta summary:")
@@ -1,18 +1,22 @@
 import databento as db
 import pandas as pd
-import numpy as np  # For NaN handling if needed
+
+from pipeline import LiveBarEngine, plan_warmup
 
 # Client with your key
 client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
 
-# Parameters
-warmup_minutes = 60  # Adjust as needed (e.g., 21 min minimum)
-alpha_21 = 2 / (21 + 1)  # Smoothing factor for 21 EMA
-alpha_50 = 2 / (50 + 1)  # Smoothing factor for 50 EMA (new)
+# Parameters: the 21/50 EMAs written below must have forgotten their seed
+# to within this tolerance by the open (see pipeline/warmup.py)
+WARMUP_TOLERANCE = 1e-4
 
-# Step 1: Download raw trades with warmup
+# Step 1: Download raw trades with warmup - just enough CME trading time
+# before the open for the EMAs to converge (skips the daily halt/weekends)
 open_time = pd.Timestamp('2025-07-14T13:30:00Z')  # 9:30 AM UTC
-start_time = open_time - pd.Timedelta(minutes=warmup_minutes)
+warmup = plan_warmup(open_time, ['1min'], spans=[21, 50], period=None,
+                     tolerance=WARMUP_TOLERANCE)
+start_time = warmup.fetch_start
+print(warmup)
 data = client.timeseries.get_range(
     dataset='GLBX.MDP3',
     symbols=['MESU5'],
@@ -27,73 +31,36 @@ df_trades = data.to_df()
 print(f"Downloaded {len(df_trades)} trades")
 
 # Ensure ts_event is datetime and sort
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'])
+df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
 df_trades.sort_values('ts_event', inplace=True)
 
-# Step 2: Calculate per-trade delta (same as before)
-def calculate_delta(row):
-    if row['side'] == 'B':
-        return row['size']
-    elif row['side'] == 'A':
-        return -row['size']
-    else:
-        print(f"Unknown side: {row['side']}")
-        return 0
+print(f"Unknown side trades: {(~df_trades['side'].isin(['B', 'A'])).sum()}")
 
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1)
+# Step 2-3: Simulate live aggregation and updates (incremental)
+# Trades are fed one by one to the live engine, which keeps running CVD and
+# EMA state and emits each 1-min bar when it closes (empty minutes are skipped)
+engine = LiveBarEngine(freq='1min', heikin_ashi=False)
+ts_ns = df_trades['ts_event'].to_numpy(dtype='datetime64[ns]').view('int64')
 
-# Step 3: Simulate live aggregation and updates (incremental)
-# Group by 1-min intervals
-groups = df_trades.groupby(pd.Grouper(key='ts_event', freq='1min'))
+def to_row(bar):
+    return {
+        'timestamp': bar['timestamp'],
+        'open': bar['open'],
+        'high': bar['high'],
+        'low': bar['low'],
+        'close': bar['close'],
+        'volume': bar['volume'],
+        'delta': bar['delta'],
+        'cvd': bar['cvd_close'],
+        'ema_21': bar['ema_21'],
+        'ema_50': bar['ema_50']  # New column
+    }
 
-# Initialize lists for bars and running totals
 bar_data = []
-running_cvd = 0
-prev_ema_21 = None  # For 21 EMA
-prev_ema_50 = None  # For 50 EMA (new)
-
-for timestamp, group in groups:
-    if group.empty:
-        continue  # Skip empty minutes (or forward-fill if desired in live)
-    
-    # Aggregate bar
-    open_price = group['price'].iloc[0]
-    high = group['price'].max()
-    low = group['price'].min()
-    close = group['price'].iloc[-1]
-    volume = group['size'].sum()
-    bar_delta = group['delta'].sum()
-    
-    # Update running CVD
-    running_cvd += bar_delta
-    
-    # Update 21 EMA incrementally
-    if prev_ema_21 is None:
-        ema_21 = close
-    else:
-        ema_21 = (alpha_21 * close) + ((1 - alpha_21) * prev_ema_21)
-    prev_ema_21 = ema_21
-    
-    # Update 50 EMA incrementally (new)
-    if prev_ema_50 is None:
-        ema_50 = close
-    else:
-        ema_50 = (alpha_50 * close) + ((1 - alpha_50) * prev_ema_50)
-    prev_ema_50 = ema_50
-    
-    # Append bar
-    bar_data.append({
-        'timestamp': timestamp,
-        'open': open_price,
-        'high': high,
-        'low': low,
-        'close': close,
-        'volume': volume,
-        'delta': bar_delta,
-        'cvd': running_cvd,
-        'ema_21': ema_21,
-        'ema_50': ema_50  # New column
-    })
+for ts, price, size, side in zip(ts_ns.tolist(), df_trades['price'].tolist(),
+                                 df_trades['size'].tolist(), df_trades['side'].tolist()):
+    bar_data.extend(to_row(bar) for bar in engine.on_trade(ts, price, size, side))
+bar_data.extend(to_row(bar) for bar in engine.flush())
 
 # Convert to DataFrame
 bars = pd.DataFrame(bar_data).set_index('timestamp')
@@ -0,0 +1,45 @@
+import databento as db
+
+from pipeline import CachedHistorical, TradeIndex, footprint, normalize_trades, write_output
+
+# MES tick size and value-area share for the POC / VAH / VAL summary
+TICK_SIZE = 0.25
+VALUE_AREA = 0.70
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
+
+# Step 1: Download raw trades
+data = client.timeseries.get_range(
+    dataset='GLBX.MDP3',
+    symbols=['MESU5'],
+    schema='trades',
+    start='2025-07-14T13:30:00Z',  # 9:30 AM EDT
+    end='2025-07-14T17:00:00Z',    # 1:00 PM EDT
+    stype_in='raw_symbol'
+)
+
+df_trades = data.to_df()
+print(f"Downloaded {len(df_trades)} trades")
+
+# Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+normalize_trades(df_trades)
+
+# Step 3: 1-min bars with each bar's trade offsets, then volume at price
+index = TradeIndex(df_trades, '1min')
+fp = footprint(index, TICK_SIZE, VALUE_AREA)
+
+# Step 4: One row per (bar, price) with buy/sell/neutral volume, plus the
+# per-bar POC and value area next to the usual bar columns
+write_output(fp.levels, 'mesu5_footprint_1min', OUTPUT_FORMATS)
+summary = index.bars.join(fp.summary).rename_axis('timestamp').reset_index()
+write_output(summary, 'mesu5_footprint_summary_1min', OUTPUT_FORMATS)
+
+print(f"\n1-min bars: {len(index)}, price levels: {len(fp.levels):,}")
+print(f"Levels per bar: {fp.summary['levels'].mean():.1f} avg, {fp.summary['levels'].max()} max")
+print(f"Last bar POC {fp.summary['poc'].iloc[-1]}, "
+      f"value area {fp.summary['val'].iloc[-1]} - {fp.summary['vah'].iloc[-1]}")
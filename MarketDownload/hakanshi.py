@@ -2,8 +2,23 @@ import databento as db
 import pandas as pd
 from datetime import datetime, timezone
 
-# Client with your key
-client = db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s')
+from pipeline import (
+    CachedHistorical, build_bars, enable_profiling, heikin_ashi, normalize_trades, stage,
+    write_output,
+)
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Set to True to print per-stage wall time, rows/s and memory at the end
+# and save them as JSON (see pipeline/profiling.py)
+PROFILE = False
+if PROFILE:
+    profiler = enable_profiling()
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
 
 # Step 1: Download raw trades
 data = client.timeseries.get_range(
@@ -16,107 +31,22 @@ data = client.timeseries.get_range(
 )
 
 # Convert to DataFrame
-df_trades = data.to_df()
+with stage('to_df') as record:
+    df_trades = data.to_df()
+    record.rows_out = len(df_trades)
 print(f"Downloaded {len(df_trades)} trades")
 
-# Ensure ts_event is datetime with proper timezone handling
-df_trades['ts_event'] = pd.to_datetime(df_trades['ts_event'], utc=True)
-
-# Step 2: Calculate delta
-def calculate_delta(row):
-    if row['side'] == 'B':  # bid-hit = buy pressure
-        return int(row['size'])
-    elif row['side'] == 'A':  # ask-hit = sell pressure
-        return -int(row['size'])
-    else:  # 'N' or any other value
-        return 0
-
-df_trades['delta'] = df_trades.apply(calculate_delta, axis=1).astype(int)
-
-# Calculate running CVD at trade level
-df_trades['running_cvd'] = df_trades['delta'].cumsum()
-
-# Step 3: Create minute buckets
-df_trades['minute_bucket'] = df_trades['ts_event'].dt.floor('1min')
-
-# Get proper CVD OHLC values for each bar
-def get_cvd_ohlc(group):
-    """Get true OHLC values for CVD within a bar"""
-    if len(group) == 0:
-        return pd.Series({
-            'cvd_open': 0, 'cvd_high': 0, 'cvd_low': 0, 'cvd_close': 0
-        })
-    
-    cvd_values = group['running_cvd'].values
-    
-    return pd.Series({
-        'cvd_open': cvd_values[0],    # First CVD value
-        'cvd_high': cvd_values.max(),  # Highest CVD value
-        'cvd_low': cvd_values.min(),   # Lowest CVD value
-        'cvd_close': cvd_values[-1]    # Last CVD value
-    })
+# Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+# (B = bid-hit = buy pressure, A = ask-hit = sell pressure, N = 0)
+normalize_trades(df_trades)
 
-# Calculate CVD OHLC for each bar
-cvd_ohlc = df_trades.groupby('minute_bucket').apply(get_cvd_ohlc)
+# Step 3: Aggregate to 1-min bars - price OHLCV, delta and true CVD OHLC
+# (first/max/min/last of the running CVD within each bar) in one pass
+bars = build_bars(df_trades, freq='1min')
 
-# Aggregate to 1-min bars for price
-temp_bars = df_trades.groupby('minute_bucket').agg({
-    'price': ['first', 'max', 'min', 'last'],
-    'size': 'sum',
-    'delta': 'sum'
-}).dropna()
-
-# Flatten column names
-temp_bars.columns = ['open', 'high', 'low', 'close', 'volume', 'delta']
-
-# Join the CVD OHLC
-bars = temp_bars.join(cvd_ohlc)
-
-# Convert types
-bars[['delta', 'volume']] = bars[['delta', 'volume']].astype(int)
-
-# Step 4: Compute Heikin Ashi candles for price and CVD
-def compute_heikin_ashi(df, open_col='open', high_col='high', low_col='low', close_col='close'):
-    """
-    Compute Heikin Ashi values following the standard formula:
-    HA-Close = (Open + High + Low + Close) / 4
-    HA-Open = (Previous HA-Open + Previous HA-Close) / 2
-    HA-High = Max(High, HA-Open, HA-Close)
-    HA-Low = Min(Low, HA-Open, HA-Close)
-    """
-    ha = pd.DataFrame(index=df.index)
-    
-    # HA Close = (Open + High + Low + Close) / 4
-    ha['close'] = (df[open_col] + df[high_col] + df[low_col] + df[close_col]) / 4
-    
-    # Initialize HA Open for first bar
-    ha['open'] = 0.0
-    ha.iloc[0, ha.columns.get_loc('open')] = (df[open_col].iloc[0] + df[close_col].iloc[0]) / 2
-    
-    # HA Open = (Previous HA Open + Previous HA Close) / 2
-    for i in range(1, len(df)):
-        ha.iloc[i, ha.columns.get_loc('open')] = (
-            ha.iloc[i-1]['open'] + ha.iloc[i-1]['close']
-        ) / 2
-    
-    # HA High = Max(High, HA Open, HA Close)
-    ha['high'] = df[[high_col]].join(ha[['open', 'close']]).max(axis=1)
-    
-    # HA Low = Min(Low, HA Open, HA Close)
-    ha['low'] = df[[low_col]].join(ha[['open', 'close']]).min(axis=1)
-    
-    return ha
-
-# Compute Heikin Ashi for price
-ha_price = compute_heikin_ashi(bars)
-ha_price.columns = ['ha_open', 'ha_high', 'ha_low', 'ha_close']
-
-# Compute Heikin Ashi for CVD
-ha_cvd = compute_heikin_ashi(bars, 'cvd_open', 'cvd_high', 'cvd_low', 'cvd_close')
-ha_cvd.columns = ['ha_cvd_open', 'ha_cvd_high', 'ha_cvd_low', 'ha_cvd_close']
-
-# Combine all data
-final_bars = pd.concat([bars, ha_price, ha_cvd], axis=1)
+# Step 4: Compute Heikin Ashi candles for price (ha_*) and CVD (ha_cvd_*)
+# in one pass - see pipeline/heikin_ashi.py for the formula
+final_bars = pd.concat([bars, heikin_ashi(bars)], axis=1)
 
 # Create clean output DataFrame with logical column ordering
 output_df = pd.DataFrame({
@@ -146,7 +76,7 @@ output_df = pd.DataFrame({
 })
 
 # Save clean output
-output_df.to_csv('mesu5_1min_bars_with_ha.csv', index=False)
+write_output(output_df, 'mesu5_1min_bars_with_ha', OUTPUT_FORMATS)
 
 # Print summary statistics
 print(f"\nData Summary:")
@@ -164,4 +94,9 @@ print(output_df.head())
 print("\nData Validation:")
 print(f"CVD continuity check: {output_df['cvd_close'].iloc[-1] == output_df['delta'].sum()}")
 print(f"HA Price smoothing: Avg |HA Close - Close| = {abs(output_df['ha_close'] - output_df['close']).mean():.2f}")
-print(f"HA CVD smoothing: Avg |HA CVD Close - CVD Close| = {abs(output_df['ha_cvd_close'] - output_df['cvd_close']).mean():.2f}")
\ No newline at end of file
+print(f"HA CVD smoothing: Avg |HA CVD Close - CVD Close| = {abs(output_df['ha_cvd_close'] - output_df['cvd_close']).mean():.2f}")
+
+if PROFILE:
+    print("\nPipeline profile:")
+    print(profiler.table())
+    profiler.to_json('mesu5_1min_bars_with_ha_profile.json')
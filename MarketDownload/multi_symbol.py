@@ -0,0 +1,47 @@
+import databento as db
+
+from pipeline import (
+    CachedHistorical, build_instrument_bars, heikin_ashi_bars, partition_dir, traditional_bars,
+    write_output,
+)
+
+# Contracts to pull together; one request covers all of them
+SYMBOLS = ['MESU5', 'ESU5', 'MNQU5', 'NQU5']
+
+# Per-symbol files go under {OUTPUT_DIR}/symbol={SYMBOL}/
+OUTPUT_DIR = 'by_symbol'
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
+
+# Step 1: Download raw trades for every symbol in one request
+data = client.timeseries.get_range(
+    dataset='GLBX.MDP3',
+    symbols=SYMBOLS,
+    schema='trades',
+    start='2025-07-14T13:30:00Z',  # 9:30 AM EDT
+    end='2025-07-14T17:00:00Z',    # 1:00 PM EDT
+    stype_in='raw_symbol'
+)
+
+df_trades = data.to_df()
+print(f"Downloaded {len(df_trades)} trades for {len(SYMBOLS)} symbols")
+
+# Step 2: Group by instrument once and build every symbol's bars (own CVD each)
+by_symbol = build_instrument_bars(df_trades)
+
+# Step 3: Indicators and files per symbol
+for symbol, bars in by_symbol.items():
+    folder = partition_dir(OUTPUT_DIR, symbol)
+    traditional = traditional_bars(bars)
+    write_output(traditional, f'{folder}/traditional_1min_with_emas_adx', OUTPUT_FORMATS)
+    write_output(heikin_ashi_bars(bars), f'{folder}/heikin_ashi_1min_with_emas_adx', OUTPUT_FORMATS)
+
+    print(f"\n{symbol}: {len(bars)} bars "
+          f"({bars.index[0]} to {bars.index[-1]}), "
+          f"Final CVD: {bars['cvd_close'].iloc[-1]}, "
+          f"Total Volume: {bars['volume'].sum():,}")
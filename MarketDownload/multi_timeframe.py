@@ -0,0 +1,46 @@
+import databento as db
+
+from pipeline import (
+    CachedHistorical, build_timeframes, heikin_ashi_bars, normalize_trades, traditional_bars,
+    write_output,
+)
+
+# Bar sizes to build; all are rolled up from one pass over the trades
+TIMEFRAMES = ['1min', '3min', '5min', '15min']
+
+# Output formats: 'csv' (read by the BackTester), 'parquet', 'arrow'
+OUTPUT_FORMATS = ['csv']
+
+# Client with your key - pulls are cached on disk so re-runs of the same
+# window skip the download (see pipeline/cache.py)
+client = CachedHistorical(db.Historical(key='db-UdLj4DAEvSPAxUjtFhT9qheWyxR4s'))
+
+# Step 1: Download raw trades
+data = client.timeseries.get_range(
+    dataset='GLBX.MDP3',
+    symbols=['MESU5'],
+    schema='trades',
+    start='2025-07-14T13:30:00Z',  # 9:30 AM EDT
+    end='2025-07-14T17:00:00Z',    # 1:00 PM EDT
+    stype_in='raw_symbol'
+)
+
+df_trades = data.to_df()
+print(f"Downloaded {len(df_trades)} trades")
+
+# Step 2: Normalize trades - UTC timestamps, int64 size, delta and running CVD
+normalize_trades(df_trades)
+
+# Step 3: Build every timeframe from the same trades
+pyramid = build_timeframes(df_trades, TIMEFRAMES)
+
+# Step 4: Each timeframe gets its own CVD OHLC, HA, ADX and EMA columns and files
+for label, bars in pyramid.items():
+    traditional = traditional_bars(bars)
+    write_output(traditional, f'mesu5_traditional_{label}_with_emas_adx', OUTPUT_FORMATS)
+    write_output(heikin_ashi_bars(bars), f'mesu5_heikin_ashi_{label}_with_emas_adx', OUTPUT_FORMATS)
+
+    print(f"\n{label} bars: {len(bars)} "
+          f"({bars.index[0]} to {bars.index[-1]}), "
+          f"Final CVD: {bars['cvd_close'].iloc[-1]}, "
+          f"Last ADX: {traditional['adx'].iloc[-1]:.2f}")
@@ -0,0 +1,174 @@
+"""
+Shared building blocks for the MarketDownload scripts.
+
+``pipeline.parity`` is a command-line tool (``python -m pipeline.parity``), so
+it is imported from its module rather than re-exported here.
+"""
+from .activity import BAR_KINDS, MES_MULTIPLIER, activity_bar_starts, activity_bars
+from .archive import ARCHIVE_DTYPE, TradeArchive, archive_frame, archive_records
+from .backfill import (
+    BackfillProgress, fetch_with_retry, is_transient, run_backfill, session_chunks,
+    stitch_chunks,
+)
+from .bars import (
+    BAR_COLUMNS, bars_from_arrays, build_bars, build_timeframes, join_bars, rollup_bars,
+    rollup_segments, timeframe_label,
+)
+from .cache import CachedHistorical, RangeView, StitchedView
+from .checkpoint import (
+    checkpoint_path, load_checkpoint, resume_rows, save_checkpoint,
+)
+from .compact import (
+    COMPACT_COLUMNS, PRICE_SCALE, compact_bars, compact_trades, fixed_to_float,
+)
+from .drilldown import SIDE_VOLUME_COLUMNS, TradeIndex
+from .footprint import MES_TICK_SIZE, VALUE_AREA, Footprint, footprint, tick_index
+from .grid import ewm_grid, grid_columns, grid_long, indicator_grid
+from .heikin_ashi import HA_COLUMN_SETS, heikin_ashi, heikin_ashi_arrays
+from .indicators import (
+    ADX_COLUMNS, ADX_PERIOD, EMA_PERIODS, EMA_SOURCES, HA_ADX_COLUMNS, HA_EMA_SOURCES,
+    compute_indicators, ema_bank, indicator_columns, wilder_adx_into,
+)
+from .instruments import build_instrument_bars, instrument_order, segmented_cumsum
+from .live import EwmState, HeikinAshiState, LiveBarEngine, WilderAdxState
+from .output import (
+    OUTPUT_FORMATS, append_output, partition_dir, read_output, write_arrow, write_csv,
+    write_output, write_parquet,
+)
+from .products import combined_bars, heikin_ashi_bars, product_columns, traditional_bars
+from .profiling import (
+    StageProfiler, active_profiler, disable_profiling, enable_profiling, stage,
+)
+from .records import record_arrays, record_bars
+from .run import GRID_STEM, PRODUCTS, PipelineConfig, run_pipeline
+from .streaming import (
+    DEFAULT_BATCH_SIZE, StreamingBarBuilder, build_bars_streaming, combine_bars, stream_bars,
+)
+from .synthetic import TRADE_RECORD_DTYPE, synthetic_records, synthetic_trades
+from .trades import SIDE_SIGN, normalize_trades, side_codes, side_sign, trade_delta
+from .trendlines import (
+    PIVOT_SOURCES, TRENDLINE_SOURCES, TRENDLINE_WINDOW, compute_trendlines, rolling_trendlines,
+    swing_pivots, trendline_columns,
+)
+from .warmup import (
+    DEFAULT_TOLERANCE, WarmupPlan, chain_warmup, plan_warmup, session_start, trim_warmup,
+    warmup_bars,
+)
+
+__all__ = [
+    'ADX_COLUMNS',
+    'ADX_PERIOD',
+    'ARCHIVE_DTYPE',
+    'BAR_COLUMNS',
+    'BAR_KINDS',
+    'BackfillProgress',
+    'COMPACT_COLUMNS',
+    'CachedHistorical',
+    'DEFAULT_BATCH_SIZE',
+    'DEFAULT_TOLERANCE',
+    'EMA_PERIODS',
+    'EMA_SOURCES',
+    'EwmState',
+    'Footprint',
+    'GRID_STEM',
+    'HA_ADX_COLUMNS',
+    'HA_COLUMN_SETS',
+    'HA_EMA_SOURCES',
+    'HeikinAshiState',
+    'LiveBarEngine',
+    'MES_MULTIPLIER',
+    'MES_TICK_SIZE',
+    'OUTPUT_FORMATS',
+    'PIVOT_SOURCES',
+    'PRICE_SCALE',
+    'PRODUCTS',
+    'PipelineConfig',
+    'RangeView',
+    'SIDE_SIGN',
+    'SIDE_VOLUME_COLUMNS',
+    'StageProfiler',
+    'StitchedView',
+    'StreamingBarBuilder',
+    'TRADE_RECORD_DTYPE',
+    'TRENDLINE_SOURCES',
+    'TRENDLINE_WINDOW',
+    'TradeArchive',
+    'TradeIndex',
+    'VALUE_AREA',
+    'WarmupPlan',
+    'WilderAdxState',
+    'active_profiler',
+    'activity_bar_starts',
+    'activity_bars',
+    'append_output',
+    'archive_frame',
+    'archive_records',
+    'bars_from_arrays',
+    'build_bars',
+    'build_bars_streaming',
+    'build_instrument_bars',
+    'build_timeframes',
+    'chain_warmup',
+    'checkpoint_path',
+    'combine_bars',
+    'combined_bars',
+    'compact_bars',
+    'compact_trades',
+    'compute_indicators',
+    'compute_trendlines',
+    'disable_profiling',
+    'ema_bank',
+    'enable_profiling',
+    'ewm_grid',
+    'fetch_with_retry',
+    'fixed_to_float',
+    'footprint',
+    'grid_columns',
+    'grid_long',
+    'heikin_ashi',
+    'heikin_ashi_arrays',
+    'heikin_ashi_bars',
+    'indicator_columns',
+    'indicator_grid',
+    'instrument_order',
+    'is_transient',
+    'join_bars',
+    'load_checkpoint',
+    'normalize_trades',
+    'partition_dir',
+    'plan_warmup',
+    'product_columns',
+    'read_output',
+    'record_arrays',
+    'record_bars',
+    'resume_rows',
+    'rolling_trendlines',
+    'rollup_bars',
+    'rollup_segments',
+    'run_backfill',
+    'run_pipeline',
+    'save_checkpoint',
+    'segmented_cumsum',
+    'session_chunks',
+    'session_start',
+    'side_codes',
+    'side_sign',
+    'stage',
+    'stitch_chunks',
+    'stream_bars',
+    'swing_pivots',
+    'synthetic_records',
+    'synthetic_trades',
+    'tick_index',
+    'timeframe_label',
+    'trade_delta',
+    'traditional_bars',
+    'trendline_columns',
+    'trim_warmup',
+    'warmup_bars',
+    'wilder_adx_into',
+    'write_arrow',
+    'write_csv',
+    'write_output',
+    'write_parquet',
+]
@@ -0,0 +1,111 @@
+"""
+Fetch once and write the traditional, Heikin Ashi and combined bar files.
+
+Run from the MarketDownload directory:
+
+    python -m pipeline
+    python -m pipeline --products traditional heikin_ashi --formats csv parquet
+    python -m pipeline --start 2025-07-14T13:30:00Z --end 2025-07-15T20:00:00Z \\
+        --timeframes 1min 5min --batch-size 1000000 --profile
+
+    # daily append: each run adds the new window's bars to the same files
+    python -m pipeline --checkpoint-dir checkpoints --start ... --end ...
+
+    # indicators converged at --start (extra history fetched and trimmed)
+    python -m pipeline --warmup-tolerance 1e-6
+
+    # months of history: one chunk per trading session, 4 at a time, resumable
+    python -m pipeline --backfill --start 2025-04-01 --end 2025-07-15 --workers 4
+
+    # parameter sweep: every span/period in one long-layout file
+    python -m pipeline --grid-spans $(seq 5 5 300) --grid-periods $(seq 7 28) --formats parquet
+
+The API key comes from ``--key`` or the DATABENTO_API_KEY environment
+variable. Pulls go through the on-disk cache (see cache.py).
+"""
+import argparse
+
+from .cache import CachedHistorical
+from .backfill import DEFAULT_RETRIES, DEFAULT_WORKERS, run_backfill
+from .output import OUTPUT_FORMATS
+from .run import PRODUCTS, PipelineConfig, run_pipeline
+
+
+def parse_args(argv=None):
+    defaults = PipelineConfig()
+    parser = argparse.ArgumentParser(prog='python -m pipeline', description=__doc__.splitlines()[1])
+    parser.add_argument('--symbols', nargs='+', default=defaults.symbols)
+    parser.add_argument('--start', default=defaults.start)
+    parser.add_argument('--end', default=defaults.end)
+    parser.add_argument('--dataset', default=defaults.dataset)
+    parser.add_argument('--timeframes', nargs='+', default=defaults.timeframes)
+    parser.add_argument('--products', nargs='+', choices=PRODUCTS, default=defaults.products)
+    parser.add_argument('--formats', nargs='+', choices=OUTPUT_FORMATS, default=defaults.formats)
+    parser.add_argument('--output-dir', default=defaults.output_dir)
+    parser.add_argument('--batch-size', type=int, default=defaults.batch_size,
+                        help='stream the pull this many trades at a time')
+    parser.add_argument('--compact', action='store_true',
+                        help='load trades as a fixed-point compact table')
+    parser.add_argument('--records', action='store_true',
+                        help='aggregate straight on the DBN record arrays (no trade frame)')
+    parser.add_argument('--checkpoint-dir', default=defaults.checkpoint_dir,
+                        help='append only new bars, resuming CVD and indicators from here')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-stage timings and save them to pipeline_profile.json')
+    parser.add_argument('--warmup-tolerance', type=float, default=defaults.warmup_tolerance,
+                        help='fetch enough history before --start for indicators to converge '
+                             'to this tolerance (e.g. 1e-6)')
+    parser.add_argument('--trendlines', action='store_true',
+                        help='add rolling trendline and swing pivot columns to traditional')
+    parser.add_argument('--grid-spans', nargs='+', type=int, default=defaults.grid_spans,
+                        help='EMA spans for the indicator grid output')
+    parser.add_argument('--grid-periods', nargs='+', type=int, default=defaults.grid_periods,
+                        help='ADX periods for the indicator grid output')
+    parser.add_argument('--backfill', action='store_true',
+                        help='fetch session by session in parallel, resuming from '
+                             '{output-dir}/backfill_progress.json')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='concurrent chunk downloads for --backfill')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='retries per chunk (exponential backoff) for --backfill')
+    parser.add_argument('--key', default=None, help='Databento API key')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import databento as db
+
+    config = PipelineConfig(
+        symbols=args.symbols, start=args.start, end=args.end, dataset=args.dataset,
+        timeframes=args.timeframes, products=args.products, formats=args.formats,
+        output_dir=args.output_dir, batch_size=args.batch_size, compact=args.compact,
+        records=args.records, checkpoint_dir=args.checkpoint_dir, profile=args.profile,
+        warmup_tolerance=args.warmup_tolerance, trendlines=args.trendlines,
+        grid_spans=args.grid_spans, grid_periods=args.grid_periods,
+    )
+    client = CachedHistorical(db.Historical(key=args.key))
+    if args.backfill:
+        result = run_backfill(client, config, workers=args.workers, retries=args.retries)
+    else:
+        result = run_pipeline(client, config)
+    if result['warmup'] is not None:
+        print(result['warmup'])
+
+    for symbol, pyramid in result['bars'].items():
+        for label, bars in pyramid.items():
+            if len(bars):
+                print(f"{symbol} {label}: {len(bars)} bars "
+                      f"({bars.index[0]} to {bars.index[-1]}), "
+                      f"Final CVD: {bars['cvd_close'].iloc[-1]}")
+    for path in result['paths']:
+        print(f"Wrote {path}")
+
+    if result['profiler'] is not None:
+        print("\nPipeline profile:")
+        print(result['profiler'].table())
+        result['profiler'].to_json('pipeline_profile.json')
+
+
+if __name__ == '__main__':
+    main()
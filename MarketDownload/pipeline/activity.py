@@ -0,0 +1,212 @@
+"""
+Activity-driven bars: tick, volume, range and dollar (notional) bars.
+
+Bars follow the trade stream rather than the clock, like the 700-tick bars
+in PastVersions/algo700tick.ts: a bar takes trades until the closing
+condition is met on the trade just added, then the next trade opens a new
+bar; a trailing partial bar is kept. Boundaries are found without a Python
+loop over trades or bars:
+
+- for every trade, the trade where a bar opened there would close: one
+  ``searchsorted`` on the cumulative sum (volume, dollar), or walks down a
+  max/min segment tree taken by many starts at once (range)
+- the bars are then chained from trade 0 by pointer doubling, so following
+  ``b`` bars takes log2(b) array passes (``chain_starts``)
+
+The bars themselves use the same reduction, delta and CVD OHLC semantics as
+the time bars in bars.py.
+"""
+import numpy as np
+
+from .bars import bars_frame, reduce_segments, timestamps_ns
+
+# Dollar value of one index point; MES is $5, ES $50, MNQ $2, NQ $20
+MES_MULTIPLIER = 5.0
+
+BAR_KINDS = ('tick', 'volume', 'range', 'dollar')
+
+
+def tick_bar_starts(n_trades, ticks):
+    """Every ``ticks`` trades"""
+    return np.arange(0, n_trades, ticks, dtype=np.int64)
+
+
+def chain_starts(ends):
+    """
+    Bar starts given ``ends[i]``, the trade where a bar opened at trade i
+    closes (n if it never does): bar 0 opens at trade 0 and each next bar
+    on the trade after the previous one closed.
+
+    Pointer doubling: after k passes ``nodes`` holds the first 2**k bar
+    starts and ``jump`` skips 2**k bars, so b bars take log2(b) passes.
+    ``jump`` maps indices into ``domain``, the trades a bar can still open
+    on (``nodes`` and where jumps land); chains from different trades
+    merge, so it shrinks as the jumps grow.
+    """
+    n = len(ends)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    # n is past the last trade and maps to itself
+    step = np.append(np.minimum(ends + 1, n), n)
+    domain, jump = np.arange(n + 1), step
+    nodes = np.zeros(1, dtype=np.int64)
+    while True:
+        # Keep the chain so far and where jumps land, renumbered in order
+        keep = np.zeros(len(domain), dtype=bool)
+        keep[jump] = True
+        keep[nodes] = True
+        index = np.cumsum(keep) - 1
+        domain, jump, nodes = domain[keep], index[jump[keep]], index[nodes]
+
+        nodes = np.union1d(nodes, jump[nodes])
+        starts = domain[nodes]
+        starts = starts[starts < n]
+        if step[starts[-1]] == n:
+            return starts
+        jump = jump[jump]
+
+
+def threshold_bar_ends(values, threshold):
+    """
+    For every trade, where a bar opened there closes: the trade on which
+    the bar's running total of ``values`` reaches ``threshold``.
+    """
+    cum = np.cumsum(values)
+    before = np.concatenate(([0], cum))[:-1]
+    return np.searchsorted(cum, before + threshold, side='left')
+
+
+def threshold_bar_starts(values, threshold):
+    """
+    Bars that close on the trade where the bar's running total of
+    ``values`` (contracts, notional, ...) reaches ``threshold``.
+    """
+    return chain_starts(threshold_bar_ends(values, threshold))
+
+
+def _tree(values, fill, op):
+    """Bottom-up segment tree of ``op`` over ``values`` (leaves at size..2*size)"""
+    size = 1 << max(len(values) - 1, 0).bit_length()
+    tree = np.full(2 * size, fill, dtype=np.float64)
+    tree[size:size + len(values)] = values
+    half = size // 2
+    while half:
+        tree[half:2 * half] = op(tree[2 * half:4 * half:2], tree[2 * half + 1:4 * half:2])
+        half //= 2
+    return size, tree
+
+
+def _range_walk(trees, starts, bar_range, n):
+    """
+    Range bar ends for ``starts``: each walks the max/min trees up while the
+    covered range stays under ``bar_range``, then down into the node that
+    crosses it. All starts take each step together.
+    """
+    size, tmax, tmin = trees
+    node = starts + size
+    cur_max = np.full(len(starts), -np.inf)
+    cur_min = np.full(len(starts), np.inf)
+    out = np.full(len(starts), n, dtype=np.int64)
+
+    # Up: absorb whole nodes to the right while the range stays below
+    active = np.arange(len(starts))
+    crossing = []
+    while len(active):
+        at = node[active]
+        at //= at & -at
+        new_max = np.maximum(cur_max[active], tmax[at])
+        new_min = np.minimum(cur_min[active], tmin[at])
+        cross = new_max - new_min >= bar_range
+        node[active] = at
+        crossing.append(active[cross])
+        keep = ~cross
+        active, at = active[keep], at[keep] + 1
+        cur_max[active], cur_min[active] = new_max[keep], new_min[keep]
+        node[active] = at
+        # A power of two means the walk ran off the right edge: no close
+        active = active[(at & -at) != at]
+
+    # Down: into the left child if it crosses, else absorb it and go right
+    active = np.concatenate(crossing)
+    while len(active):
+        inner = node[active] < size
+        done = active[~inner]
+        out[done] = node[done] - size
+        active = active[inner]
+        at = node[active] * 2
+        new_max = np.maximum(cur_max[active], tmax[at])
+        new_min = np.minimum(cur_min[active], tmin[at])
+        below = new_max - new_min < bar_range
+        cur_max[active[below]] = new_max[below]
+        cur_min[active[below]] = new_min[below]
+        node[active] = at + below
+    return out
+
+
+def range_bar_ends(price, bar_range, grid=256):
+    """
+    For every trade, where a bar opened there closes: the first trade on
+    which the bar's high - low reaches ``bar_range`` (n if none does).
+
+    Ends never decrease with the start and bars mostly close on the same
+    few new highs/lows, so ends are walked (``_range_walk``) for every
+    ``grid``-th start and then for midpoints of the gaps whose two ends
+    differ; a gap whose ends agree closes there throughout.
+    """
+    n = len(price)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    size, tmax = _tree(price, -np.inf, np.maximum)
+    _, tmin = _tree(price, np.inf, np.minimum)
+    trees = (size, tmax, tmin)
+    at = np.unique(np.append(np.arange(0, n, grid, dtype=np.int64), n - 1))
+    ends = _range_walk(trees, at, bar_range, n)
+    while True:
+        split = np.flatnonzero((ends[1:] > ends[:-1]) & (at[1:] - at[:-1] > 1))
+        if not len(split):
+            break
+        mid = (at[split] + at[split + 1]) // 2
+        at = np.insert(at, split + 1, mid)
+        ends = np.insert(ends, split + 1, _range_walk(trees, mid, bar_range, n))
+    return np.repeat(ends, np.diff(np.append(at, n)))
+
+
+def range_bar_starts(price, bar_range):
+    """Bars that close on the trade where high - low reaches ``bar_range``"""
+    return chain_starts(range_bar_ends(np.asarray(price, dtype=np.float64), bar_range))
+
+
+def activity_bar_starts(kind, price, size, threshold, multiplier=MES_MULTIPLIER):
+    """First trade offset of every bar for one of ``BAR_KINDS``"""
+    if kind not in BAR_KINDS:
+        raise ValueError(f'unknown bar kind {kind!r}; expected one of {BAR_KINDS}')
+    # A threshold of 0 would never move past a bar's first trade
+    if not threshold > 0:
+        raise ValueError(f'{kind} bar threshold must be positive, got {threshold!r}')
+    if kind == 'tick':
+        if int(threshold) < 1:
+            raise ValueError(f'tick bars need at least one trade, got {threshold!r}')
+        return tick_bar_starts(len(price), int(threshold))
+    if kind == 'volume':
+        return threshold_bar_starts(size.astype(np.int64, copy=False), threshold)
+    if kind == 'range':
+        return range_bar_starts(price, threshold)
+    return threshold_bar_starts(price * size * multiplier, threshold)
+
+
+def activity_bars(df_trades, kind, threshold, multiplier=MES_MULTIPLIER, cvd_col='running_cvd'):
+    """
+    Build activity bars from a normalized trades frame (in arrival order).
+
+    ``kind`` is 'tick' (trades per bar), 'volume' (contracts), 'range'
+    (price points of high - low) or 'dollar' (notional, price * size *
+    ``multiplier``). Bars are indexed by their first trade's timestamp and
+    have the same columns as ``build_bars``.
+    """
+    price = df_trades['price'].to_numpy()
+    size = df_trades['size'].to_numpy()
+    starts = activity_bar_starts(kind, price, size, threshold, multiplier)
+    columns = reduce_segments(starts, price, size, df_trades['delta'].to_numpy(),
+                              df_trades[cvd_col].to_numpy())
+    ts_ns = timestamps_ns(df_trades['ts_event'])
+    return bars_frame(ts_ns[starts], columns, index_name='bar_start')
@@ -0,0 +1,293 @@
+"""
+Memory-mapped local trade archive with a sparse time index.
+
+Trades are kept as fixed-width binary records, one file per symbol per UTC
+day under ``{root}/{symbol}/{YYYY-MM-DD}.trades``:
+
+- ``ts_recv``   int64 UTC ns (the field Databento's ``get_range`` filters
+                trades on, so a slice returns what a pull of that window does)
+- ``ts_event``  int64 UTC ns
+- ``price``     int64 fixed point, ``PRICE_SCALE`` = 1e9
+- ``size``      uint32
+- ``sign``      int8 aggressor sign: +1 (B), -1 (A), 0 (N)
+
+29 bytes per trade, in arrival (``ts_recv``) order. Files open with ``np.memmap``, so
+nothing is parsed on load and only the pages a slice touches are read.
+Next to each file, ``{day}.idx.npy`` holds the offset of the first record at
+or after each ``INDEX_SECONDS`` boundary of the day and ``{day}.ranges.json``
+the ``[start, end)`` ranges archived pulls covered. A lookup checks the
+window is covered, reads two index entries and binary-searches ``ts_recv``
+between them, so slicing a minute out of a day is a few microseconds and
+returns a view.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .bars import timestamps_ns
+from .compact import PRICE_SCALE
+from .trades import SIDE_SIGN, side_sign
+
+ARCHIVE_VERSION = 2
+ARCHIVE_DTYPE = np.dtype([
+    ('ts_recv', '<i8'), ('ts_event', '<i8'), ('price', '<i8'), ('size', '<u4'), ('sign', 'i1'),
+])
+INDEX_SECONDS = 60
+DAY_NS = 86_400_000_000_000
+META_FILE = 'archive.json'
+
+
+def _timestamp_ns(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return ts.value
+
+
+def archive_records(data):
+    """
+    Archive records from a DBN store / record array (``to_ndarray``) or a
+    ``to_df()`` frame (``ts_recv`` index or column, float or fixed prices).
+    """
+    if isinstance(data, pd.DataFrame):
+        if 'ts_recv' in data:
+            ts_recv = timestamps_ns(pd.to_datetime(data['ts_recv'], utc=True))
+        elif data.index.name == 'ts_recv':
+            ts_recv = timestamps_ns(data.index)
+        else:
+            ts_recv = timestamps_ns(pd.to_datetime(data['ts_event'], utc=True))
+        price = data['price'].to_numpy()
+        if price.dtype.kind == 'f':
+            price = np.rint(price * PRICE_SCALE).astype(np.int64)
+        out = np.empty(len(data), dtype=ARCHIVE_DTYPE)
+        out['ts_recv'] = ts_recv
+        out['ts_event'] = timestamps_ns(pd.to_datetime(data['ts_event'], utc=True))
+        out['price'] = price
+        out['size'] = data['size'].to_numpy()
+        out['sign'] = side_sign(data['side'])
+        return out
+
+    records = data if isinstance(data, np.ndarray) else data.to_ndarray()
+    side = records['side']
+    if side.dtype.kind == 'S':
+        side = side.view(np.uint8)
+    out = np.empty(len(records), dtype=ARCHIVE_DTYPE)
+    out['ts_recv'] = records['ts_recv']
+    out['ts_event'] = records['ts_event']
+    out['price'] = records['price']
+    out['size'] = records['size']
+    out['sign'] = SIDE_SIGN[side.astype(np.uint8, copy=False)]
+    return out
+
+
+def time_index(ts_recv, day_ns, interval_ns):
+    """Offset of the first record at or after each interval boundary of the day"""
+    bounds = day_ns + np.arange(DAY_NS // interval_ns + 1, dtype=np.int64) * interval_ns
+    return np.searchsorted(ts_recv, bounds, side='left').astype(np.int64)
+
+
+def merge_ranges(ranges):
+    """Sorted union of ``[start, end)`` ranges, touching ones joined"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def range_gaps(ranges, start, end):
+    """Parts of ``[start, end)`` outside the merged ``ranges``"""
+    gaps = []
+    for r_start, r_end in ranges:
+        if r_end <= start:
+            continue
+        if r_start >= end:
+            break
+        if r_start > start:
+            gaps.append((start, r_start))
+        start = max(start, r_end)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+class TradeArchive:
+    """
+    Per-symbol, per-day trade files under ``root``.
+
+    ``write`` merges a pull of ``[start, end)`` into the day files: inside
+    that window the pull replaces what was archived, the rest is kept, so
+    pulls can be archived in any order and overlap freely. Each day records
+    the ranges it covers (``{day}.ranges.json``), and ``slice`` raises
+    ValueError for a window that is not fully covered instead of returning
+    a silently short result.
+    """
+
+    def __init__(self, root, index_seconds=INDEX_SECONDS):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        meta_path = os.path.join(root, META_FILE)
+        meta = {'version': ARCHIVE_VERSION, 'dtype': ARCHIVE_DTYPE.descr,
+                'index_seconds': index_seconds}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                saved = json.load(f)
+            if saved.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f'{meta_path}: unsupported archive version '
+                                 f'{saved.get("version")!r}')
+            index_seconds = saved['index_seconds']
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f, indent=1)
+        self.interval_ns = index_seconds * 1_000_000_000
+        self._days = {}
+
+    # -- paths ----------------------------------------------------------------
+
+    def path(self, symbol, day):
+        if not isinstance(day, (int, np.integer)):
+            day = _timestamp_ns(day)
+        return os.path.join(self.root, symbol, f'{np.datetime64(day // DAY_NS, "D")}.trades')
+
+    @staticmethod
+    def _sidecar(path, suffix):
+        return path[:-len('.trades')] + suffix
+
+    def days(self, symbol):
+        """Archived days of ``symbol`` as UTC timestamps, oldest first"""
+        folder = os.path.join(self.root, symbol)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(pd.Timestamp(name[:-len('.trades')], tz='UTC')
+                      for name in os.listdir(folder) if name.endswith('.trades'))
+
+    # -- writing --------------------------------------------------------------
+
+    def write(self, symbol, data, start, end):
+        """
+        Archive a pull of ``[start, end)`` (see ``archive_records``);
+        returns the day files written.
+        """
+        start_ns, end_ns = _timestamp_ns(start), _timestamp_ns(end)
+        records = archive_records(data)
+        if len(records) > 1 and not np.all(records['ts_recv'][1:] >= records['ts_recv'][:-1]):
+            records = records[np.argsort(records['ts_recv'], kind='stable')]
+        ts_recv = records['ts_recv']
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+
+        paths = []
+        for day_ns in range(start_ns // DAY_NS * DAY_NS, end_ns, DAY_NS):
+            lo, hi = max(start_ns, day_ns), min(end_ns, day_ns + DAY_NS)
+            new = records[ts_recv.searchsorted(lo):ts_recv.searchsorted(hi)]
+            path = self.path(symbol, day_ns)
+            day = self._day(path)
+
+            # The pull replaces the archived trades of its window; the file
+            # stays sorted on ts_recv, so the kept parts sit on either side
+            if day is None:
+                merged, ranges = new, []
+            else:
+                old, old_ts, _, ranges = day
+                merged = np.concatenate([old[:old_ts.searchsorted(lo)], new,
+                                         old[old_ts.searchsorted(hi):]])
+            ranges = merge_ranges(ranges + [[lo, hi]])
+
+            # Every file goes through a temp file and os.replace, so a crash
+            # never leaves one half written; the ranges go last so they never
+            # claim a window the trades file does not hold yet
+            self._days.pop(path, None)
+            index_path = self._sidecar(path, '.idx.npy')
+            ranges_path = self._sidecar(path, '.ranges.json')
+            with open(path + '.part', 'wb') as f:
+                f.write(merged.tobytes())
+            with open(index_path + '.part', 'wb') as f:
+                np.save(f, time_index(merged['ts_recv'], day_ns, self.interval_ns))
+            with open(ranges_path + '.part', 'w') as f:
+                json.dump(ranges, f)
+            for name in (path, index_path, ranges_path):
+                os.replace(name + '.part', name)
+            paths.append(path)
+        return paths
+
+    # -- reading --------------------------------------------------------------
+
+    def _day(self, path):
+        """(records, ts_recv view, time index, covered ranges) of a day, cached"""
+        if path not in self._days:
+            if not os.path.exists(path):
+                return None
+            if os.path.getsize(path) == 0:
+                records = np.empty(0, dtype=ARCHIVE_DTYPE)
+            else:
+                records = np.memmap(path, dtype=ARCHIVE_DTYPE, mode='r')
+            with open(self._sidecar(path, '.ranges.json')) as f:
+                ranges = json.load(f)
+            self._days[path] = (records, np.asarray(records['ts_recv']),
+                                np.load(self._sidecar(path, '.idx.npy')).tolist(), ranges)
+        return self._days[path]
+
+    def open_day(self, symbol, day):
+        """The day's records as a read-only memmap (None if not archived)"""
+        day = self._day(self.path(symbol, day))
+        return None if day is None else day[0]
+
+    def missing(self, symbol, start, end):
+        """Parts of ``[start, end)`` no archived pull covers, as UTC timestamp pairs"""
+        start_ns, end_ns = _timestamp_ns(start), _timestamp_ns(end)
+        gaps = []
+        for day_ns in range(start_ns // DAY_NS * DAY_NS, end_ns, DAY_NS):
+            day = self._day(self.path(symbol, day_ns))
+            lo, hi = max(start_ns, day_ns), min(end_ns, day_ns + DAY_NS)
+            gaps += [(lo, hi)] if day is None else range_gaps(day[3], lo, hi)
+        # Join gaps running over midnight
+        gaps = merge_ranges(gaps)
+        return [(pd.Timestamp(s, tz='UTC'), pd.Timestamp(e, tz='UTC')) for s, e in gaps]
+
+    def _slice_day(self, symbol, start_ns, end_ns, day_ns):
+        day = self._day(self.path(symbol, day_ns))
+        lo, hi = max(start_ns, day_ns), min(end_ns, day_ns + DAY_NS)
+        if day is None or not any(s <= lo and e >= hi for s, e in day[3]):
+            gap_start, gap_end = self.missing(symbol, start_ns, end_ns)[0]
+            raise ValueError(f'{symbol} is not archived from {gap_start} to {gap_end}')
+        records, ts_recv, index, _ = day
+        # The index narrows the search to the intervals holding start and end
+        last_k = len(index) - 1
+        k_lo = min(max((start_ns - day_ns) // self.interval_ns, 0), last_k)
+        k_hi = min(max(-(-(end_ns - day_ns) // self.interval_ns), 0), last_k)
+        lo = index[k_lo]
+        hi = len(records) if k_hi == last_k else index[k_hi]
+        ts = ts_recv[lo:hi]
+        first = lo + int(ts.searchsorted(start_ns))
+        last = lo + int(ts.searchsorted(end_ns))
+        return records[first:last]
+
+    def slice(self, symbol, start, end):
+        """
+        Records with ``start <= ts_recv < end``: a view into the memmap for a
+        window within one day, a concatenated copy across days. Raises
+        ValueError if part of the window was never archived.
+        """
+        start_ns, end_ns = _timestamp_ns(start), _timestamp_ns(end)
+        parts = [self._slice_day(symbol, start_ns, end_ns, day_ns)
+                 for day_ns in range(start_ns // DAY_NS * DAY_NS, end_ns, DAY_NS)]
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return np.empty(0, dtype=ARCHIVE_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def archive_frame(records):
+    """
+    A slice as a compact trade table (ts_event, fixed-point price, size,
+    sign), ready for ``compact_bars`` or ``TradeIndex``.
+    """
+    return pd.DataFrame({
+        'ts_event': np.asarray(records['ts_event']),
+        'price': np.asarray(records['price']),
+        'size': np.asarray(records['size']),
+        'sign': np.asarray(records['sign']),
+    })
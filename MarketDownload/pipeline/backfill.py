@@ -0,0 +1,266 @@
+"""
+Parallel, resumable multi-day backfill.
+
+A long window is cut into CME trading sessions (17:00 CT to 16:00 CT the
+next day, see warmup.py). The chunk edges fall in the daily halt, so no bar
+and no late print straddles two chunks. Chunks are fetched by a bounded
+thread pool through the same client (``db.Historical``, ``CachedHistorical``
+or any stand-in with ``timeseries.get_range``). Failed fetches are retried
+with exponential backoff when the error is transient (network, timeout,
+HTTP 429 / 5xx); anything else stops the backfill at once. Each worker
+builds its chunk's base bars as soon as its pull arrives.
+
+Every finished chunk's bars are written under ``{output_dir}/chunks`` and
+recorded in a JSON progress file, so an interrupted backfill picks up with
+the chunks it had not finished. A chunk counts as done only for the same
+start and end, so a widened window refetches the session it used to cut
+short. When every chunk is done the requested window's chunks are
+stitched in order, carrying CVD across them as if it were one long pull,
+and the usual products are written from the stitched bars.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+
+import pandas as pd
+
+from .bars import CVD_COLUMNS, rollup_bars, timeframe_label
+from .output import read_output, write_output
+from .profiling import disable_profiling, enable_profiling
+from .run import base_freq, fetch_bars, write_grid, write_products
+from .warmup import CME_SESSIONS, CME_TIMEZONE, session_intervals
+
+PROGRESS_VERSION = 1
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+TRANSIENT_STATUS = (408, 429)
+# requests / urllib3 / aiohttp connection and timeout errors, which do not
+# subclass the builtin ConnectionError / TimeoutError
+TRANSIENT_ERRORS = ('ConnectionError', 'Timeout', 'ClientConnectionError', 'ServerTimeoutError')
+
+
+def session_chunks(start, end, sessions=CME_SESSIONS, tz=CME_TIMEZONE):
+    """
+    ``[start, end)`` cut into trading sessions as (chunk_start, chunk_end)
+    UTC timestamps: each session runs from one open after a halt/weekend to
+    the next close.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if start.tzinfo is None:
+        start = start.tz_localize('UTC')
+    if end.tzinfo is None:
+        end = end.tz_localize('UTC')
+
+    # Merge each day's open intervals across midnight into sessions
+    day = start.tz_convert(tz).tz_localize(None).normalize() - pd.Timedelta(days=1)
+    last_day = end.tz_convert(tz).tz_localize(None).normalize()
+    sessions_utc = []
+    while day <= last_day:
+        for open_ts, close_ts in session_intervals(day, sessions, tz):
+            if sessions_utc and sessions_utc[-1][1] == open_ts:
+                sessions_utc[-1] = (sessions_utc[-1][0], close_ts)
+            else:
+                sessions_utc.append((open_ts, close_ts))
+        day += pd.Timedelta(days=1)
+
+    return [(max(s, start), min(e, end)) for s, e in sessions_utc
+            if max(s, start) < min(e, end)]
+
+
+def chunk_key(chunk_start):
+    return pd.Timestamp(chunk_start).isoformat()
+
+
+class BackfillProgress:
+    """
+    JSON record of finished chunks: per chunk its end, and per symbol the
+    bars file and net delta (the CVD the chunk adds). Saved atomically
+    after every chunk; safe to share between worker threads.
+    """
+
+    def __init__(self, path, config):
+        self.path = path
+        self.settings = {
+            'dataset': config.dataset,
+            'symbols': sorted(config.symbols),
+            'freq': timeframe_label(base_freq(config.timeframes)),
+        }
+        self.chunks = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                payload = json.load(f)
+            if payload.get('version') != PROGRESS_VERSION:
+                raise ValueError(f'{path}: unsupported progress version '
+                                 f'{payload.get("version")!r}')
+            if payload['settings'] != self.settings:
+                raise ValueError(f'{path} belongs to a backfill with different settings '
+                                 f'({payload["settings"]})')
+            self.chunks = payload['chunks']
+
+    def done(self, chunk_start, chunk_end):
+        entry = self.chunks.get(chunk_key(chunk_start))
+        return (entry is not None and entry['end'] == chunk_key(chunk_end)
+                and all(os.path.exists(p) for p in entry['files'].values()))
+
+    def record(self, chunk_start, chunk_end, files, net_delta):
+        with self._lock:
+            self.chunks[chunk_key(chunk_start)] = {
+                'end': chunk_key(chunk_end), 'files': files, 'net_delta': net_delta,
+            }
+            payload = {'version': PROGRESS_VERSION, 'settings': self.settings,
+                       'chunks': self.chunks}
+            with open(self.path + '.part', 'w') as f:
+                json.dump(payload, f, indent=1)
+            os.replace(self.path + '.part', self.path)
+
+
+def is_transient(exc):
+    """Network failures, timeouts and HTTP 408 / 429 / 5xx: worth retrying"""
+    status = getattr(exc, 'http_status', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if status is not None:
+        return status in TRANSIENT_STATUS or status >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+def fetch_with_retry(fetch, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                     retry_if=is_transient, sleep=time.sleep):
+    """
+    Call ``fetch()``, retrying errors ``retry_if`` accepts up to ``retries``
+    times after backoff * 2**attempt seconds; other errors raise at once.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fetch()
+        except Exception as exc:
+            if attempt == retries or not retry_if(exc):
+                raise
+            sleep(backoff * 2 ** attempt)
+
+
+def _chunk_stem(chunk_dir, symbol, chunk_start, label):
+    stamp = pd.Timestamp(chunk_start).strftime('%Y%m%dT%H%M')
+    return os.path.join(chunk_dir, f'{symbol.lower()}_{stamp}_{label}')
+
+
+def _run_chunk(client, config, chunk_start, chunk_end, chunk_dir, progress, retries, backoff,
+               sleep):
+    """Fetch one chunk, build and save its bars, record it as done"""
+    chunk_config = replace(config, start=chunk_key(chunk_start), end=chunk_key(chunk_end))
+    base = fetch_with_retry(lambda: fetch_bars(client, chunk_config), retries, backoff,
+                            sleep=sleep)
+    label = timeframe_label(base_freq(config.timeframes))
+    files, net_delta = {}, {}
+    for symbol in config.symbols:
+        bars = base.get(symbol)
+        if bars is None or len(bars) == 0:
+            continue
+        stem = _chunk_stem(chunk_dir, symbol, chunk_start, label)
+        files[symbol] = write_output(bars.rename_axis('timestamp').reset_index(), stem,
+                                     config.formats[:1])[0]
+        net_delta[symbol] = int(bars['cvd_close'].iat[-1])
+    progress.record(chunk_start, chunk_end, files, net_delta)
+    return chunk_start
+
+
+def stitch_chunks(progress, symbol, chunks):
+    """
+    One symbol's bars from the finished ``chunks`` ((start, end) pairs, in
+    order), with CVD carried across them. Chunks of other windows in the
+    progress file are left out.
+    """
+    parts, cvd = [], 0
+    for chunk_start, chunk_end in chunks:
+        entry = progress.chunks.get(chunk_key(chunk_start))
+        if entry is None or entry['end'] != chunk_key(chunk_end):
+            raise ValueError(f'chunk {chunk_key(chunk_start)} - {chunk_key(chunk_end)} '
+                             'is not finished')
+        if symbol not in entry['files']:
+            continue
+        bars = read_output(entry['files'][symbol])
+        bars['timestamp'] = pd.to_datetime(bars['timestamp'], utc=True)
+        bars = bars.set_index('timestamp').rename_axis('minute_bucket')
+        for name in CVD_COLUMNS:
+            bars[name] += cvd
+        cvd += entry['net_delta'][symbol]
+        parts.append(bars)
+    if not parts:
+        return None
+    return pd.concat(parts)
+
+
+def run_backfill(client, config, workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, progress_path=None, sleep=time.sleep):
+    """
+    Backfill ``config.start`` to ``config.end`` session by session.
+
+    Chunks already in the progress file are skipped. A non-transient error
+    (see ``is_transient``) cancels the chunks not yet started and is raised
+    as is. Raises RuntimeError naming the chunks that still failed after
+    ``retries`` (the finished ones stay recorded, so rerunning resumes
+    there); otherwise stitches the chunks and writes the products. Returns the same dict as
+    ``run_pipeline`` plus 'fetched' (chunk starts fetched by this run).
+    """
+    config.validate()
+    if config.checkpoint_dir is not None:
+        raise ValueError('backfill writes full products; run without checkpoint_dir')
+    if config.warmup_tolerance is not None:
+        raise ValueError('backfill starts at the first session; run without warmup_tolerance')
+    profiler = enable_profiling() if config.profile else None
+    try:
+        chunk_dir = os.path.join(config.output_dir, 'chunks')
+        os.makedirs(chunk_dir, exist_ok=True)
+        if progress_path is None:
+            progress_path = os.path.join(config.output_dir, 'backfill_progress.json')
+        progress = BackfillProgress(progress_path, config)
+
+        chunks = session_chunks(config.start, config.end)
+        pending = [(s, e) for s, e in chunks if not progress.done(s, e)]
+        fetched, failed = [], {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_run_chunk, client, config, s, e, chunk_dir, progress, retries,
+                            backoff, sleep): s
+                for s, e in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    fetched.append(future.result())
+                except Exception as exc:
+                    if not is_transient(exc):
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    failed[chunk_key(futures[future])] = exc
+        if failed:
+            first = min(failed)
+            raise RuntimeError(f'{len(failed)} of {len(pending)} chunks failed (first {first}: '
+                               f'{failed[first]!r}); rerun to resume') from failed[first]
+
+        base_ns = base_freq(config.timeframes).value
+        result = {'bars': {}, 'paths': [], 'profiler': profiler, 'warmup': None,
+                  'fetched': sorted(fetched)}
+        for symbol in config.symbols:
+            bars = stitch_chunks(progress, symbol, chunks)
+            if bars is None:
+                continue
+            pyramid = result['bars'].setdefault(symbol, {})
+            for tf in config.timeframes:
+                label = timeframe_label(tf)
+                tf_bars = bars if pd.Timedelta(tf).value == base_ns else rollup_bars(bars, tf)
+                pyramid[label] = tf_bars
+                result['paths'] += write_products(tf_bars, symbol, label, config)
+                if config.grid:
+                    result['paths'] += write_grid(tf_bars, symbol, label, config)
+    finally:
+        if profiler is not None:
+            disable_profiling()
+    return result
@@ -0,0 +1,224 @@
+"""
+Time-bar construction from normalized trades.
+
+Bars are built in one sorted-segment reduction: trades are keyed by their
+bucket, segment starts are found with a single diff, and every OHLCV and
+CVD OHLC column is a ``ufunc.reduceat`` over those segments. There are no
+per-group Python callbacks, so the cost is linear in the number of trades.
+"""
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+BAR_COLUMNS = [
+    'open', 'high', 'low', 'close', 'volume', 'delta',
+    'cvd_open', 'cvd_high', 'cvd_low', 'cvd_close',
+]
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+CVD_COLUMNS = ('cvd_open', 'cvd_high', 'cvd_low', 'cvd_close')
+
+# How each bar column combines when consecutive bars are merged
+BAR_ROLLUP = {
+    'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+    'volume': 'sum', 'delta': 'sum',
+    'cvd_open': 'first', 'cvd_high': 'max', 'cvd_low': 'min', 'cvd_close': 'last',
+}
+
+
+def timestamps_ns(ts):
+    """Return UTC event timestamps as int64 nanoseconds"""
+    if isinstance(ts, (pd.Series, pd.Index)):
+        return ts.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    ts = np.asarray(ts)
+    if ts.dtype.kind == 'M':
+        return ts.astype('datetime64[ns]').view(np.int64)
+    return ts.astype(np.int64, copy=False)
+
+
+def segment_starts(keys):
+    """Offsets where a run of equal (sorted) keys begins"""
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    change = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    return np.concatenate(([0], change))
+
+
+def empty_bar_columns(price_dtype=np.float64):
+    """Zero-length bar columns with the usual dtypes"""
+    return {
+        name: np.empty(0, dtype=price_dtype if name in PRICE_COLUMNS else np.int64)
+        for name in BAR_COLUMNS
+    }
+
+
+def ohlc_segments(starts, values, ends=None):
+    """Open, high, low and close of ``values`` over each segment"""
+    if ends is None:
+        ends = np.append(starts[1:], len(values)) - 1
+    return (
+        values[starts],
+        np.maximum.reduceat(values, starts),
+        np.minimum.reduceat(values, starts),
+        values[ends],
+    )
+
+
+def reduce_segments(starts, price, size, delta, running_cvd):
+    """
+    Reduce contiguous trade segments to bar columns.
+
+    ``starts`` are the first trade offset of each bar; every segment runs to
+    the next start. Returns a dict keyed by ``BAR_COLUMNS``.
+    """
+    if len(starts) == 0:
+        return empty_bar_columns(price.dtype)
+    ends = np.append(starts[1:], len(price)) - 1
+    columns = dict(zip(PRICE_COLUMNS, ohlc_segments(starts, price, ends)))
+    columns['volume'] = np.add.reduceat(size.astype(np.int64, copy=False), starts)
+    columns['delta'] = np.add.reduceat(delta, starts)
+    columns.update(zip(CVD_COLUMNS, ohlc_segments(starts, running_cvd, ends)))
+    return columns
+
+
+def rollup_segments(starts, columns):
+    """
+    Merge runs of consecutive bars into one bar each.
+
+    ``starts`` are the first bar offset of each merged bar and ``columns``
+    is a dict keyed by ``BAR_COLUMNS``. Merging is exact: it gives the same
+    bar as aggregating the underlying trades directly.
+    """
+    if len(starts) == 0:
+        return {name: columns[name][:0] for name in BAR_COLUMNS}
+    ends = np.append(starts[1:], len(columns['open'])) - 1
+    reducers = {
+        'first': lambda values: values[starts],
+        'last': lambda values: values[ends],
+        'max': lambda values: np.maximum.reduceat(values, starts),
+        'min': lambda values: np.minimum.reduceat(values, starts),
+        'sum': lambda values: np.add.reduceat(values, starts),
+    }
+    return {name: reducers[BAR_ROLLUP[name]](columns[name]) for name in BAR_COLUMNS}
+
+
+def bucket_trades(ts_ns, freq_ns):
+    """
+    Bucket keys for each trade plus the stable order that sorts them.
+
+    ``order`` is None when the trades are already in bucket order, which is
+    the normal case for a DBN pull, so no copy is made.
+    """
+    keys = ts_ns // freq_ns
+    if len(keys) > 1 and not np.all(keys[1:] >= keys[:-1]):
+        # Late ts_event prints: sort by bucket but keep arrival order within
+        # a bucket, like groupby does
+        order = np.argsort(keys, kind='stable')
+        return keys[order], order
+    return keys, None
+
+
+def bars_from_arrays(ts_ns, price, size, delta, running_cvd, freq='1min'):
+    """Build time bars from trade arrays; returns (bucket_start_ns, columns)"""
+    freq_ns = pd.Timedelta(freq).value
+    with stage('bucket', len(ts_ns)) as record:
+        keys, order = bucket_trades(ts_ns, freq_ns)
+        if order is not None:
+            price, size, delta, running_cvd = (
+                price[order], size[order], delta[order], running_cvd[order]
+            )
+        starts = segment_starts(keys)
+        record.rows_out = len(starts)
+    with stage('aggregate', len(ts_ns)) as record:
+        columns = reduce_segments(starts, price, size, delta, running_cvd)
+        record.rows_out = len(starts)
+    return keys[starts] * freq_ns, columns
+
+
+def bars_frame(bucket_ns, columns, index_name='minute_bucket'):
+    """Wrap bar columns in a frame indexed by UTC bucket start"""
+    index = pd.DatetimeIndex(pd.to_datetime(bucket_ns, utc=True), name=index_name)
+    return pd.DataFrame({name: columns[name] for name in BAR_COLUMNS}, index=index)
+
+
+def build_bars(df_trades, freq='1min', cvd_col='running_cvd'):
+    """
+    Build OHLCV + delta + CVD OHLC bars from a normalized trades frame.
+
+    Produces the same ``bars`` frame as the groupby/apply/join sequence in
+    1min.py: indexed by ``minute_bucket`` with columns ``BAR_COLUMNS``.
+    """
+    bucket_ns, columns = bars_from_arrays(
+        timestamps_ns(df_trades['ts_event']),
+        df_trades['price'].to_numpy(),
+        df_trades['size'].to_numpy(),
+        df_trades['delta'].to_numpy(),
+        df_trades[cvd_col].to_numpy(),
+        freq=freq,
+    )
+    return bars_frame(bucket_ns, columns)
+
+
+def rollup_bars(bars, freq):
+    """
+    Roll bars up to a coarser timeframe.
+
+    Exact when ``freq`` is a whole multiple of the input bar size: each
+    coarse bar is the same as one aggregated from the trades directly.
+    """
+    freq_ns = pd.Timedelta(freq).value
+    keys = timestamps_ns(bars.index) // freq_ns
+    starts = segment_starts(keys)
+    columns = {name: bars[name].to_numpy() for name in BAR_COLUMNS}
+    return bars_frame(keys[starts] * freq_ns, rollup_segments(starts, columns),
+                      index_name=bars.index.name)
+
+
+def join_bars(parts, freq, cvd_offset=0):
+    """
+    Bars of consecutive pulls (in time order) joined as if from one pull:
+    each part's CVD continues from the parts before it, the first from
+    ``cvd_offset``, and a bar split across two pulls is rolled back into one.
+    """
+    shifted, cvd = [], cvd_offset
+    for part in parts:
+        if len(part) == 0:
+            continue
+        part = part.copy()
+        for name in CVD_COLUMNS:
+            part[name] += cvd
+        cvd += int(part['delta'].sum())
+        shifted.append(part)
+    if not shifted:
+        return parts[-1]
+    bars = pd.concat(shifted)
+    if bars.index.has_duplicates:
+        bars = rollup_bars(bars, freq)
+    return bars
+
+
+def timeframe_label(freq):
+    """File-name friendly label for a bar size: '1min', '15min', '4h', '30s'"""
+    td = pd.Timedelta(freq)
+    if td % pd.Timedelta('1h') == pd.Timedelta(0):
+        return f'{td // pd.Timedelta("1h")}h'
+    if td % pd.Timedelta('1min') == pd.Timedelta(0):
+        return f'{td // pd.Timedelta("1min")}min'
+    return f'{td.total_seconds():g}s'
+
+
+def build_timeframes(df_trades, timeframes=('1min',), cvd_col='running_cvd'):
+    """
+    Build bars for several timeframes from one pass over the trades.
+
+    Trades are reduced once to the finest common bar size (the gcd of the
+    timeframes, 1 minute for the usual 1/3/5/15 minute pyramid) and every
+    timeframe is rolled up from those bars. Returns {label: bars}.
+    """
+    sizes = [pd.Timedelta(tf).value for tf in timeframes]
+    base_ns = int(np.gcd.reduce(np.array(sizes, dtype=np.int64)))
+    base = build_bars(df_trades, freq=pd.Timedelta(base_ns), cvd_col=cvd_col)
+    return {
+        timeframe_label(tf): base if size == base_ns else rollup_bars(base, size)
+        for tf, size in zip(timeframes, sizes)
+    }
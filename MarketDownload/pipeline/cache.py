@@ -0,0 +1,371 @@
+"""
+Local on-disk cache for Databento ``timeseries.get_range`` pulls.
+
+``CachedHistorical`` wraps a ``db.Historical`` client and keeps the same
+``client.timeseries.get_range(...)`` call shape, so scripts only change the
+line that builds the client. Each pull is stored as a DBN file named by the
+hash of (dataset, symbols, schema, stype_in, start, end, extra arguments).
+A request is served from the cached pulls that overlap it, each trimmed to
+its share of the window, and only the uncovered gaps are downloaded (and
+cached in turn); the pieces are stitched back in time order. Pulls made
+with extra arguments (``limit`` and the like) are only reused by the same
+request. Entries are evicted by age and then least-recently-used until
+under the size budget.
+
+Several scripts can share one cache directory: ``index.json`` is only read
+and rewritten under an exclusive lock on ``index.lock`` (``fcntl.flock``;
+on platforms without it only threads of one process are serialised). A
+pull leases the entries it plans to use or downloads until it has opened
+them, and eviction skips leased entries; an entry that disappears anyway
+(a lease older than ``LEASE_SECONDS``, a hand-cleaned cache) is downloaded
+again.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'index.lock'
+# A lease older than this is treated as left behind by a crashed pull
+LEASE_SECONDS = 6 * 3600
+ALL_SYMBOLS = 'ALL_SYMBOLS'
+
+
+def _open_dbn(path):
+    import databento as db
+    return db.DBNStore.from_file(path)
+
+
+def _timestamp_ns(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return ts.value
+
+
+class RangeView:
+    """
+    A cached DBN store trimmed to ``[start_ns, end_ns)``.
+
+    Databento filters ``get_range`` on ``ts_recv`` for trades, so the same
+    field is used here. Unhandled attributes fall through to the store.
+    """
+
+    def __init__(self, store, start_ns, end_ns):
+        self._store = store
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+
+    def _in_range_df(self, df):
+        ts = df.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        return df[(ts >= self.start_ns) & (ts < self.end_ns)]
+
+    def _in_range_records(self, records):
+        ts = records['ts_recv'].astype(np.int64)
+        return records[(ts >= self.start_ns) & (ts < self.end_ns)]
+
+    def to_df(self, *args, **kwargs):
+        if kwargs.get('count') is not None:
+            return (self._in_range_df(df) for df in self._store.to_df(*args, **kwargs))
+        return self._in_range_df(self._store.to_df(*args, **kwargs))
+
+    def to_ndarray(self, *args, **kwargs):
+        if kwargs.get('count') is not None:
+            return (self._in_range_records(r) for r in self._store.to_ndarray(*args, **kwargs))
+        return self._in_range_records(self._store.to_ndarray(*args, **kwargs))
+
+    def __getattr__(self, name):
+        if name == '_store':
+            raise AttributeError(name)
+        return getattr(self._store, name)
+
+
+class StitchedView:
+    """
+    Consecutive pieces of one window (stores or ``RangeView``s over
+    disjoint ``ts_recv`` ranges, in time order) read back as one store.
+    """
+
+    def __init__(self, pieces):
+        self._pieces = pieces
+
+    def to_df(self, *args, **kwargs):
+        if kwargs.get('count') is not None:
+            return (df for piece in self._pieces for df in piece.to_df(*args, **kwargs))
+        return pd.concat([piece.to_df(*args, **kwargs) for piece in self._pieces])
+
+    def to_ndarray(self, *args, **kwargs):
+        if kwargs.get('count') is not None:
+            return (r for piece in self._pieces for r in piece.to_ndarray(*args, **kwargs))
+        return np.concatenate([piece.to_ndarray(*args, **kwargs) for piece in self._pieces])
+
+    def __getattr__(self, name):
+        if name == '_pieces':
+            raise AttributeError(name)
+        return getattr(self._pieces[0], name)
+
+
+class _CachedTimeseries:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def get_range(self, dataset, start, end=None, symbols=None, schema='trades',
+                  stype_in='raw_symbol', **kwargs):
+        return self._owner.get_range(dataset, start, end, symbols, schema, stype_in, **kwargs)
+
+
+class CachedHistorical:
+    """
+    Caching wrapper around a ``db.Historical`` client.
+
+    ``max_bytes`` caps the total size of cached files and ``max_age`` (seconds
+    or anything ``pd.Timedelta`` accepts) drops entries older than that.
+    ``open_store`` reads a cached file back (defaults to
+    ``db.DBNStore.from_file``), which lets a stub client stand in for
+    Databento with no network. Downloads go straight to the cache file
+    through ``get_range(path=...)``; a caller's own ``path`` is ignored.
+
+    Counters: ``hits`` (requests served from the cache alone), ``misses``
+    (requests that downloaded anything), ``partial`` (misses that also
+    reused cached pieces), ``fetches`` (gap downloads) and ``evictions``.
+    """
+
+    def __init__(self, client, cache_dir='.databento_cache', max_bytes=None, max_age=None,
+                 open_store=_open_dbn):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if isinstance(max_age, (int, float)):
+            max_age = pd.Timedelta(seconds=max_age)
+        self.max_age = None if max_age is None else pd.Timedelta(max_age).total_seconds()
+        self.open_store = open_store
+        self.timeseries = _CachedTimeseries(self)
+        self.hits = 0
+        self.misses = 0
+        self.partial = 0
+        self.fetches = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getattr__(self, name):
+        # Everything except timeseries.get_range goes straight to the client
+        if name == 'client':
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    # -- index --------------------------------------------------------------
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive use of the index, across threads and processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.cache_dir, LOCK_FILE), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _lease(entry, token, now):
+        entry.setdefault('leases', {})[token] = now
+
+    @staticmethod
+    def _leased(entry, now):
+        return any(now - t < LEASE_SECONDS for t in entry.get('leases', {}).values())
+
+    def _load_index(self):
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_index(self, index):
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+    @staticmethod
+    def cache_key(dataset, symbols, schema, stype_in, start_ns, end_ns, kwargs=None):
+        """Content address for one pull"""
+        parts = [dataset, ','.join(symbols), schema, stype_in, str(start_ns), str(end_ns)]
+        if kwargs:
+            parts.append(json.dumps(kwargs, sort_keys=True, default=str))
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+    def _plan(self, index, request, start_ns, end_ns):
+        """
+        Cover ``[start_ns, end_ns)`` with cached pulls: (start, end, key)
+        pieces in time order, key None for a gap to download. At each step
+        the cached pull reaching furthest (then the smallest) is used.
+        """
+        entries = [(key, e) for key, e in index.items()
+                   if all(e.get(field, {}) == value for field, value in request.items())]
+        if request['kwargs']:
+            # Truncating arguments: only the very same request can be reused
+            entries = [(k, e) for k, e in entries
+                       if e['start'] == start_ns and e['end'] == end_ns]
+        pieces, cursor = [], start_ns
+        while cursor < end_ns:
+            covering = [(k, e) for k, e in entries if e['start'] <= cursor < e['end']]
+            if covering:
+                key, entry = max(covering, key=lambda ke: (ke[1]['end'], -ke[1]['bytes']))
+                piece_end = min(entry['end'], end_ns)
+            else:
+                key = None
+                piece_end = min([e['start'] for _, e in entries
+                                 if cursor < e['start'] < end_ns], default=end_ns)
+            pieces.append((cursor, piece_end, key))
+            cursor = piece_end
+        return pieces
+
+    # -- public API ----------------------------------------------------------
+
+    def get_range(self, dataset, start, end, symbols, schema='trades', stype_in='raw_symbol',
+                  **kwargs):
+        with stage('fetch'):
+            return self._get_range(dataset, start, end, symbols, schema, stype_in, **kwargs)
+
+    def _get_range(self, dataset, start, end, symbols, schema, stype_in, **kwargs):
+        if end is None:
+            raise ValueError('CachedHistorical needs an explicit end to key the cache')
+        kwargs.pop('path', None)
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        symbols = [ALL_SYMBOLS] if symbols is None else sorted(symbols)
+        start_ns, end_ns = _timestamp_ns(start), _timestamp_ns(end)
+        request = {'dataset': dataset, 'symbols': symbols, 'schema': schema,
+                   'stype_in': stype_in, 'kwargs': kwargs}
+
+        # Plan and lease the cached pieces so no other pull evicts them
+        token = uuid.uuid4().hex
+        with self._locked():
+            index = self._load_index()
+            pieces = self._plan(index, request, start_ns, end_ns)
+            now = time.time()
+            for _, _, key in pieces:
+                if key is not None:
+                    index[key]['last_used'] = now
+                    self._lease(index[key], token, now)
+            if all(key is not None for _, _, key in pieces):
+                self.hits += 1
+            else:
+                self.misses += 1
+                if any(key is not None for _, _, key in pieces):
+                    self.partial += 1
+            self._save_index(index)
+
+        try:
+            while True:
+                # Download the gaps (whole requests keep the caller's start / end)
+                pieces = [(s, e, key if key is not None else self._fetch(
+                              request, s, e, start if s == start_ns else s,
+                              end if e == end_ns else e, token))
+                          for s, e, key in pieces]
+
+                with self._locked():
+                    index = self._load_index()
+                    self._evict(index)
+                    self._save_index(index)
+                    if all(key in index for _, _, key in pieces):
+                        entries = [index[key] for _, _, key in pieces]
+                        break
+                # A planned entry went missing after all: download it again
+                pieces = [(s, e, key if key in index else None) for s, e, key in pieces]
+
+            stores = []
+            for (s, e, _), entry in zip(pieces, entries):
+                store = self.open_store(os.path.join(self.cache_dir, entry['file']))
+                if entry['start'] != s or entry['end'] != e:
+                    store = RangeView(store, s, e)
+                stores.append(store)
+        finally:
+            with self._locked():
+                index = self._load_index()
+                for entry in index.values():
+                    entry.get('leases', {}).pop(token, None)
+                self._save_index(index)
+        return stores[0] if len(stores) == 1 else StitchedView(stores)
+
+    def _fetch(self, request, start_ns, end_ns, start, end, token):
+        """Download ``[start, end)`` into the cache, leased to ``token``; returns its key"""
+        if isinstance(start, (int, np.integer)):
+            start = pd.Timestamp(start, tz='UTC').isoformat()
+        if isinstance(end, (int, np.integer)):
+            end = pd.Timestamp(end, tz='UTC').isoformat()
+        symbols = request['symbols']
+        key = self.cache_key(request['dataset'], symbols, request['schema'], request['stype_in'],
+                             start_ns, end_ns, request['kwargs'])
+        filename = f'{key}.dbn'
+        path = os.path.join(self.cache_dir, filename)
+        self.client.timeseries.get_range(
+            dataset=request['dataset'], symbols=None if symbols == [ALL_SYMBOLS] else symbols,
+            schema=request['schema'], start=start, end=end, stype_in=request['stype_in'],
+            path=path + '.part', **request['kwargs']
+        )
+        os.replace(path + '.part', path)
+
+        now = time.time()
+        with self._locked():
+            self.fetches += 1
+            index = self._load_index()
+            index[key] = dict(request, start=start_ns, end=end_ns, file=filename,
+                              bytes=os.path.getsize(path), created=now, last_used=now)
+            self._lease(index[key], token, now)
+            self._save_index(index)
+        return key
+
+    def evict(self):
+        """Apply the age and size limits now"""
+        with self._locked():
+            index = self._load_index()
+            self._evict(index)
+            self._save_index(index)
+
+    def _evict(self, index):
+        """Drop expired, then least recently used entries; leased ones stay"""
+        now = time.time()
+        if self.max_age is not None:
+            for key in [k for k, e in index.items() if now - e['created'] > self.max_age]:
+                if not self._leased(index[key], now):
+                    self._drop(index, key)
+        if self.max_bytes is not None:
+            total = sum(e['bytes'] for e in index.values())
+            for key in sorted(index, key=lambda k: index[k]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                if not self._leased(index[key], now):
+                    total -= index[key]['bytes']
+                    self._drop(index, key)
+
+    def _drop(self, index, key):
+        entry = index.pop(key)
+        self.evictions += 1
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,127 @@
+"""
+Per-bar trade offsets for drilling into any bar's trades.
+
+``TradeIndex`` builds the bars and, alongside them, the ``[start, end)``
+row offsets of each bar's trades in the bucket-sorted trade table. Looking
+up a bar is a binary search on bar start times, and its trades, side
+volumes and intra-bar CVD path are slices of the trade arrays (numpy views,
+no copies), instead of a full ``df_trades[df_trades['minute_bucket'] == m]``
+scan per lookup.
+"""
+import numpy as np
+import pandas as pd
+
+from .bars import bars_frame, bucket_trades, reduce_segments, segment_starts, timestamps_ns
+from .trades import side_sign
+
+SIDE_VOLUME_COLUMNS = ['buy_volume', 'sell_volume', 'neutral_volume']
+
+
+class TradeIndex:
+    """
+    Bars plus the trade offsets behind each one.
+
+    Works on a normalized trades frame (``delta`` and ``cvd_col`` present) or
+    a raw / compact one (delta and running CVD are computed from ``side`` or
+    ``sign``). When prints arrive out of bucket order the trades are
+    stable-sorted once; ``table`` is then the sorted frame.
+    """
+
+    def __init__(self, df_trades, freq='1min', cvd_col='running_cvd'):
+        self.freq_ns = pd.Timedelta(freq).value
+        ts_ns = timestamps_ns(df_trades['ts_event'])
+        keys, order = bucket_trades(ts_ns, self.freq_ns)
+        if order is not None:
+            df_trades = df_trades.take(order)
+            ts_ns = ts_ns[order]
+        self.table = df_trades
+
+        self.ts_ns = ts_ns
+        self.price = df_trades['price'].to_numpy()
+        self.size = df_trades['size'].to_numpy().astype(np.int64, copy=False)
+        if 'sign' in df_trades:
+            self.sign = df_trades['sign'].to_numpy()
+        else:
+            self.sign = side_sign(df_trades['side'])
+        if 'delta' in df_trades and cvd_col in df_trades:
+            self.delta = df_trades['delta'].to_numpy()
+            self.running_cvd = df_trades[cvd_col].to_numpy()
+        else:
+            # Arrival order for the CVD, then the same bucket order as the rest
+            self.delta = self.sign * self.size
+            cvd = self.delta if order is None else self.delta[np.argsort(order)]
+            cvd = np.cumsum(cvd)
+            self.running_cvd = cvd if order is None else cvd[order]
+
+        self.starts = segment_starts(keys)
+        self.ends = np.append(self.starts[1:], len(keys)).astype(np.int64)
+        self.bucket_ns = keys[self.starts] * self.freq_ns
+        self.bars = bars_frame(self.bucket_ns, reduce_segments(
+            self.starts, self.price, self.size, self.delta, self.running_cvd
+        ))
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def offsets(self):
+        """Frame of ``trade_start`` / ``trade_end`` per bar, on the bars' index"""
+        return pd.DataFrame({'trade_start': self.starts, 'trade_end': self.ends},
+                            index=self.bars.index)
+
+    def position(self, bar):
+        """Bar position from an int (negative allowed) or a bar start time"""
+        if isinstance(bar, (int, np.integer)):
+            return range(len(self))[bar]
+        ts = pd.Timestamp(bar)
+        if ts.tzinfo is None:
+            ts = ts.tz_localize('UTC')
+        i = int(np.searchsorted(self.bucket_ns, ts.value))
+        if i == len(self) or self.bucket_ns[i] != ts.value:
+            raise KeyError(f'no bar starting at {ts}')
+        return i
+
+    def span(self, bar):
+        """``slice`` of the bar's trades in the (sorted) trade table"""
+        i = self.position(bar)
+        return slice(int(self.starts[i]), int(self.ends[i]))
+
+    def trades(self, bar):
+        """The bar's rows of the trade frame (a positional slice)"""
+        return self.table.iloc[self.span(bar)]
+
+    def arrays(self, bar):
+        """The bar's ts_ns, price, size, sign, delta and running_cvd as views"""
+        s = self.span(bar)
+        return {
+            'ts_ns': self.ts_ns[s], 'price': self.price[s], 'size': self.size[s],
+            'sign': self.sign[s], 'delta': self.delta[s], 'running_cvd': self.running_cvd[s],
+        }
+
+    def cvd_path(self, bar):
+        """Running CVD after each of the bar's trades (a view)"""
+        return self.running_cvd[self.span(bar)]
+
+    def side_volume(self, bar=None):
+        """
+        Buy (B), sell (A) and neutral (N) volume.
+
+        For one bar returns a dict; with no bar, a frame for every bar from
+        three segment sums.
+        """
+        if bar is not None:
+            s = self.span(bar)
+            size, sign = self.size[s], self.sign[s]
+            return {
+                'buy_volume': int(size[sign > 0].sum()),
+                'sell_volume': int(size[sign < 0].sum()),
+                'neutral_volume': int(size[sign == 0].sum()),
+            }
+        if len(self) == 0:
+            return pd.DataFrame(columns=SIDE_VOLUME_COLUMNS, index=self.bars.index, dtype=np.int64)
+        columns = {
+            name: np.add.reduceat(np.where(mask, self.size, 0), self.starts)
+            for name, mask in zip(SIDE_VOLUME_COLUMNS,
+                                  (self.sign > 0, self.sign < 0, self.sign == 0))
+        }
+        return pd.DataFrame(columns, index=self.bars.index)
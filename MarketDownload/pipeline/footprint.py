@@ -0,0 +1,143 @@
+"""
+Footprint (volume at price) per bar, split by aggressor side.
+
+Every trade gets an integer tick index (price / tick size, or fixed-point
+price // fixed tick for compact tables). Each bar owns a dense run of cells
+covering its own low..high ticks, laid end to end for the whole session,
+so one ``bincount`` per side fills every bar's histogram at once, with no
+sort and no per-bar loop. Empty cells are then dropped, leaving a sparse
+CSR-style layout: ``levels`` holds one row per traded (bar, price) and
+``level_starts`` / ``level_ends`` give each bar's rows as a slice.
+
+Per bar there is also the POC (highest-volume price, lowest price on ties)
+and a 70% value area: a contiguous price range grown outward from the POC,
+one step at a time adding whichever adjacent level (above or below) holds
+more volume, both on a tie, until it holds ``value_area`` of the bar's
+volume. VAH/VAL are its top and bottom. All bars grow together, so the
+loop runs once per price level of the widest bar.
+"""
+import numpy as np
+import pandas as pd
+
+from .compact import PRICE_SCALE
+from .drilldown import SIDE_VOLUME_COLUMNS
+
+MES_TICK_SIZE = 0.25
+VALUE_AREA = 0.70
+
+
+def tick_index(price, tick_size=MES_TICK_SIZE):
+    """Integer tick of each price (fixed-point int64 prices use the 1e9 scale)"""
+    if price.dtype.kind in 'iu':
+        return price // int(round(tick_size * PRICE_SCALE))
+    return np.rint(price / tick_size).astype(np.int64)
+
+
+class Footprint:
+    """
+    Sparse per-bar volume-at-price.
+
+    ``levels``: timestamp (bar start), price, buy_volume (B), sell_volume (A),
+    neutral_volume (N), one row per traded price, bar by bar, low to high.
+    ``summary``: per bar poc, poc_volume, vah, val and the number of levels.
+    """
+
+    def __init__(self, levels, level_starts, level_ends, summary):
+        self.levels = levels
+        self.level_starts = level_starts
+        self.level_ends = level_ends
+        self.summary = summary
+
+    def __len__(self):
+        return len(self.level_starts)
+
+    def bar(self, i):
+        """Levels of the ``i``-th bar (a positional slice of ``levels``)"""
+        return self.levels.iloc[self.level_starts[i]:self.level_ends[i]]
+
+
+def footprint(index, tick_size=MES_TICK_SIZE, value_area=VALUE_AREA):
+    """Footprint of every bar in a ``TradeIndex``"""
+    n_bars = len(index)
+    ticks = tick_index(index.price, tick_size)
+    lengths = index.ends - index.starts
+    trade_bar = np.repeat(np.arange(n_bars), lengths)
+
+    # Dense cells per bar: low..high ticks, bars laid end to end
+    if n_bars:
+        low = np.minimum.reduceat(ticks, index.starts)
+        high = np.maximum.reduceat(ticks, index.starts)
+    else:
+        low = high = np.empty(0, dtype=np.int64)
+    span = high - low + 1
+    cell_base = np.concatenate(([0], np.cumsum(span)[:-1])).astype(np.int64)
+    n_cells = int(span.sum())
+    cell = cell_base[trade_bar] + ticks - low[trade_bar]
+
+    size = index.size
+    sign = index.sign
+    volume = {
+        name: np.bincount(cell, weights=np.where(mask, size, 0), minlength=n_cells).astype(np.int64)
+        for name, mask in zip(SIDE_VOLUME_COLUMNS, (sign > 0, sign < 0, sign == 0))
+    }
+    total = volume['buy_volume'] + volume['sell_volume'] + volume['neutral_volume']
+    cell_bar = np.repeat(np.arange(n_bars), span)
+    cell_tick = np.arange(n_cells) - np.repeat(cell_base, span) + np.repeat(low, span)
+
+    summary = _summary(total, cell_bar, cell_tick, cell_base, span, tick_size, value_area,
+                       index.bars.index)
+
+    # Sparse layout: keep traded cells only
+    traded = total > 0
+    kept_bar = cell_bar[traded]
+    counts = np.bincount(kept_bar, minlength=n_bars)
+    level_ends = np.cumsum(counts)
+    level_starts = level_ends - counts
+    levels = pd.DataFrame({
+        'timestamp': index.bars.index[kept_bar],
+        'price': cell_tick[traded] * tick_size,
+        **{name: volume[name][traded] for name in SIDE_VOLUME_COLUMNS},
+    })
+    summary['levels'] = counts
+    return Footprint(levels, level_starts, level_ends, summary)
+
+
+def _summary(total, cell_bar, cell_tick, cell_base, span, tick_size, value_area, bar_index):
+    """POC, VAH and VAL per bar from the dense cells"""
+    n_bars = len(span)
+    if n_bars == 0:
+        return pd.DataFrame({c: np.empty(0) for c in ('poc', 'poc_volume', 'vah', 'val')},
+                            index=bar_index)
+    cell_ids = np.arange(len(total))
+
+    # POC: first (lowest) cell holding the bar's max volume
+    poc_volume = np.maximum.reduceat(total, cell_base)
+    is_max = total == poc_volume[cell_bar]
+    poc_cell = np.minimum.reduceat(np.where(is_max, cell_ids, len(total)), cell_base)
+    poc_tick = cell_tick[poc_cell]
+
+    # Value area: grow [val, vah] (cell ids) from the POC, adding the
+    # larger neighbouring level (both on a tie) until value_area is covered
+    needed = value_area * np.add.reduceat(total, cell_base)
+    last = cell_base + span - 1
+    val = poc_cell.copy()
+    vah = poc_cell.copy()
+    covered = poc_volume.copy()
+    growing = np.flatnonzero(covered < needed)
+    while len(growing):
+        lo, hi = val[growing], vah[growing]
+        below = np.where(lo > cell_base[growing], total[np.maximum(lo - 1, 0)], -1)
+        above = np.where(hi < last[growing], total[np.minimum(hi + 1, len(total) - 1)], -1)
+        take_below = below >= above
+        take_above = above >= below
+        val[growing] = lo - take_below
+        vah[growing] = hi + take_above
+        covered[growing] += np.where(take_below, below, 0) + np.where(take_above, above, 0)
+        growing = growing[covered[growing] < needed[growing]]
+
+    return pd.DataFrame({
+        'poc': poc_tick * tick_size,
+        'poc_volume': poc_volume,
+        'vah': cell_tick[vah] * tick_size,
+        'val': cell_tick[val] * tick_size,
+    }, index=bar_index)
@@ -0,0 +1,155 @@
+"""
+Indicator parameter grids: many EMA spans and ADX periods in one pass.
+
+Sweeping ``EMA_PERIODS`` / ``ADX_PERIOD`` used to mean editing a script and
+re-running the whole download per setting. ``indicator_grid`` takes one set
+of bars and any lists of spans and periods (hundreds are fine) and runs a
+single time loop in which every series advances together as one vector:
+
+- each EMA source x span is a column of one ewm state vector
+- TR, +DM and -DM do not depend on the period, so they are computed once
+  and smoothed for every period side by side, then DX -> ADX is a second
+  vector of ewm states
+
+The per-step update is ``EwmState.update`` (pandas' ``adjust=False`` kernel)
+written with array ops, so every column is bit-identical to
+``compute_indicators`` with that span or period.
+
+The result is columnar (one column per indicator and parameter, like the
+CSVs); ``grid_long`` reshapes it to long (timestamp, indicator, param,
+value) rows for sweeps that filter or group by parameter.
+"""
+import numpy as np
+import pandas as pd
+
+from .indicators import ADX_COLUMNS, ADX_PERIOD, EMA_PERIODS, EMA_SOURCES
+from .profiling import stage
+
+ADX_FIELDS = ('+di', '-di', 'adx')
+
+
+def ewm_alphas(spans=None, alphas=None):
+    """Smoothing factors exactly as ``EwmState`` derives them"""
+    if spans is not None:
+        com = (np.asarray(spans, dtype=np.float64) - 1) / 2
+    else:
+        alphas = np.asarray(alphas, dtype=np.float64)
+        com = (1 - alphas) / alphas
+    return 1. / (1. + com)
+
+
+def ewm_grid(values, alpha):
+    """
+    ``ewm(adjust=False).mean()`` of each column of ``values`` (bars x k)
+    with its own ``alpha`` (k,), all columns per step at once.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), values.shape[1:])
+    decay = 1. - alpha
+    value = np.full(values.shape[1:], np.nan)
+    old_wt = np.ones(values.shape[1:])
+
+    # Full NaN-aware steps up to the last row holding a NaN (usually just
+    # the leading rows), then every column is live and old_wt is always
+    # ``decay`` so a step is a handful of in-place ops
+    nan_rows = np.flatnonzero(np.isnan(values).any(axis=1))
+    general = nan_rows[-1] + 2 if len(nan_rows) else 1
+    for i, x in enumerate(values[:general]):
+        seen = value == value
+        observed = x == x
+        old_wt = np.where(seen, old_wt * decay, old_wt)
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * value + alpha * x) / (old_wt + alpha)
+        value = np.where(seen, np.where(observed & (value != x), blended, value),
+                         np.where(observed, x, value))
+        old_wt = np.where(seen & observed, 1., old_wt)
+        out[i] = value
+
+    weighted_x = values * alpha
+    denom = decay + alpha
+    blended = np.empty_like(value)
+    for i in range(general, len(values)):
+        np.multiply(decay, value, out=blended)
+        blended += weighted_x[i]
+        blended /= denom
+        value = np.where(value != values[i], blended, value)
+        out[i] = value
+    return out
+
+
+def adx_grid(high, low, close, periods=(ADX_PERIOD,)):
+    """+DI, -DI and ADX (each bars x periods) for every Wilder period"""
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    prev_high = np.concatenate(([np.nan], high[:-1]))
+    prev_low = np.concatenate(([np.nan], low[:-1]))
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    up = high - prev_high
+    down = prev_low - low
+    plus_dm = np.where((up > down) & (up > 0), up, 0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0)
+
+    # TR, +DM, -DM side by side for every period
+    n = len(periods)
+    alpha = ewm_alphas(alphas=1 / np.asarray(periods, dtype=np.float64))
+    raw = np.repeat(np.column_stack([tr, plus_dm, minus_dm]).astype(np.float64), n, axis=1)
+    smooth = ewm_grid(raw, np.tile(alpha, 3))
+    atr, plus_smooth, minus_smooth = smooth[:, :n], smooth[:, n:2 * n], smooth[:, 2 * n:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * plus_smooth / atr
+        minus_di = 100 * minus_smooth / atr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return plus_di, minus_di, ewm_grid(dx, alpha)
+
+
+def grid_columns(spans=EMA_PERIODS, periods=(ADX_PERIOD,), ema_sources=EMA_SOURCES):
+    """Column names: +DI/-DI/ADX by period, then EMAs by source and span"""
+    columns = [f'{field}_{p}' for field in ADX_FIELDS for p in periods]
+    for prefix in ema_sources.values():
+        columns.extend(f'{prefix}_{span}' for span in spans)
+    return columns
+
+
+def indicator_grid(bars, spans=EMA_PERIODS, periods=(ADX_PERIOD,), ema_sources=EMA_SOURCES,
+                   adx_columns=ADX_COLUMNS):
+    """
+    Every EMA span (for each of ``ema_sources``) and every ADX period from
+    one set of bars; returns a frame on ``bars.index`` with the columns from
+    ``grid_columns``. Pass an empty list to skip EMAs or ADX.
+    """
+    spans, periods = list(spans), list(periods)
+    blocks = []
+    if periods:
+        with stage('adx', len(bars)) as record:
+            high, low, close = (bars[c].to_numpy(dtype=np.float64) for c in adx_columns)
+            blocks.extend(adx_grid(high, low, close, periods))
+            record.rows_out = len(bars)
+    if spans:
+        with stage('ema', len(bars)) as record:
+            sources = np.column_stack([bars[c].to_numpy(dtype=np.float64) for c in ema_sources])
+            # Columns grouped by source, then span
+            blocks.append(ewm_grid(np.repeat(sources, len(spans), axis=1),
+                                   np.tile(ewm_alphas(spans), len(ema_sources))))
+            record.rows_out = len(bars)
+    values = np.hstack(blocks) if blocks else np.empty((len(bars), 0))
+    return pd.DataFrame(values, index=bars.index,
+                        columns=grid_columns(spans, periods, ema_sources))
+
+
+def grid_long(grid, time_col='timestamp'):
+    """
+    Long layout of an ``indicator_grid`` frame: one row per (bar, column),
+    time-major, with ``indicator`` (categorical) and ``param`` split from
+    the column name.
+    """
+    names = [c.rsplit('_', 1) for c in grid.columns]
+    codes, categories = pd.factorize(pd.Index([name for name, _ in names]))
+    param = np.array([int(p) for _, p in names], dtype=np.int32)
+    n_bars, n_cols = grid.shape
+    return pd.DataFrame({
+        time_col: np.repeat(grid.index.to_numpy(), n_cols),
+        'indicator': pd.Categorical.from_codes(np.tile(codes, n_bars), categories),
+        'param': np.tile(param, n_bars),
+        'value': grid.to_numpy().ravel(),
+    })
@@ -0,0 +1,75 @@
+"""
+Heikin Ashi candles for any number of OHLC column sets at once.
+
+HA-Close = (Open + High + Low + Close) / 4
+HA-Open  = (Previous HA-Open + Previous HA-Close) / 2, seeded with (Open + Close) / 2
+HA-High  = Max(High, HA-Open, HA-Close)
+HA-Low   = Min(Low, HA-Open, HA-Close)
+
+The HA-Open recurrence is an exponential average with alpha = 1/2 over the
+previous HA-Close, so it runs through pandas' compiled ewm kernel for all
+column sets together instead of an ``iloc`` loop. Halving is exact in
+floating point, so each step rounds exactly like ``(a + b) / 2`` and the
+results are bit-identical to the loop.
+"""
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+# Output prefix -> (open, high, low, close) source columns
+HA_COLUMN_SETS = {
+    'ha': ('open', 'high', 'low', 'close'),
+    'ha_cvd': ('cvd_open', 'cvd_high', 'cvd_low', 'cvd_close'),
+}
+
+
+def _stack(df, column_sets, field):
+    return np.column_stack([df[cols[field]].to_numpy() for cols in column_sets.values()])
+
+
+def heikin_ashi_arrays(o, h, l, c, seed=None):
+    """
+    Heikin Ashi over 2-D (bars x series) OHLC arrays.
+
+    ``seed`` optionally carries the previous bar's (ha_open, ha_close) per
+    series so a run can continue where an earlier one stopped. Returns
+    (ha_open, ha_high, ha_low, ha_close).
+    """
+    ha_close = (o + h + l + c) / 4
+    if len(ha_close) == 0:
+        return ha_close, ha_close, ha_close, ha_close
+
+    if seed is None:
+        first_open = (o[0] + c[0]) / 2
+    else:
+        prev_open, prev_close = seed
+        first_open = (np.asarray(prev_open, dtype=np.float64)
+                      + np.asarray(prev_close, dtype=np.float64)) / 2
+    history = np.vstack([first_open, ha_close[:-1]])
+    ha_open = pd.DataFrame(history).ewm(alpha=0.5, adjust=False).mean().to_numpy()
+
+    ha_high = np.fmax(np.fmax(h, ha_open), ha_close)
+    ha_low = np.fmin(np.fmin(l, ha_open), ha_close)
+    return ha_open, ha_high, ha_low, ha_close
+
+
+def heikin_ashi(df, column_sets=HA_COLUMN_SETS, seed=None):
+    """
+    Compute Heikin Ashi candles for every column set in one pass.
+
+    Returns a frame on ``df.index`` with ``{prefix}_open/high/low/close``
+    for each prefix in ``column_sets``, grouped by prefix.
+    """
+    with stage('heikin_ashi', len(df)) as record:
+        arrays = heikin_ashi_arrays(
+            _stack(df, column_sets, 0), _stack(df, column_sets, 1),
+            _stack(df, column_sets, 2), _stack(df, column_sets, 3),
+            seed=seed,
+        )
+        out = {}
+        for j, prefix in enumerate(column_sets):
+            for field, values in zip(('open', 'high', 'low', 'close'), arrays):
+                out[f'{prefix}_{field}'] = values[:, j]
+        record.rows_out = len(df)
+    return pd.DataFrame(out, index=df.index)
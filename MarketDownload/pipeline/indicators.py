@@ -0,0 +1,112 @@
+"""
+EMA bank and Wilder ADX over contiguous bar arrays.
+
+``compute_indicators`` returns one (bars x indicators) block. The EMA bank
+is one pass of pandas' compiled ewm per span, covering every source column
+(close, cvd_close, ...) together, and the three Wilder series (TR, +DM, -DM)
+share a single pass, so there are no temporary frame columns. The ewm
+kernel is the same one the scripts used, so the values are identical.
+
+A single sweep over all spans at once (``grid.ewm_grid``) gives the same
+values bit for bit, but it steps through the bars in Python. It is ~10x
+slower once a run has more than a few thousand bars, so it is only used
+for wide parameter grids, where one pandas pass per span would cost more.
+
+Column names follow what the BackTester's readCSV.ts expects:
+``+di``, ``-di``, ``adx``, ``ema_{span}``, ``cvd_ema_{span}`` and the
+``ha_`` prefixed equivalents.
+"""
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+EMA_PERIODS = [8, 9, 13, 21, 22, 50, 100, 200]
+ADX_PERIOD = 14
+
+# Source column -> output prefix
+EMA_SOURCES = {'close': 'ema', 'cvd_close': 'cvd_ema'}
+HA_EMA_SOURCES = {'ha_close': 'ha_ema', 'ha_cvd_close': 'ha_cvd_ema'}
+
+ADX_COLUMNS = ('high', 'low', 'close')
+HA_ADX_COLUMNS = ('ha_high', 'ha_low', 'ha_close')
+
+
+def _ewm(values, **params):
+    return pd.DataFrame(values).ewm(adjust=False, **params).mean().to_numpy()
+
+
+def ema_bank(values, spans):
+    """
+    EMAs of ``values`` (bars x sources) for every span, as a bars x
+    sources*spans array grouped by source, then span.
+    """
+    n_spans = len(spans)
+    out = np.empty((len(values), values.shape[1] * n_spans))
+    for j, span in enumerate(spans):
+        out[:, j::n_spans] = _ewm(values, span=span)
+    return out
+
+
+def wilder_adx_into(out, high, low, close, period=ADX_PERIOD):
+    """Fill ``out`` (bars x 3) with +DI, -DI and ADX using Wilder smoothing"""
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    prev_high = np.concatenate(([np.nan], high[:-1]))
+    prev_low = np.concatenate(([np.nan], low[:-1]))
+
+    # True range; the first bar has no previous close so it is just high - low
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    # Directional movement
+    up = high - prev_high
+    down = prev_low - low
+    plus_dm = np.where((up > down) & (up > 0), up, 0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0)
+
+    # Smooth TR, +DM, -DM together (Wilder's smoothing = EMA with alpha = 1/period)
+    atr, plus_dm_smooth, minus_dm_smooth = _ewm(
+        np.column_stack([tr, plus_dm, minus_dm]), alpha=1 / period
+    ).T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * plus_dm_smooth / atr
+        minus_di = 100 * minus_dm_smooth / atr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+    out[:, 0] = plus_di
+    out[:, 1] = minus_di
+    out[:, 2] = _ewm(dx, alpha=1 / period)[:, 0]
+    return out
+
+
+def indicator_columns(ema_sources=EMA_SOURCES, spans=EMA_PERIODS, adx_prefix=''):
+    """Output column names in CSV order: ADX block, then EMAs by source"""
+    columns = [f'{adx_prefix}+di', f'{adx_prefix}-di', f'{adx_prefix}adx']
+    for prefix in ema_sources.values():
+        columns.extend(f'{prefix}_{span}' for span in spans)
+    return columns
+
+
+def compute_indicators(df, ema_sources=EMA_SOURCES, spans=EMA_PERIODS,
+                       adx_columns=ADX_COLUMNS, adx_prefix='', period=ADX_PERIOD):
+    """
+    Compute Wilder +DI/-DI/ADX and the full EMA bank for ``df``.
+
+    Returns a frame on ``df.index`` with the columns from
+    ``indicator_columns``; pass ``HA_EMA_SOURCES``, ``HA_ADX_COLUMNS`` and
+    ``adx_prefix='ha_'`` for Heikin Ashi bars.
+    """
+    columns = indicator_columns(ema_sources, spans, adx_prefix)
+    out = np.empty((len(df), len(columns)), dtype=np.float64)
+
+    with stage('adx', len(df)) as record:
+        high, low, close = (df[c].to_numpy(dtype=np.float64) for c in adx_columns)
+        wilder_adx_into(out[:, :3], high, low, close, period)
+        record.rows_out = len(df)
+
+    with stage('ema', len(df)) as record:
+        sources = np.column_stack([df[c].to_numpy(dtype=np.float64) for c in ema_sources])
+        out[:, 3:] = ema_bank(sources, spans)
+        record.rows_out = len(df)
+
+    return pd.DataFrame(out, index=df.index, columns=columns)
@@ -0,0 +1,343 @@
+"""
+Incremental live bar and indicator engine.
+
+Generalizes the hand-rolled ``prev_ema_21`` / ``prev_ema_50`` loop in
+downloadV3(Ema).py: trades go in one at a time (or as micro-batches), and
+constant-size state is kept for the open bar's OHLCV and CVD OHLC, the full
+EMA bank, Wilder ADX and Heikin Ashi. Each bar is emitted when a trade for a
+later bucket arrives (or on ``flush``), with the same columns and values as
+the batch scripts produce for it.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .bars import BAR_COLUMNS, bars_from_arrays, timestamps_ns
+from .indicators import ADX_PERIOD, EMA_PERIODS, EMA_SOURCES, HA_EMA_SOURCES
+from .trades import SIDE_SIGN, trade_delta
+
+HA_FIELDS = ('open', 'high', 'low', 'close')
+
+
+class EwmState:
+    """
+    One step of ``Series.ewm(..., adjust=False).mean()`` at a time.
+
+    Mirrors pandas' kernel operation for operation (including how NaN gaps
+    decay the old weight) so streamed values are bit-identical to batch ones.
+    """
+    __slots__ = ('alpha', 'decay', 'value', 'old_wt')
+
+    def __init__(self, span=None, alpha=None):
+        com = (span - 1) / 2 if span is not None else (1 - alpha) / alpha
+        self.alpha = 1. / (1. + com)
+        self.decay = 1. - self.alpha
+        self.value = math.nan
+        self.old_wt = 1.
+
+    def update(self, x):
+        value = self.value
+        if value == value:
+            self.old_wt *= self.decay
+            if x == x:
+                if value != x:
+                    self.value = (self.old_wt * value + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.
+        elif x == x:
+            self.value = x
+        return self.value
+
+    def state(self):
+        return [self.value, self.old_wt]
+
+    def load_state(self, state):
+        self.value, self.old_wt = state
+
+
+def _scalar(value):
+    # numpy scalars -> Python ints/floats so the state is JSON-friendly
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _div(a, b):
+    # IEEE division (inf / nan instead of ZeroDivisionError), like the arrays
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class WilderAdxState:
+    """Incremental +DI, -DI and ADX matching ``wilder_adx_into``"""
+
+    def __init__(self, period=ADX_PERIOD):
+        self.atr = EwmState(alpha=1 / period)
+        self.plus_dm = EwmState(alpha=1 / period)
+        self.minus_dm = EwmState(alpha=1 / period)
+        self.adx = EwmState(alpha=1 / period)
+        self.prev = None
+
+    def update(self, high, low, close):
+        if self.prev is None:
+            tr, plus_dm, minus_dm = high - low, 0., 0.
+        else:
+            prev_high, prev_low, prev_close = self.prev
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            up, down = high - prev_high, prev_low - low
+            plus_dm = up if up > down and up > 0 else 0.
+            minus_dm = down if down > up and down > 0 else 0.
+        self.prev = (high, low, close)
+
+        atr = self.atr.update(tr)
+        plus_di = _div(100 * self.plus_dm.update(plus_dm), atr)
+        minus_di = _div(100 * self.minus_dm.update(minus_dm), atr)
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        return plus_di, minus_di, self.adx.update(dx)
+
+    def state(self):
+        return {
+            'prev': self.prev,
+            'atr': self.atr.state(),
+            'plus_dm': self.plus_dm.state(),
+            'minus_dm': self.minus_dm.state(),
+            'adx': self.adx.state(),
+        }
+
+    def load_state(self, state):
+        self.prev = None if state['prev'] is None else tuple(state['prev'])
+        for name in ('atr', 'plus_dm', 'minus_dm', 'adx'):
+            getattr(self, name).load_state(state[name])
+
+
+class HeikinAshiState:
+    """Incremental Heikin Ashi for one OHLC series"""
+
+    def __init__(self):
+        self.prev = None
+
+    def update(self, o, h, l, c):
+        ha_close = (o + h + l + c) / 4
+        if self.prev is None:
+            ha_open = (o + c) / 2
+        else:
+            ha_open = (self.prev[0] + self.prev[1]) / 2
+        self.prev = (ha_open, ha_close)
+        return ha_open, max(h, ha_open, ha_close), min(l, ha_open, ha_close), ha_close
+
+    def state(self):
+        return self.prev
+
+    def load_state(self, state):
+        self.prev = None if state is None else tuple(state)
+
+
+class LiveBarEngine:
+    """
+    Streaming bar + indicator engine with O(1) work per trade.
+
+    ``on_trade`` / ``on_trades`` return the list of bars that closed (usually
+    empty); each bar is a dict with ``timestamp``, the raw bar columns, the
+    traditional indicators (``+di``, ``ema_8``, ``cvd_ema_8``, ...) and,
+    when ``heikin_ashi`` is on, the ``ha_*`` columns and HA indicators.
+
+    Trades are assumed to arrive in bucket order. A print stamped before the
+    open bar's bucket is counted in the open bar (``late_trades`` tracks how
+    often) since the earlier bar has already been published.
+    """
+
+    def __init__(self, freq='1min', spans=EMA_PERIODS, period=ADX_PERIOD, heikin_ashi=True,
+                 cvd_offset=0):
+        self.freq_ns = pd.Timedelta(freq).value
+        self.spans = list(spans)
+        self.period = period
+        self.heikin_ashi = heikin_ashi
+        self.cvd = cvd_offset
+        self.late_trades = 0
+        self.bar = None
+        self.bucket = None
+
+        self.adx = WilderAdxState(period)
+        self.emas = {src: [EwmState(span=s) for s in self.spans] for src in EMA_SOURCES}
+        if heikin_ashi:
+            self.ha_price = HeikinAshiState()
+            self.ha_cvd = HeikinAshiState()
+            self.ha_adx = WilderAdxState(period)
+            self.ha_emas = {src: [EwmState(span=s) for s in self.spans] for src in HA_EMA_SOURCES}
+
+    # -- trades ---------------------------------------------------------------
+
+    def on_trade(self, ts_ns, price, size, side):
+        """Add one trade; ``side`` is 'B'/'A'/'N' or its byte code"""
+        if isinstance(side, str):
+            side = ord(side) if side else 0
+        delta = int(SIDE_SIGN[side]) * int(size)
+        self.cvd += delta
+        cvd = self.cvd
+
+        closed = []
+        bucket = ts_ns // self.freq_ns
+        if self.bucket is not None and bucket < self.bucket:
+            self.late_trades += 1
+            bucket = self.bucket
+        if bucket != self.bucket:
+            if self.bar is not None:
+                closed.append(self._close())
+            self.bucket = bucket
+            self.bar = {
+                'open': price, 'high': price, 'low': price, 'close': price,
+                'volume': int(size), 'delta': delta,
+                'cvd_open': cvd, 'cvd_high': cvd, 'cvd_low': cvd, 'cvd_close': cvd,
+            }
+            return closed
+
+        bar = self.bar
+        if price > bar['high']:
+            bar['high'] = price
+        elif price < bar['low']:
+            bar['low'] = price
+        bar['close'] = price
+        bar['volume'] += int(size)
+        bar['delta'] += delta
+        if cvd > bar['cvd_high']:
+            bar['cvd_high'] = cvd
+        elif cvd < bar['cvd_low']:
+            bar['cvd_low'] = cvd
+        bar['cvd_close'] = cvd
+        return closed
+
+    def on_trades(self, ts, price, size, side):
+        """
+        Add a micro-batch of trades given as arrays.
+
+        The batch is reduced with the vectorized bar builder and merged into
+        the open bar, so the per-trade cost stays constant without a Python
+        loop per trade.
+        """
+        ts_ns = timestamps_ns(ts)
+        if len(ts_ns) == 0:
+            return []
+        price = np.asarray(price, dtype=np.float64)
+        size = np.asarray(size).astype(np.int64, copy=False)
+        delta = trade_delta(side, size)
+        running_cvd = np.cumsum(delta) + self.cvd
+        self.cvd = int(running_cvd[-1])
+
+        # Late prints go to the open bar, as in on_trade: the bar open when a
+        # trade arrives is the latest bucket seen so far, batch included
+        start_ns = ts_ns - ts_ns % self.freq_ns
+        open_ns = np.maximum.accumulate(start_ns)
+        if self.bucket is not None:
+            open_ns = np.maximum(open_ns, self.bucket * self.freq_ns)
+        late = start_ns < open_ns
+        if late.any():
+            self.late_trades += int(late.sum())
+            ts_ns = np.where(late, open_ns, ts_ns)
+
+        bucket_ns, columns = bars_from_arrays(ts_ns, price, size, delta, running_cvd,
+                                              freq=self.freq_ns)
+        closed = []
+        for i, start_ns in enumerate(bucket_ns):
+            bucket = start_ns // self.freq_ns
+            batch_bar = {name: columns[name][i].item() for name in BAR_COLUMNS}
+            if bucket == self.bucket:
+                bar = self.bar
+                bar['high'] = max(bar['high'], batch_bar['high'])
+                bar['low'] = min(bar['low'], batch_bar['low'])
+                bar['close'] = batch_bar['close']
+                bar['volume'] += batch_bar['volume']
+                bar['delta'] += batch_bar['delta']
+                bar['cvd_high'] = max(bar['cvd_high'], batch_bar['cvd_high'])
+                bar['cvd_low'] = min(bar['cvd_low'], batch_bar['cvd_low'])
+                bar['cvd_close'] = batch_bar['cvd_close']
+                continue
+            if self.bar is not None:
+                closed.append(self._close())
+            self.bucket, self.bar = bucket, batch_bar
+        return closed
+
+    def flush(self):
+        """Close the open bar (end of session / stream)"""
+        if self.bar is None:
+            return []
+        closed = [self._close()]
+        self.bar = None
+        return closed
+
+    # -- state ----------------------------------------------------------------
+
+    def state(self):
+        """
+        Everything needed to continue this engine elsewhere, as plain
+        JSON-friendly values: settings, running CVD, the open bar and every
+        EMA, Wilder and Heikin Ashi accumulator.
+        """
+        state = {
+            'freq_ns': self.freq_ns,
+            'spans': self.spans,
+            'period': self.period,
+            'heikin_ashi': self.heikin_ashi,
+            'cvd': int(self.cvd),
+            'late_trades': self.late_trades,
+            'bucket': None if self.bucket is None else int(self.bucket),
+            'bar': None if self.bar is None else {k: _scalar(v) for k, v in self.bar.items()},
+            'adx': self.adx.state(),
+            'emas': {src: [s.state() for s in states] for src, states in self.emas.items()},
+        }
+        if self.heikin_ashi:
+            state['ha_price'] = self.ha_price.state()
+            state['ha_cvd'] = self.ha_cvd.state()
+            state['ha_adx'] = self.ha_adx.state()
+            state['ha_emas'] = {src: [s.state() for s in states]
+                                for src, states in self.ha_emas.items()}
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an engine saved with ``state()``"""
+        engine = cls(freq=pd.Timedelta(state['freq_ns']), spans=state['spans'],
+                     period=state['period'], heikin_ashi=state['heikin_ashi'],
+                     cvd_offset=state['cvd'])
+        engine.late_trades = state['late_trades']
+        engine.bucket = state['bucket']
+        engine.bar = None if state['bar'] is None else dict(state['bar'])
+        engine.adx.load_state(state['adx'])
+        for src, states in engine.emas.items():
+            for s, saved in zip(states, state['emas'][src]):
+                s.load_state(saved)
+        if engine.heikin_ashi:
+            engine.ha_price.load_state(state['ha_price'])
+            engine.ha_cvd.load_state(state['ha_cvd'])
+            engine.ha_adx.load_state(state['ha_adx'])
+            for src, states in engine.ha_emas.items():
+                for s, saved in zip(states, state['ha_emas'][src]):
+                    s.load_state(saved)
+        return engine
+
+    # -- bars -----------------------------------------------------------------
+
+    def _close(self):
+        return self.on_bar(pd.Timestamp(self.bucket * self.freq_ns, tz='UTC'), self.bar)
+
+    def on_bar(self, timestamp, bar):
+        """Run a finished raw bar through the indicators and return its row"""
+        row = {'timestamp': timestamp}
+        row.update((name, bar[name]) for name in BAR_COLUMNS)
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        row['+di'], row['-di'], row['adx'] = self.adx.update(high, low, close)
+        for src, prefix in EMA_SOURCES.items():
+            value = float(bar[src])
+            for span, state in zip(self.spans, self.emas[src]):
+                row[f'{prefix}_{span}'] = state.update(value)
+
+        if self.heikin_ashi:
+            for prefix, state, fields in (('ha', self.ha_price, HA_FIELDS),
+                                          ('ha_cvd', self.ha_cvd, tuple(f'cvd_{f}' for f in HA_FIELDS))):
+                values = state.update(*(float(bar[f]) for f in fields))
+                row.update((f'{prefix}_{f}', v) for f, v in zip(HA_FIELDS, values))
+            row['ha_+di'], row['ha_-di'], row['ha_adx'] = self.ha_adx.update(
+                row['ha_high'], row['ha_low'], row['ha_close']
+            )
+            for src, prefix in HA_EMA_SOURCES.items():
+                value = row[src]
+                for span, state in zip(self.spans, self.ha_emas[src]):
+                    row[f'{prefix}_{span}'] = state.update(value)
+        return row
@@ -0,0 +1,130 @@
+"""
+Writing output frames as CSV, Parquet or Arrow IPC.
+
+CSV stays the default for the BackTester's readCSV.ts. Parquet and Arrow
+IPC keep typed columns (UTC timestamps, int64 volume/delta/CVD, float64
+prices and indicators) and are split into one row group / record batch per
+UTC day, so readers load only the columns and days they need. Parquet is
+zstd-compressed; Arrow IPC is written uncompressed so readers can
+memory-map it and use the buffers in place, with no decompression. Both
+need ``pyarrow``.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .bars import segment_starts, timestamps_ns
+from .profiling import stage
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'arrow')
+EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrow'}
+DAY_NS = 86_400_000_000_000
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as exc:
+        raise ImportError('Parquet/Arrow output needs pyarrow: pip install pyarrow') from exc
+    return pa
+
+
+def day_slices(df, time_col='timestamp'):
+    """(offset, length) of each UTC day in a time-sorted frame"""
+    days = timestamps_ns(df[time_col]) // DAY_NS
+    starts = segment_starts(days)
+    lengths = np.diff(np.append(starts, len(df)))
+    return list(zip(starts.tolist(), lengths.tolist()))
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+
+
+def write_parquet(df, path, compression='zstd', time_col='timestamp'):
+    """Parquet with one row group per UTC day"""
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, table.schema, compression=compression) as writer:
+        for offset, length in day_slices(df, time_col):
+            writer.write_table(table.slice(offset, length))
+
+
+def write_arrow(df, path, compression=None, time_col='timestamp'):
+    """
+    Arrow IPC file with one record batch per UTC day; uncompressed unless
+    ``compression`` is given, which gives up zero-copy memory-mapped reads.
+    """
+    pa = _pyarrow()
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(path, 'wb') as sink, \
+            pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        for offset, length in day_slices(df, time_col):
+            for batch in table.slice(offset, length).to_batches():
+                writer.write_batch(batch)
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'arrow': write_arrow}
+
+
+def write_output(df, stem, formats=('csv',)):
+    """Write ``df`` to ``{stem}.{ext}`` for each format; returns the paths"""
+    paths = []
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f'unknown output format {fmt!r}; expected one of {OUTPUT_FORMATS}')
+        path = f'{stem}.{EXTENSIONS[fmt]}'
+        with stage('write', len(df)) as record:
+            WRITERS[fmt](df, path)
+            record.rows_out = len(df)
+        paths.append(path)
+    return paths
+
+
+def read_output(path):
+    """Read back a file written by ``write_output`` as a frame"""
+    if path.endswith('.csv'):
+        return pd.read_csv(path, parse_dates=['timestamp'])
+    pa = _pyarrow()
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pandas()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def append_output(df, stem, formats=('csv',)):
+    """
+    Append ``df`` to the ``{stem}.{ext}`` files ``write_output`` made.
+
+    CSV rows are appended in place; Parquet and Arrow files are read and
+    rewritten so the per-day row groups stay intact. Missing files are
+    created. Returns the paths.
+    """
+    paths = []
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f'unknown output format {fmt!r}; expected one of {OUTPUT_FORMATS}')
+        path = f'{stem}.{EXTENSIONS[fmt]}'
+        with stage('write', len(df)) as record:
+            if not os.path.exists(path):
+                WRITERS[fmt](df, path)
+            elif fmt == 'csv':
+                df.to_csv(path, mode='a', header=False, index=False)
+            else:
+                WRITERS[fmt](pd.concat([read_output(path), df], ignore_index=True), path)
+            record.rows_out = len(df)
+        paths.append(path)
+    return paths
+
+
+def partition_dir(root, symbol):
+    """Hive-style ``{root}/symbol={symbol}`` directory, created if missing"""
+    path = os.path.join(root, f'symbol={symbol}')
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,253 @@
+"""
+Bar-file parity checks (Python vs TypeScript output, old vs new kernels).
+
+Two bar files are aligned on their timestamps with one sorted intersection,
+then every shared column is compared in a single vectorized pass with
+per-column absolute/relative tolerances (integer columns exact by default).
+The report gives the first divergent bar (with its row in each file) and both
+sides' values, per-column mismatch counts and max/mean differences, the bars
+only one side has, and how many duplicate timestamps each side had. Duplicates
+are compared on their first row only, so they fail the check too.
+
+    python -m pipeline.parity cvd_comparison_python.csv cvd_comparison_ts.csv
+    python -m pipeline.parity old.csv new.csv --tol 'ema_*=1e-9' --tol 'adx=1e-6'
+
+Exits with status 1 when the files diverge, so it can gate kernel changes.
+"""
+import argparse
+import fnmatch
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .bars import timestamps_ns
+from .output import read_output
+
+TIME_COLUMNS = ('timestamp', 'minute_bucket', 'bar_start', 'ts_event')
+
+# Other names for the same column (diag.py / streamBars call CVD close 'cvd')
+COLUMN_ALIASES = {'cvd': 'cvd_close'}
+
+FLOAT_ATOL = 1e-9
+
+
+def load_bars(source, time_col=None):
+    """
+    Bars from a path or frame, indexed by int64 UTC nanoseconds and sorted.
+
+    The time column is ``time_col`` or the first of ``TIME_COLUMNS`` found
+    (as a column or the index name); aliases in ``COLUMN_ALIASES`` are
+    renamed unless the canonical column is already there. Only the first
+    row of a duplicated timestamp is kept.
+    """
+    return _load(source, time_col)[0]
+
+
+def _load(source, time_col):
+    """``load_bars`` plus each kept bar's source row and the duplicate count"""
+    df = read_output(source) if isinstance(source, str) else source
+    if time_col is None:
+        time_col = next((c for c in TIME_COLUMNS if c in df.columns or c == df.index.name), None)
+        if time_col is None:
+            raise ValueError(f'no time column found; expected one of {TIME_COLUMNS}')
+    if time_col == df.index.name:
+        df = df.reset_index()
+    ts = timestamps_ns(pd.to_datetime(df[time_col], utc=True))
+    df = df.drop(columns=[time_col])
+    df = df.rename(columns={a: c for a, c in COLUMN_ALIASES.items()
+                            if a in df.columns and c not in df.columns})
+    df.index = pd.Index(ts, name='ts_ns')
+    rows = np.arange(len(df))
+    duplicates = 0
+    if len(ts) > 1 and not np.all(ts[1:] > ts[:-1]):
+        # Stable sort so the first row of a duplicated timestamp is kept
+        first = ~df.index.duplicated(keep='first')
+        duplicates = int(len(df) - first.sum())
+        order = np.argsort(ts[first], kind='stable')
+        rows = rows[first][order]
+        df = df.iloc[rows]
+    return df, rows, duplicates
+
+
+def column_tolerance(name, dtype, tolerances):
+    """(atol, rtol) for a column: first matching pattern, else exact for ints"""
+    for pattern, tol in tolerances.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return tol if isinstance(tol, tuple) else (float(tol), 0.0)
+    return (0.0, 0.0) if dtype.kind in 'iub' else (FLOAT_ATOL, 0.0)
+
+
+class ParityReport:
+    """Result of ``compare_bars``; ``ok`` is True when nothing diverged"""
+
+    def __init__(self, timestamps, columns, mismatch, stats, left, right,
+                 only_left, only_right, left_rows, right_rows,
+                 duplicates_left, duplicates_right):
+        self.timestamps = timestamps
+        self.columns = columns
+        self.mismatch = mismatch
+        self.stats = stats
+        self.only_left = only_left
+        self.only_right = only_right
+        self.left_rows = left_rows
+        self.right_rows = right_rows
+        self.duplicates_left = duplicates_left
+        self.duplicates_right = duplicates_right
+        self._left = left
+        self._right = right
+
+    @property
+    def ok(self):
+        return (not self.mismatch.any() and not len(self.only_left) and not len(self.only_right)
+                and not self.duplicates_left and not self.duplicates_right)
+
+    @property
+    def divergent_bars(self):
+        return int(self.mismatch.any(axis=1).sum())
+
+    def first_divergence(self):
+        """
+        Timestamp, diverging columns and both sides' values of the first bad
+        bar, with its (0-based) data row in each source.
+        """
+        bad = self.mismatch.any(axis=1)
+        if not bad.any():
+            return None
+        i = int(np.argmax(bad))
+        cols = [c for c, m in zip(self.columns, self.mismatch[i]) if m]
+        return {
+            'left_row': int(self.left_rows[i]),
+            'right_row': int(self.right_rows[i]),
+            'timestamp': pd.Timestamp(self.timestamps[i], tz='UTC'),
+            'columns': cols,
+            'left': {c: self._left[c][i] for c in cols},
+            'right': {c: self._right[c][i] for c in cols},
+        }
+
+    def as_dict(self):
+        first = self.first_divergence()
+        if first is not None:
+            first = dict(first, timestamp=first['timestamp'].isoformat(),
+                         left={c: _plain(v) for c, v in first['left'].items()},
+                         right={c: _plain(v) for c, v in first['right'].items()})
+        return {
+            'ok': self.ok,
+            'compared_bars': len(self.timestamps),
+            'divergent_bars': self.divergent_bars,
+            'only_left': len(self.only_left),
+            'only_right': len(self.only_right),
+            'duplicates_left': self.duplicates_left,
+            'duplicates_right': self.duplicates_right,
+            'first_divergence': first,
+            'columns': self.stats,
+        }
+
+    def summary(self):
+        lines = [f"Compared {len(self.timestamps):,} bars on {len(self.columns)} columns: "
+                 f"{'OK' if self.ok else f'{self.divergent_bars:,} divergent bars'}"]
+        for name, side in (('left', self.only_left), ('right', self.only_right)):
+            if len(side):
+                lines.append(f"  {len(side):,} bars only in {name} "
+                             f"(first {pd.Timestamp(side[0], tz='UTC')})")
+        for name, count in (('left', self.duplicates_left), ('right', self.duplicates_right)):
+            if count:
+                lines.append(f"  {count:,} duplicate timestamps in {name} "
+                             f"(first row of each compared)")
+        first = self.first_divergence()
+        if first is not None:
+            lines.append(f"  First divergence at {first['timestamp']} "
+                         f"(left row {first['left_row']}, right row {first['right_row']})")
+            for c in first['columns']:
+                left, right = _plain(first['left'][c]), _plain(first['right'][c])
+                lines.append(f"    {c}: {left!r} vs {right!r}")
+        for c, s in self.stats.items():
+            if s['mismatches']:
+                lines.append(f"  {c:<16} {s['mismatches']:>8,} mismatches  "
+                             f"max |diff| {s['max_abs_diff']:.6g}  mean |diff| {s['mean_abs_diff']:.6g}")
+        return '\n'.join(lines)
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def compare_bars(left, right, columns=None, tolerances=None, time_col=None):
+    """
+    Align two bar files/frames by timestamp and compare them column by column.
+
+    ``tolerances`` maps column names or fnmatch patterns ('ema_*') to an
+    absolute tolerance or an (atol, rtol) pair; values match when
+    ``|l - r| <= atol + rtol * |r|`` or both are NaN. Returns a ParityReport.
+    """
+    left, left_rows, duplicates_left = _load(left, time_col)
+    right, right_rows, duplicates_right = _load(right, time_col)
+    tolerances = tolerances or {}
+    if columns is None:
+        columns = [c for c in left.columns if c in right.columns]
+
+    ts_left, ts_right = left.index.to_numpy(), right.index.to_numpy()
+    timestamps, li, ri = np.intersect1d(ts_left, ts_right, assume_unique=True,
+                                        return_indices=True)
+    only_left = np.setdiff1d(ts_left, timestamps, assume_unique=True)
+    only_right = np.setdiff1d(ts_right, timestamps, assume_unique=True)
+
+    mismatch = np.zeros((len(timestamps), len(columns)), dtype=bool)
+    stats, left_values, right_values = {}, {}, {}
+    for j, c in enumerate(columns):
+        a, b = left[c].to_numpy()[li], right[c].to_numpy()[ri]
+        left_values[c], right_values[c] = a, b
+        if a.dtype.kind in 'iufb' and b.dtype.kind in 'iufb':
+            atol, rtol = column_tolerance(c, np.result_type(a.dtype, b.dtype), tolerances)
+            a64, b64 = a.astype(np.float64), b.astype(np.float64)
+            diff = np.abs(a64 - b64)
+            both_nan = np.isnan(a64) & np.isnan(b64)
+            bad = ~((diff <= atol + rtol * np.abs(b64)) | both_nan)
+            diff = np.where(both_nan, 0.0, diff)
+        else:
+            bad = a.astype(str) != b.astype(str)
+            diff = bad.astype(np.float64)
+        mismatch[:, j] = bad
+        finite = diff[np.isfinite(diff)]
+        stats[c] = {
+            'mismatches': int(bad.sum()),
+            'max_abs_diff': float(finite.max()) if len(finite) else 0.0,
+            'mean_abs_diff': float(finite.mean()) if len(finite) else 0.0,
+            'first_mismatch': (pd.Timestamp(timestamps[np.argmax(bad)], tz='UTC').isoformat()
+                               if bad.any() else None),
+        }
+    return ParityReport(timestamps, list(columns), mismatch, stats, left_values, right_values,
+                        only_left, only_right, left_rows[li], right_rows[ri],
+                        duplicates_left, duplicates_right)
+
+
+def parse_tolerance(spec):
+    """'pattern=atol' or 'pattern=atol,rtol'"""
+    pattern, _, value = spec.partition('=')
+    parts = [float(v) for v in value.split(',')]
+    return pattern, (parts[0], parts[1] if len(parts) > 1 else 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pipeline.parity',
+                                     description=__doc__.splitlines()[1])
+    parser.add_argument('left')
+    parser.add_argument('right')
+    parser.add_argument('--columns', nargs='+', default=None)
+    parser.add_argument('--tol', action='append', default=[], type=parse_tolerance,
+                        help="column tolerance, e.g. 'ema_*=1e-9' or 'adx=1e-6,1e-9'")
+    parser.add_argument('--time-col', default=None)
+    parser.add_argument('--json', default=None, help='also write the report here')
+    args = parser.parse_args(argv)
+
+    report = compare_bars(args.left, args.right, args.columns, dict(args.tol), args.time_col)
+    print(report.summary())
+    if args.json:
+        import json
+        with open(args.json, 'w') as f:
+            json.dump(report.as_dict(), f, indent=2)
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
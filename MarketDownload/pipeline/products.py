@@ -0,0 +1,73 @@
+"""
+Output frames derived from raw bars, in the column order the CSVs use.
+
+- ``traditional_bars``: mesu5_traditional_1min_with_emas_adx.csv
+- ``heikin_ashi_bars``: mesu5_heikin_ashi_1min_with_emas_adx.csv
+- ``combined_bars``:    mesu5_1min_bars_with_ha.csv
+
+These are the layouts the BackTester's readCSV.ts reads.
+"""
+import pandas as pd
+
+from .bars import BAR_COLUMNS
+from .heikin_ashi import heikin_ashi
+from .indicators import (
+    ADX_COLUMNS, ADX_PERIOD, EMA_PERIODS, EMA_SOURCES, HA_ADX_COLUMNS, HA_EMA_SOURCES,
+    compute_indicators, indicator_columns,
+)
+from .trendlines import compute_trendlines, trendline_columns
+
+HA_PRICE_COLUMNS = ['ha_open', 'ha_high', 'ha_low', 'ha_close']
+HA_CVD_COLUMNS = ['ha_cvd_open', 'ha_cvd_high', 'ha_cvd_low', 'ha_cvd_close']
+
+
+def _with_timestamp(df):
+    out = df.reset_index(drop=True)
+    out.insert(0, 'timestamp', df.index)
+    return out
+
+
+def traditional_bars(bars, spans=EMA_PERIODS, period=ADX_PERIOD, trendlines=False):
+    """Raw bars + ADX + price/CVD EMAs (+ trendline/pivot columns with ``trendlines``)"""
+    indicators = compute_indicators(bars, EMA_SOURCES, spans, ADX_COLUMNS, '', period)
+    parts = [bars[BAR_COLUMNS], indicators]
+    if trendlines:
+        parts.append(compute_trendlines(bars))
+    return _with_timestamp(pd.concat(parts, axis=1))
+
+
+def heikin_ashi_bars(bars, spans=EMA_PERIODS, period=ADX_PERIOD, ha=None):
+    """
+    Heikin Ashi bars + HA ADX + HA price/CVD EMAs.
+
+    ``ha`` reuses an already computed ``heikin_ashi(bars)`` frame.
+    """
+    if ha is None:
+        ha = heikin_ashi(bars)
+    ha_bars = pd.concat(
+        [ha[HA_PRICE_COLUMNS], bars[['volume', 'delta']], ha[HA_CVD_COLUMNS]], axis=1
+    )
+    indicators = compute_indicators(ha_bars, HA_EMA_SOURCES, spans, HA_ADX_COLUMNS, 'ha_', period)
+    return _with_timestamp(pd.concat([ha_bars, indicators], axis=1))
+
+
+def combined_bars(bars, ha=None):
+    """Raw bars followed by HA price and HA CVD candles"""
+    if ha is None:
+        ha = heikin_ashi(bars)
+    return _with_timestamp(
+        pd.concat([bars[BAR_COLUMNS], ha[HA_PRICE_COLUMNS + HA_CVD_COLUMNS]], axis=1)
+    )
+
+
+def product_columns(product, spans=EMA_PERIODS, trendlines=False):
+    """Column order of ``traditional``, ``heikin_ashi`` or ``combined`` output"""
+    if product == 'traditional':
+        columns = ['timestamp'] + BAR_COLUMNS + indicator_columns(EMA_SOURCES, spans, '')
+        return columns + trendline_columns() if trendlines else columns
+    if product == 'heikin_ashi':
+        return (['timestamp'] + HA_PRICE_COLUMNS + ['volume', 'delta'] + HA_CVD_COLUMNS
+                + indicator_columns(HA_EMA_SOURCES, spans, 'ha_'))
+    if product == 'combined':
+        return ['timestamp'] + BAR_COLUMNS + HA_PRICE_COLUMNS + HA_CVD_COLUMNS
+    raise ValueError(f'unknown product {product!r}')
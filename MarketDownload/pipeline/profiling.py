@@ -0,0 +1,228 @@
+"""
+Per-stage timing and memory instrumentation.
+
+Pipeline functions wrap their work in ``stage(name, rows_in)``; the stages
+are fetch, to_df, delta, bucket, aggregate, heikin_ashi, adx, ema and write.
+Profiling is off by default and ``stage`` then hands back one shared no-op
+context, so the cost is a function call per stage (never per trade).
+
+    profiler = enable_profiling()
+    ... run the pipeline ...
+    print(profiler.table())
+    profiler.to_json('profile.json')
+
+Each record has the wall time, rows in and out, rows per second, the
+process peak RSS so far and ``rss_delta``, the change in current RSS from
+the start to the end of the stage (what it left allocated; negative if it
+freed memory). With ``trace_alloc=True`` the peak Python/numpy allocation
+during the stage is recorded too (via tracemalloc, which slows
+allocation-heavy code).
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Current resident set size of this process in bytes (None if unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageRecord:
+    """Measurements for one run of a stage; set ``rows_out`` inside the block"""
+
+    __slots__ = ('name', 'rows_in', 'rows_out', 'seconds', 'rss_peak', 'rss_delta', 'alloc_peak')
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = None
+        self.rss_peak = None
+        self.rss_delta = None
+        self.alloc_peak = None
+
+    @property
+    def rows_per_s(self):
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        if rows is None or not self.seconds:
+            return None
+        return rows / self.seconds
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'seconds': self.seconds,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_s': self.rows_per_s,
+            'rss_peak_mb': None if self.rss_peak is None else self.rss_peak / MB,
+            'rss_delta_mb': None if self.rss_delta is None else self.rss_delta / MB,
+            'alloc_peak_mb': None if self.alloc_peak is None else self.alloc_peak / MB,
+        }
+
+
+class _NullRecord:
+    """Stands in for a StageRecord when profiling is off; ignores writes"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NULL_RECORD
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_RECORD = _NullRecord()
+_NULL_STAGE = _NullStage()
+
+
+class StageProfiler:
+    """Collects StageRecords in the order stages finish"""
+
+    def __init__(self, trace_alloc=False):
+        self.trace_alloc = trace_alloc
+        self.records = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = StageRecord(name, rows_in)
+        rss_before = current_rss()
+        if self.trace_alloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            alloc_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            if self.trace_alloc:
+                record.alloc_peak = max(tracemalloc.get_traced_memory()[1] - alloc_before, 0)
+            record.rss_peak = peak_rss()
+            if rss_before is not None:
+                record.rss_delta = current_rss() - rss_before
+            with self._lock:
+                self.records.append(record)
+
+    def summary(self):
+        """
+        One row per stage name in first-seen order: calls, total seconds,
+        summed rows and RSS deltas, overall rows/s and the largest peaks.
+        """
+        rows = {}
+        for record in self.records:
+            row = rows.setdefault(record.name, {
+                'stage': record.name, 'calls': 0, 'seconds': 0.0,
+                'rows_in': None, 'rows_out': None, 'rows_per_s': None,
+                'rss_peak_mb': None, 'rss_delta_mb': None, 'alloc_peak_mb': None,
+            })
+            row['calls'] += 1
+            row['seconds'] += record.seconds
+            values = record.as_dict()
+            for key in ('rows_in', 'rows_out', 'rss_delta_mb'):
+                if values[key] is not None:
+                    row[key] = (row[key] or 0) + values[key]
+            for key in ('rss_peak_mb', 'alloc_peak_mb'):
+                if values[key] is not None:
+                    row[key] = values[key] if row[key] is None else max(row[key], values[key])
+        for row in rows.values():
+            rows_done = row['rows_in'] if row['rows_in'] is not None else row['rows_out']
+            if rows_done is not None and row['seconds']:
+                row['rows_per_s'] = rows_done / row['seconds']
+        return list(rows.values())
+
+    def report(self):
+        """JSON-ready dict with the per-stage summary and every record"""
+        return {
+            'elapsed_s': time.perf_counter() - self._started,
+            'stages': self.summary(),
+            'records': [record.as_dict() for record in self.records],
+        }
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def table(self):
+        """Compact console table of ``summary()``"""
+
+        def fmt(value, spec):
+            return '-' if value is None else format(value, spec)
+
+        lines = [f"{'stage':<12} {'calls':>5} {'seconds':>9} {'rows in':>13} {'rows out':>13} "
+                 f"{'rows/s':>14} {'peak MB':>9} {'RSS +/-MB':>9} {'alloc MB':>9}"]
+        for row in self.summary():
+            lines.append(
+                f"{row['stage']:<12} {row['calls']:>5} {row['seconds']:>9.3f} "
+                f"{fmt(row['rows_in'], ',d'):>13} {fmt(row['rows_out'], ',d'):>13} "
+                f"{fmt(row['rows_per_s'], ',.0f'):>14} {fmt(row['rss_peak_mb'], '.0f'):>9} "
+                f"{fmt(row['rss_delta_mb'], '+.1f'):>9} {fmt(row['alloc_peak_mb'], '.1f'):>9}"
+            )
+        return '\n'.join(lines)
+
+
+_profiler = None
+
+
+def enable_profiling(trace_alloc=False):
+    """Start recording stages into a new StageProfiler and return it"""
+    global _profiler
+    _profiler = StageProfiler(trace_alloc=trace_alloc)
+    return _profiler
+
+
+def disable_profiling():
+    """Stop recording; returns the profiler that was active (or None)"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None and profiler.trace_alloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profiler
+
+
+def active_profiler():
+    return _profiler
+
+
+def stage(name, rows_in=None):
+    """Context manager timing one stage; a shared no-op when profiling is off"""
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name, rows_in)
@@ -0,0 +1,70 @@
+"""
+Bar aggregation straight on DBN record arrays.
+
+``data.to_df()`` builds a full frame (every field, float prices, object
+side strings, a DatetimeIndex) and the scripts then run ``pd.to_datetime``
+on ``ts_event`` again. Here the pull is read with ``to_ndarray()`` and the
+bars are built on views of the structured array's fields:
+
+- ``ts_event`` uint64 ns, viewed as int64; bucket = ``ts // freq_ns``
+- ``price`` int64 fixed point (1e9); OHLC stays integer
+- ``size`` uint32 and ``side`` bytes, through ``SIDE_SIGN``, give the delta
+
+The only new per-trade arrays are the delta and its running sum (plus the
+bucket keys). pandas appears once, to wrap the finished bars, where the
+prices become float64 (exact for tick prices).
+"""
+import numpy as np
+
+from .bars import PRICE_COLUMNS, bars_frame, bars_from_arrays
+from .compact import PRICE_SCALE, fixed_to_float
+from .streaming import StreamingBarBuilder, combine_bars
+from .trades import SIDE_SIGN
+
+
+def record_arrays(records, cvd_offset=0):
+    """
+    (ts_ns, price, size, delta, running_cvd) for a DBN trade record array.
+
+    ``ts_ns`` and ``price`` are views into ``records``; ``size`` is the
+    uint32 field as is.
+    """
+    ts_ns = records['ts_event'].view(np.int64)
+    price = records['price']
+    size = records['size']
+    side = records['side']
+    if side.dtype.kind == 'S':
+        side = side.view(np.uint8)
+    delta = SIDE_SIGN[side] * size.astype(np.int64)
+    running_cvd = np.cumsum(delta)
+    if cvd_offset:
+        running_cvd += cvd_offset
+    return ts_ns, price, size, delta, running_cvd
+
+
+def _float_prices(columns):
+    for name in PRICE_COLUMNS:
+        columns[name] = fixed_to_float(columns[name])
+    return columns
+
+
+def record_bars(data, freq='1min', batch_size=None, cvd_offset=0):
+    """
+    Time bars from DBN trade records, with no trade DataFrame.
+
+    ``data`` is a DBN store (read with ``to_ndarray``, ``batch_size`` records
+    at a time if given) or a record array. Same frame as
+    ``build_bars(normalize_trades(data.to_df()))``.
+    """
+    if isinstance(data, np.ndarray) or batch_size is None:
+        records = data if isinstance(data, np.ndarray) else data.to_ndarray()
+        bucket_ns, columns = bars_from_arrays(*record_arrays(records, cvd_offset), freq=freq)
+        return bars_frame(bucket_ns, _float_prices(columns))
+
+    # Batches: the streaming builder carries CVD and open bars across them
+    builder = StreamingBarBuilder(freq, cvd_offset=cvd_offset, price_scale=PRICE_SCALE)
+    frames = []
+    for records in data.to_ndarray(count=batch_size):
+        frames.append(builder.update_arrays(*record_arrays(records, builder.cvd)))
+    frames.append(builder.flush())
+    return combine_bars(frames, freq)
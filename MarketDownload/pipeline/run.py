@@ -0,0 +1,328 @@
+"""
+One-download pipeline: fetch trades once, build bars once, write every product.
+
+1min.py, 1minHakanashi.py and hakanshi.py each download the same trades
+and rebuild the same bars to write one file apiece. ``run_pipeline`` does
+the download and aggregation once per run and derives the selected
+products from the shared bars (and one shared Heikin Ashi frame):
+
+- ``traditional``: {symbol}_traditional_{tf}_with_emas_adx
+- ``heikin_ashi``: {symbol}_heikin_ashi_{tf}_with_emas_adx
+- ``combined``:    {symbol}_{tf}_bars_with_ha
+
+With the defaults this writes the same three CSVs as the three scripts.
+With ``checkpoint_dir`` set, each run appends only the bars after the last
+checkpoint and carries CVD and indicator state over (see checkpoint.py).
+With ``warmup_tolerance`` set, the extra history the indicators need to
+converge by ``start`` is fetched as a separate pull before ``start`` (so a
+cached main window is reused), joined in front of the bars and trimmed
+from the output (see warmup.py). ``trendlines`` adds rolling support/resistance and
+swing pivot columns to the traditional product (see trendlines.py).
+``grid_spans`` / ``grid_periods`` also write every listed EMA span and ADX
+period in long layout to {symbol}_indicator_grid_{tf} (see grid.py).
+Run it as ``python -m pipeline`` (see ``__main__.py``).
+"""
+import os
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .bars import build_bars, join_bars, rollup_bars, timeframe_label, timestamps_ns
+from .checkpoint import checkpoint_path, load_checkpoint, resume_rows, save_checkpoint
+from .compact import compact_bars, compact_trades
+from .grid import grid_long, indicator_grid
+from .heikin_ashi import heikin_ashi
+from .indicators import ADX_PERIOD, EMA_PERIODS
+from .instruments import build_instrument_bars
+from .live import LiveBarEngine
+from .output import append_output, write_output
+from .products import combined_bars, heikin_ashi_bars, product_columns, traditional_bars
+from .profiling import disable_profiling, enable_profiling, stage
+from .records import record_bars
+from .streaming import build_bars_streaming
+from .trades import normalize_trades
+from .warmup import plan_warmup, session_start, trim_warmup
+
+PRODUCTS = ('traditional', 'heikin_ashi', 'combined')
+PRODUCT_STEMS = {
+    'traditional': '{symbol}_traditional_{tf}_with_emas_adx',
+    'heikin_ashi': '{symbol}_heikin_ashi_{tf}_with_emas_adx',
+    'combined': '{symbol}_{tf}_bars_with_ha',
+}
+GRID_STEM = '{symbol}_indicator_grid_{tf}'
+WARMUP_ROUNDS = 5
+
+
+@dataclass
+class PipelineConfig:
+    """
+    What to fetch and what to write.
+
+    ``batch_size`` switches to streaming aggregation (``batch_size`` trades
+    in memory at a time, single symbol only); ``None`` loads the whole pull.
+    Every timeframe is rolled up from bars at the gcd of ``timeframes``.
+    ``compact`` loads the pull as a fixed-point compact table (see
+    compact.py; single symbol, read ``batch_size`` records at a time if set).
+    ``records`` builds the bars straight on the DBN record arrays with no
+    trade frame at all (see records.py; single symbol, batched the same way).
+    ``checkpoint_dir`` turns on incremental append mode.
+    ``warmup_tolerance`` fetches extra history before ``start`` until the
+    selected products' EMAs/ADX/HA have converged to within it.
+    ``trendlines`` appends the trendline/pivot columns to ``traditional``.
+    ``grid_spans`` / ``grid_periods`` turn on the indicator grid output.
+    """
+    symbols: list = field(default_factory=lambda: ['MESU5'])
+    start: str = '2025-07-14T13:30:00Z'  # 9:30 AM EDT
+    end: str = '2025-07-14T17:00:00Z'    # 1:00 PM EDT
+    dataset: str = 'GLBX.MDP3'
+    timeframes: list = field(default_factory=lambda: ['1min'])
+    products: list = field(default_factory=lambda: list(PRODUCTS))
+    formats: list = field(default_factory=lambda: ['csv'])
+    output_dir: str = '.'
+    batch_size: int = None
+    compact: bool = False
+    records: bool = False
+    spans: list = field(default_factory=lambda: list(EMA_PERIODS))
+    period: int = ADX_PERIOD
+    checkpoint_dir: str = None
+    profile: bool = False
+    warmup_tolerance: float = None
+    trendlines: bool = False
+    grid_spans: list = None
+    grid_periods: list = None
+
+    def validate(self):
+        unknown = set(self.products) - set(PRODUCTS)
+        if unknown:
+            raise ValueError(f'unknown products {sorted(unknown)}; expected some of {PRODUCTS}')
+        if (self.batch_size is not None or self.compact or self.records) and len(self.symbols) != 1:
+            raise ValueError('streaming (batch_size), compact and records mode support one '
+                             'symbol per run')
+        if self.trendlines and self.checkpoint_dir is not None:
+            raise ValueError('trendline columns are not supported in incremental (checkpoint) mode')
+        if self.grid and self.checkpoint_dir is not None:
+            raise ValueError('the indicator grid is not supported in incremental (checkpoint) mode')
+
+    @property
+    def grid(self):
+        return bool(self.grid_spans or self.grid_periods)
+
+
+def base_freq(timeframes):
+    """Finest common bar size every timeframe rolls up from"""
+    sizes = np.array([pd.Timedelta(tf).value for tf in timeframes], dtype=np.int64)
+    return pd.Timedelta(int(np.gcd.reduce(sizes)))
+
+
+def warmup_plan(config):
+    """``plan_warmup`` for the indicators the selected products compute"""
+    indicators = {'traditional', 'heikin_ashi'} & set(config.products)
+    spans = list(config.spans) if indicators else []
+    periods = [config.period] if indicators else []
+    spans += config.grid_spans or []
+    periods += config.grid_periods or []
+    return plan_warmup(
+        config.start, config.timeframes,
+        spans=spans,
+        period=max(periods) if periods else None,
+        heikin_ashi=bool({'heikin_ashi', 'combined'} & set(config.products)),
+        tolerance=config.warmup_tolerance,
+    )
+
+
+def fetch_bars(client, config, start=None, end=None):
+    """
+    Download once and build base bars for every symbol; returns {symbol: bars}.
+
+    ``start`` / ``end`` override ``config.start`` / ``config.end`` for the
+    pull (warmup). With ``batch_size`` set the response is streamed to a
+    temporary file and read back in batches, so the pull is never held in
+    memory whole.
+    """
+    path = None
+    if config.batch_size is not None:
+        fd, path = tempfile.mkstemp(suffix='.dbn', dir=config.output_dir)
+        os.close(fd)
+    try:
+        data = client.timeseries.get_range(
+            dataset=config.dataset,
+            symbols=list(config.symbols),
+            schema='trades',
+            start=config.start if start is None else start,
+            end=config.end if end is None else end,
+            stype_in='raw_symbol',
+            **({} if path is None else {'path': path}),
+        )
+        return _build_base_bars(data, config)
+    finally:
+        if path is not None:
+            os.remove(path)
+
+
+def _build_base_bars(data, config):
+    freq = base_freq(config.timeframes)
+    if config.records:
+        return {config.symbols[0]: record_bars(data, freq, config.batch_size)}
+    if config.compact:
+        with stage('to_df') as record:
+            compact = compact_trades(data, config.batch_size)
+            record.rows_out = len(compact)
+        return {config.symbols[0]: compact_bars(compact, freq)}
+    if config.batch_size is not None:
+        return {config.symbols[0]: build_bars_streaming(data, freq, config.batch_size)}
+
+    with stage('to_df') as record:
+        df_trades = data.to_df()
+        record.rows_out = len(df_trades)
+    if len(config.symbols) > 1:
+        return build_instrument_bars(df_trades, freq)
+    normalize_trades(df_trades)
+    return {config.symbols[0]: build_bars(df_trades, freq)}
+
+
+def fetch_warmup(client, config, plan):
+    """
+    Base bars for ``[plan.fetch_start, plan.start)``, pulled apart from the
+    main window; returns [{symbol: bars}, ...], oldest first.
+
+    The plan counts every trading minute as a bar, but quiet minutes have no
+    trades and make no bar. While a symbol has fewer than ``plan.bars`` bars
+    of the plan's timeframe, the pull reaches further back, scaled by the
+    share of minutes that did make a bar (at most doubling the lookback per
+    pull, up to ``WARMUP_ROUNDS`` pulls, and stopping once a pull comes back
+    empty); ``plan.fetch_start`` is moved to where it ended up.
+    """
+    freq_ns = plan.freq.value
+    parts, fetch_start, end = [], plan.fetch_start, plan.start
+    requested = plan.bars
+    for _ in range(WARMUP_ROUNDS):
+        part = fetch_bars(client, config, fetch_start.isoformat(), end.isoformat())
+        parts.insert(0, part)
+        counts = [
+            len(np.unique(np.concatenate(
+                [timestamps_ns(p[symbol].index) // freq_ns for p in parts if symbol in p] or [[]]
+            )))
+            for symbol in config.symbols
+        ]
+        missing = plan.bars - min(counts)
+        if missing <= 0 or not any(len(bars) for bars in part.values()):
+            break
+        extra = min(int(np.ceil(missing * requested / max(min(counts), 1))), requested)
+        requested += extra
+        fetch_start, end = session_start(fetch_start, extra * plan.freq), fetch_start
+    plan.fetch_start = fetch_start
+    return parts
+
+
+def write_products(bars, symbol, label, config, start=None):
+    """
+    Write the selected products for one symbol and timeframe; returns the
+    paths. Rows before ``start`` (warmup) are computed but not written.
+    """
+    needs_ha = {'heikin_ashi', 'combined'} & set(config.products)
+    ha = heikin_ashi(bars) if needs_ha else None
+    builders = {
+        'traditional': lambda: traditional_bars(bars, config.spans, config.period,
+                                                trendlines=config.trendlines),
+        'heikin_ashi': lambda: heikin_ashi_bars(bars, config.spans, config.period, ha=ha),
+        'combined': lambda: combined_bars(bars, ha=ha),
+    }
+    paths = []
+    for product in config.products:
+        stem = PRODUCT_STEMS[product].format(symbol=symbol.lower(), tf=label)
+        df = builders[product]()
+        if start is not None:
+            df = trim_warmup(df, start)
+        paths += write_output(df, os.path.join(config.output_dir, stem), config.formats)
+    return paths
+
+
+def write_grid(bars, symbol, label, config, start=None):
+    """Write the indicator grid (long layout) for one symbol and timeframe"""
+    grid = indicator_grid(bars, config.grid_spans or [], config.grid_periods or [])
+    grid = grid_long(grid.rename_axis('timestamp'))
+    if start is not None:
+        grid = trim_warmup(grid, start)
+    stem = GRID_STEM.format(symbol=symbol.lower(), tf=label)
+    return write_output(grid, os.path.join(config.output_dir, stem), config.formats)
+
+
+def append_products(bars, symbol, tf, config, start=None):
+    """
+    Append the bars after this symbol/timeframe's checkpoint and move the
+    checkpoint forward; the first run writes everything from ``start`` on
+    (earlier bars only warm the engine). Returns the paths.
+    """
+    label = timeframe_label(tf)
+    path = checkpoint_path(config.checkpoint_dir, symbol, label)
+    checkpoint = load_checkpoint(path)
+    if checkpoint is None:
+        engine, last_timestamp = LiveBarEngine(tf, config.spans, config.period), None
+    else:
+        engine, last_timestamp = checkpoint
+        if (engine.freq_ns, engine.spans, engine.period) != (
+                pd.Timedelta(tf).value, list(config.spans), config.period):
+            raise ValueError(f'{path} was saved with different bar size, EMA spans or ADX period')
+
+    rows = resume_rows(bars, engine, last_timestamp)
+    if start is not None:
+        rows = trim_warmup(rows, start)
+    if len(rows) == 0:
+        return []
+    write = write_output if checkpoint is None else append_output
+    paths = []
+    for product in config.products:
+        stem = PRODUCT_STEMS[product].format(symbol=symbol.lower(), tf=label)
+        paths += write(rows[product_columns(product, config.spans)],
+                       os.path.join(config.output_dir, stem), config.formats)
+    save_checkpoint(path, engine, rows['timestamp'].iat[-1])
+    return paths
+
+
+def run_pipeline(client, config=None):
+    """
+    Fetch, aggregate and write everything ``config`` asks for.
+
+    Returns {'bars': {symbol: {tf: bars}}, 'paths': [...], 'profiler': ...,
+    'warmup': ...}; the profiler is None unless ``config.profile`` is set
+    and the warmup plan None unless ``config.warmup_tolerance`` is.
+    """
+    config = config or PipelineConfig()
+    config.validate()
+    profiler = enable_profiling() if config.profile else None
+    try:
+        os.makedirs(config.output_dir, exist_ok=True)
+        if config.checkpoint_dir is not None:
+            os.makedirs(config.checkpoint_dir, exist_ok=True)
+        plan = warmup_plan(config) if config.warmup_tolerance is not None else None
+        start = None if plan is None else plan.start
+        base = fetch_bars(client, config)
+        freq = base_freq(config.timeframes)
+        base_ns = freq.value
+        if plan is not None:
+            # CVD counts from start as without warmup: the warmup ends at 0
+            warm = fetch_warmup(client, config, plan)
+            for symbol, bars in base.items():
+                parts = [p[symbol] for p in warm if symbol in p]
+                net = sum(int(p['delta'].sum()) for p in parts)
+                base[symbol] = join_bars(parts + [bars], freq, -net)
+
+        result = {'bars': {}, 'paths': [], 'profiler': profiler, 'warmup': plan}
+        for symbol, bars in base.items():
+            pyramid = result['bars'].setdefault(symbol, {})
+            for tf in config.timeframes:
+                label = timeframe_label(tf)
+                tf_bars = bars if pd.Timedelta(tf).value == base_ns else rollup_bars(bars, tf)
+                pyramid[label] = tf_bars if plan is None else trim_warmup(tf_bars, start, None)
+                if config.checkpoint_dir is not None:
+                    result['paths'] += append_products(tf_bars, symbol, tf, config, start)
+                else:
+                    result['paths'] += write_products(tf_bars, symbol, label, config, start)
+                if config.grid:
+                    result['paths'] += write_grid(tf_bars, symbol, label, config, start)
+    finally:
+        if profiler is not None:
+            disable_profiling()
+    return result
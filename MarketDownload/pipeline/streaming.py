@@ -0,0 +1,189 @@
+"""
+Streaming bar aggregation over a DBN store in fixed-size record batches.
+
+Instead of materializing the whole pull with ``data.to_df()``, trades are
+read ``batch_size`` records at a time. Running CVD and the still-open bars
+carry across batch boundaries, and finished bars are emitted as soon as a
+later bucket has been seen, so memory stays bounded by the batch size no
+matter how long the range is. For that the pull itself has to be on disk:
+``client.timeseries.get_range(path=...)`` (or ``CachedHistorical``, which
+always downloads to its cache file) streams the response to a file and the
+returned store reads it back lazily; ``run.fetch_bars`` does this whenever
+``batch_size`` is set.
+
+A print whose bar was already emitted (DBN is ordered by ``ts_recv``, so
+``ts_event`` can run late) is merged the way ``build_bars`` merges it: its
+bar is emitted again as a partial bar with the same timestamp, and
+``combine_bars`` rolls the repeats into one.
+"""
+import numpy as np
+import pandas as pd
+
+from .bars import (
+    BAR_COLUMNS, PRICE_COLUMNS, bars_frame, bucket_trades, empty_bar_columns, reduce_segments,
+    rollup_bars, rollup_segments, segment_starts, timestamps_ns,
+)
+from .profiling import stage
+from .trades import normalize_trades
+
+DEFAULT_BATCH_SIZE = 1_000_000
+
+
+def _no_bars():
+    return bars_frame(np.empty(0, dtype=np.int64), empty_bar_columns())
+
+
+def combine_bars(frames, freq):
+    """
+    Emitted bar frames as one frame: a bar emitted again for late prints is
+    rolled up with its earlier rows (in emission order), as in ``build_bars``.
+    """
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return _no_bars()
+    bars = pd.concat(frames)
+    if not bars.index.is_unique or not bars.index.is_monotonic_increasing:
+        bars = rollup_bars(bars.sort_index(kind='stable'), freq)
+    return bars
+
+
+class StreamingBarBuilder:
+    """
+    Incremental time-bar builder fed with trade batches.
+
+    ``reorder_buckets`` bars behind the newest one are held open so prints
+    whose ``ts_event`` lands slightly out of order (DBN is ordered by
+    ``ts_recv``) still reach their bar before it is emitted. An older print
+    is emitted again as a partial bar for ``combine_bars`` to merge
+    (``late='merge'``) or raises ``ValueError`` (``late='raise'``).
+    """
+
+    def __init__(self, freq='1min', cvd_offset=0, reorder_buckets=1, price_scale=None,
+                 late='merge'):
+        if late not in ('merge', 'raise'):
+            raise ValueError(f"late must be 'merge' or 'raise', not {late!r}")
+        self.freq = freq
+        self.freq_ns = pd.Timedelta(freq).value
+        self.cvd = cvd_offset
+        self.reorder_buckets = reorder_buckets
+        self.price_scale = price_scale
+        self.late = late
+        self.trades = 0
+        self.late_bars = 0
+        self._keys = np.empty(0, dtype=np.int64)
+        self._pending = None
+        self._late = None
+        self._emitted_through = None
+
+    def update(self, df_trades):
+        """Add a batch of raw trades; returns the bars that are now final"""
+        if len(df_trades) == 0:
+            return _no_bars()
+        normalize_trades(df_trades, cvd_offset=self.cvd)
+        return self.update_arrays(
+            timestamps_ns(df_trades['ts_event']),
+            *(df_trades[c].to_numpy() for c in ('price', 'size', 'delta', 'running_cvd'))
+        )
+
+    def update_arrays(self, ts_ns, price, size, delta, running_cvd):
+        """
+        Add a batch already as trade arrays (``running_cvd`` continuing from
+        ``self.cvd``); returns the bars that are now final.
+        """
+        if len(ts_ns) == 0:
+            return _no_bars()
+        self.cvd = int(running_cvd[-1])
+        self.trades += len(ts_ns)
+
+        with stage('bucket', len(ts_ns)) as record:
+            keys, order = bucket_trades(ts_ns, self.freq_ns)
+            arrays = [price, size, delta, running_cvd]
+            if order is not None:
+                arrays = [a[order] for a in arrays]
+            starts = segment_starts(keys)
+            record.rows_out = len(starts)
+        with stage('aggregate', len(ts_ns)) as record:
+            self._merge(keys[starts], reduce_segments(starts, *arrays))
+            record.rows_out = len(starts)
+
+        if len(self._keys) == 0:
+            return self._emit(0)
+        newest = self._keys[-1]
+        return self._emit(np.searchsorted(self._keys, newest - self.reorder_buckets))
+
+    def flush(self):
+        """Emit every remaining bar; call once the stream is exhausted"""
+        return self._emit(len(self._keys))
+
+    def _merge(self, keys, columns):
+        if self._emitted_through is not None and keys[0] <= self._emitted_through:
+            if self.late == 'raise':
+                raise ValueError(
+                    f'trade for bucket {pd.Timestamp(keys[0] * self.freq_ns, tz="UTC")} '
+                    f'arrived after that bar was emitted; raise reorder_buckets'
+                )
+            # Bars already emitted: their late prints go out as partial bars
+            n_late = np.searchsorted(keys, self._emitted_through, side='right')
+            self._late = (keys[:n_late], {n: v[:n_late] for n, v in columns.items()})
+            self.late_bars += n_late
+            keys, columns = keys[n_late:], {n: v[n_late:] for n, v in columns.items()}
+            if len(keys) == 0:
+                return
+        if self._pending is None:
+            self._keys, self._pending = keys, columns
+            return
+        # Pending bars came first in arrival order, so a stable sort keeps
+        # their open/cvd_open ahead of the new batch's
+        keys = np.concatenate([self._keys, keys])
+        columns = {n: np.concatenate([self._pending[n], columns[n]]) for n in BAR_COLUMNS}
+        if not np.all(keys[1:] >= keys[:-1]):
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            columns = {n: v[order] for n, v in columns.items()}
+        starts = segment_starts(keys)
+        self._keys, self._pending = keys[starts], rollup_segments(starts, columns)
+
+    def _frame(self, keys, columns):
+        if self.price_scale is not None:
+            # Fixed-point prices (update_arrays on DBN records) become float here
+            columns = dict(columns)
+            for name in PRICE_COLUMNS:
+                columns[name] = columns[name] / self.price_scale
+        return bars_frame(keys * self.freq_ns, columns)
+
+    def _emit(self, count):
+        late, self._late = self._late, None
+        if self._pending is None:
+            return _no_bars() if late is None else self._frame(*late)
+        done = self._frame(self._keys[:count], {n: v[:count] for n, v in self._pending.items()})
+        if count:
+            self._emitted_through = self._keys[count - 1]
+        self._keys = self._keys[count:]
+        self._pending = {n: v[count:] for n, v in self._pending.items()}
+        if late is not None:
+            done = pd.concat([self._frame(*late), done])
+        return done
+
+
+def stream_bars(data, freq='1min', batch_size=DEFAULT_BATCH_SIZE, cvd_offset=0):
+    """
+    Yield finished bar frames from a DBN store, ``batch_size`` trades at a time.
+
+    ``data`` is what ``client.timeseries.get_range`` returns (or any object
+    whose ``to_df(count=...)`` yields trade frames); pull it with ``path=``
+    so it is read from disk. A bar may be yielded again, partial, for late
+    prints (see ``combine_bars``).
+    """
+    builder = StreamingBarBuilder(freq, cvd_offset=cvd_offset)
+    for df_trades in data.to_df(count=batch_size):
+        bars = builder.update(df_trades)
+        if len(bars):
+            yield bars
+    bars = builder.flush()
+    if len(bars):
+        yield bars
+
+
+def build_bars_streaming(data, freq='1min', batch_size=DEFAULT_BATCH_SIZE):
+    """Streaming equivalent of ``build_bars(normalize_trades(data.to_df()))``"""
+    return combine_bars(stream_bars(data, freq, batch_size), freq)
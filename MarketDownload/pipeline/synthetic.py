@@ -0,0 +1,69 @@
+"""Deterministic synthetic trades for benchmarks and offline checks"""
+import numpy as np
+import pandas as pd
+
+TICK_SIZE = 0.25
+
+
+def synthetic_trades(n, seed=0, start='2025-07-14T13:30:00Z', trades_per_second=50.0,
+                     start_price=6292.0, instrument_id=1):
+    """
+    Generate ``n`` trades shaped like ``DBNStore.to_df()`` output for MESU5.
+
+    Prices follow a tick-sized random walk, sizes are small positive
+    integers and sides are drawn from B/A/N in roughly live proportions.
+    ``sequence`` increases with small gaps like the venue sequence numbers.
+    The same ``seed`` always gives the same trades.
+    """
+    rng = np.random.default_rng(seed)
+
+    gaps = rng.exponential(1e9 / trades_per_second, n).astype(np.int64)
+    ts = pd.Timestamp(start).value + np.cumsum(gaps)
+
+    steps = rng.choice(np.array([-1, 0, 1], dtype=np.int64), n, p=[0.2, 0.6, 0.2])
+    price = start_price + TICK_SIZE * np.cumsum(steps)
+
+    size = rng.geometric(0.45, n).astype(np.uint32)
+    side = np.array(['B', 'A', 'N'], dtype=object)[
+        rng.choice(3, n, p=[0.49, 0.49, 0.02])
+    ]
+    sequence = np.cumsum(rng.integers(1, 4, n, dtype=np.int64)).astype(np.uint32)
+
+    return pd.DataFrame({
+        'ts_event': pd.to_datetime(ts, utc=True),
+        'price': price,
+        'size': size,
+        'side': side,
+        'sequence': sequence,
+        'instrument_id': np.full(n, instrument_id, dtype=np.uint32),
+    })
+
+
+# Field layout of a DBN trade record as ``DBNStore.to_ndarray()`` returns it
+TRADE_RECORD_DTYPE = np.dtype([
+    ('rtype', 'u1'), ('publisher_id', '<u2'), ('instrument_id', '<u4'),
+    ('ts_event', '<u8'), ('price', '<i8'), ('size', '<u4'), ('action', 'S1'),
+    ('side', 'S1'), ('flags', 'u1'), ('depth', 'u1'), ('ts_recv', '<u8'),
+    ('ts_in_delta', '<i4'), ('sequence', '<u4'),
+])
+
+
+def synthetic_records(n, seed=0, **kwargs):
+    """
+    The trades of ``synthetic_trades(n, seed, **kwargs)`` as a DBN trade
+    record array: uint64 ns timestamps, 1e9 fixed-point prices, byte sides.
+    """
+    df = synthetic_trades(n, seed, **kwargs)
+    ts = df['ts_event'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    records = np.zeros(n, dtype=TRADE_RECORD_DTYPE)
+    records['rtype'] = 0
+    records['publisher_id'] = 1
+    records['instrument_id'] = df['instrument_id'].to_numpy()
+    records['ts_event'] = ts
+    records['price'] = np.rint(df['price'].to_numpy() * 1_000_000_000).astype(np.int64)
+    records['size'] = df['size'].to_numpy()
+    records['action'] = b'T'
+    records['side'] = df['side'].to_numpy().astype('S1')
+    records['ts_recv'] = ts
+    records['sequence'] = df['sequence'].to_numpy()
+    return records
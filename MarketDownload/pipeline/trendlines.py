@@ -0,0 +1,177 @@
+"""
+Rolling support/resistance trendlines and swing pivots, precomputed per bar.
+
+The strategy's ``fitTrendlinesWindow`` (src/indicators/trendlines.ts) fits,
+for the last ``window`` values, a support line under every point and a
+resistance line over every point, each through the pivot with the lowest /
+highest residual from the least-squares slope, with the slope chosen by an
+iterative step search (``optimizeSlope``) that re-checks the whole window
+(``checkTrendLine``) at every step.
+
+The search minimizes the squared distance ``sum((s * d_i - dy_i) ** 2)``
+over slopes ``s`` that keep the line on the right side of every point, where
+``d_i = i - pivot`` and ``dy_i = y_i - y_pivot``. That is a convex quadratic
+in ``s`` on an interval, so its minimum is closed form: the unconstrained
+optimum ``sum(d * dy) / sum(d * d)`` clipped to the feasible interval, whose
+ends are the min/max of ``dy_i / d_i`` on either side of the pivot. The
+search converges to the same slope (to within its ``MIN_STEP``), so here
+every window is solved at once on a ``sliding_window_view`` of the series:
+one pass of array ops per chunk of windows, no iteration.
+
+Swing pivots are bars whose high (low) is above (below) the ``left`` bars
+before and not exceeded by the ``right`` bars after. A pivot is only known
+``right`` bars later, so its value is reported on the bar that confirms it
+and consumers reading row by row never see the future.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .profiling import stage
+
+# CONFIG.WINDOW_SIZE and CONFIG.TOL_PCT in src/config/constants.ts
+TRENDLINE_WINDOW = 5
+BREAKOUT_TOL_PCT = 0.001
+PIVOT_BARS = 2
+
+# Source column -> output prefix
+TRENDLINE_SOURCES = {'close': 'tl', 'cvd_close': 'cvd_tl'}
+# Output prefix -> (high, low) source columns
+PIVOT_SOURCES = {'price': ('high', 'low'), 'cvd': ('cvd_high', 'cvd_low')}
+
+TRENDLINE_FIELDS = ('sup_slope', 'sup_intercept', 'res_slope', 'res_intercept', 'breakout')
+
+# Windows solved per block, to bound the (windows x window) temporaries
+CHUNK_WINDOWS = 1 << 16
+
+
+def _pivot_slopes(windows, pivot, support):
+    """Best slope through ``pivot`` per window, keeping the line under/over every point"""
+    rows = np.arange(len(windows))
+    d = np.arange(windows.shape[1])[None, :] - pivot[:, None]
+    dy = windows - windows[rows, pivot][:, None]
+
+    best = (d * dy).sum(axis=1) / (d * d).sum(axis=1)
+
+    # Support: s * d <= dy, so s <= dy / d after the pivot and s >= dy / d
+    # before it; resistance flips both
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = dy / d
+    after, before = d > 0, d < 0
+    if not support:
+        after, before = before, after
+    upper = np.where(after, ratio, np.inf).min(axis=1)
+    lower = np.where(before, ratio, -np.inf).max(axis=1)
+    return np.clip(best, lower, upper)
+
+
+def _fit_windows(windows):
+    """Support and resistance slope/intercept for each row of ``windows``"""
+    n = windows.shape[1]
+    x = np.arange(n, dtype=np.float64)
+    xc = x - x.mean()
+    slope = windows @ xc / (xc @ xc)
+
+    # Pivots: lowest / highest residual from the least-squares slope
+    # (first one on ties, like indexOf(Math.min(...)))
+    residuals = windows - slope[:, None] * x
+    lo_piv = residuals.argmin(axis=1)
+    up_piv = residuals.argmax(axis=1)
+
+    rows = np.arange(len(windows))
+    sup_slope = _pivot_slopes(windows, lo_piv, True)
+    res_slope = _pivot_slopes(windows, up_piv, False)
+    sup_int = windows[rows, lo_piv] - sup_slope * lo_piv
+    res_int = windows[rows, up_piv] - res_slope * up_piv
+    return sup_slope, sup_int, res_slope, res_int
+
+
+def rolling_trendlines(values, window=TRENDLINE_WINDOW, tol_pct=BREAKOUT_TOL_PCT):
+    """
+    Trendlines of the ``window`` values ending at each bar.
+
+    Returns a dict of arrays named by ``TRENDLINE_FIELDS``: slopes per bar
+    and intercepts at the window's first bar (as fitTrendlinesWindow), and
+    ``breakout`` +1 (bullish) / -1 (bearish) / 0 from the last value against
+    the lines with the same ``tol_pct`` rule. Bars before the first full
+    window are NaN (breakout 0).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = {name: np.full(n, np.nan) for name in TRENDLINE_FIELDS[:4]}
+    breakout = np.zeros(n, dtype=np.int8)
+    if n >= window:
+        windows = sliding_window_view(values, window)
+        for lo in range(0, len(windows), CHUNK_WINDOWS):
+            block = windows[lo:lo + CHUNK_WINDOWS]
+            rows = slice(window - 1 + lo, window - 1 + lo + len(block))
+            for name, column in zip(TRENDLINE_FIELDS, _fit_windows(block)):
+                out[name][rows] = column
+
+        last = values[window - 1:]
+        support = out['sup_slope'][window - 1:] * (window - 1) + out['sup_intercept'][window - 1:]
+        resist = out['res_slope'][window - 1:] * (window - 1) + out['res_intercept'][window - 1:]
+        tol = np.abs(resist) * tol_pct
+        breakout[window - 1:] = np.where(last >= resist - tol, 1,
+                                         np.where(last <= support + tol, -1, 0))
+    out['breakout'] = breakout
+    return out
+
+
+def swing_pivots(high, low, left=PIVOT_BARS, right=PIVOT_BARS):
+    """
+    Confirmed swing pivot highs and lows.
+
+    Returns (pivot_high, pivot_low): the pivot's value on the bar ``right``
+    bars after it (when it is confirmed), NaN everywhere else.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    pivot_high, pivot_low = np.full(n, np.nan), np.full(n, np.nan)
+    span = left + 1 + right
+    if n < span:
+        return pivot_high, pivot_low
+
+    hw, lw = sliding_window_view(high, span), sliding_window_view(low, span)
+    h, l = hw[:, left], lw[:, left]
+    is_high = ((h > hw[:, :left].max(axis=1, initial=-np.inf))
+               & (h >= hw[:, left + 1:].max(axis=1, initial=-np.inf)))
+    is_low = ((l < lw[:, :left].min(axis=1, initial=np.inf))
+              & (l <= lw[:, left + 1:].min(axis=1, initial=np.inf)))
+
+    # Window k is centred on bar k + left and confirmed at bar k + span - 1
+    confirmed = np.arange(span - 1, n)
+    pivot_high[confirmed[is_high]] = h[is_high]
+    pivot_low[confirmed[is_low]] = l[is_low]
+    return pivot_high, pivot_low
+
+
+def trendline_columns(sources=TRENDLINE_SOURCES, pivot_sources=PIVOT_SOURCES):
+    """Output column names: trendline fields by source, then pivots"""
+    columns = [f'{prefix}_{name}' for prefix in sources.values() for name in TRENDLINE_FIELDS]
+    for prefix in pivot_sources:
+        columns += [f'{prefix}_pivot_high', f'{prefix}_pivot_low']
+    return columns
+
+
+def compute_trendlines(df, sources=TRENDLINE_SOURCES, pivot_sources=PIVOT_SOURCES,
+                       window=TRENDLINE_WINDOW, tol_pct=BREAKOUT_TOL_PCT,
+                       left=PIVOT_BARS, right=PIVOT_BARS):
+    """
+    Rolling trendlines for each of ``sources`` and swing pivots for each of
+    ``pivot_sources``; returns a frame on ``df.index`` with the columns from
+    ``trendline_columns``.
+    """
+    columns = {}
+    with stage('trendlines', len(df)) as record:
+        for source, prefix in sources.items():
+            fit = rolling_trendlines(df[source].to_numpy(), window, tol_pct)
+            columns.update((f'{prefix}_{name}', fit[name]) for name in TRENDLINE_FIELDS)
+        for prefix, (high, low) in pivot_sources.items():
+            pivot_high, pivot_low = swing_pivots(df[high].to_numpy(), df[low].to_numpy(),
+                                                 left, right)
+            columns[f'{prefix}_pivot_high'] = pivot_high
+            columns[f'{prefix}_pivot_low'] = pivot_low
+        record.rows_out = len(df)
+    return pd.DataFrame(columns, index=df.index)
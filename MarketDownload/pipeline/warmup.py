@@ -0,0 +1,168 @@
+"""
+Warmup planning: how much history to fetch before ``start`` so the first
+output bar's indicators have converged.
+
+Every recursive indicator here is an exponential smoother seeded from the
+first bar (pandas ewm with ``adjust=False``): after ``k`` bars the seed still
+weighs ``(1 - alpha) ** k``. Chained smoothers compound, so the planner
+tracks the seed's weight through each chain and takes the smallest ``k``
+that brings every chain under ``tolerance``:
+
+- ``ema_{span}`` / ``cvd_ema_{span}``: one smoother, alpha = 2 / (span + 1)
+- ADX: Wilder smoothing of TR/+DM/-DM, then again of DX, alpha = 1 / period
+  (plus one bar, since the first bar has no previous bar for +DM/-DM)
+- Heikin Ashi: HA-Open is a smoother with alpha = 1/2, and the HA EMAs/ADX
+  are chained on top of it
+
+The warmup is counted in bars of the largest timeframe and walked back
+through CME Globex trading time (see ``session_start``), so a Monday
+morning start reaches back over the weekend into Friday instead of asking
+for empty hours. The warmup is pulled separately and joined in front of
+the bars with its CVD ending at 0, so CVD counts from ``start`` as it does
+without warmup (see ``run.fetch_warmup``); bars before ``start`` are
+trimmed from the output.
+"""
+import numpy as np
+import pandas as pd
+
+from .bars import timeframe_label
+from .indicators import ADX_PERIOD, EMA_PERIODS
+
+DEFAULT_TOLERANCE = 1e-6
+HA_ALPHA = 0.5
+
+# CME equity futures (MES/ES) trading hours in Chicago time, per weekday
+# (Monday = 0): Sunday 17:00 open, daily 16:00-17:00 halt, Friday 16:00
+# close. Exchange holidays are not modelled.
+CME_TIMEZONE = 'America/Chicago'
+CME_SESSIONS = {
+    0: [(0, 16), (17, 24)],
+    1: [(0, 16), (17, 24)],
+    2: [(0, 16), (17, 24)],
+    3: [(0, 16), (17, 24)],
+    4: [(0, 16)],
+    5: [],
+    6: [(17, 24)],
+}
+
+
+def chain_warmup(alphas, tolerance=DEFAULT_TOLERANCE):
+    """
+    Bars until the seed weighs at most ``tolerance`` at the end of a chain
+    of exponential smoothers (each one smoothing the previous one's output).
+    """
+    alphas = [float(a) for a in alphas]
+    if not alphas or tolerance >= 1:
+        return 0
+    if len(alphas) == 1:
+        return int(np.ceil(np.log(tolerance) / np.log1p(-alphas[0])))
+    # Seed weight per stage: each stage decays its own seed and takes in
+    # the still-unconverged output of the stage before it
+    error = np.ones(len(alphas))
+    decay = 1 - np.array(alphas)
+    k = 0
+    while error[-1] > tolerance:
+        k += 1
+        upstream = 0.0
+        for i, a in enumerate(alphas):
+            error[i] = decay[i] * error[i] + (a * upstream if i else 0.0)
+            upstream = error[i]
+    return k
+
+
+def warmup_bars(spans=EMA_PERIODS, period=ADX_PERIOD, heikin_ashi=False,
+                tolerance=DEFAULT_TOLERANCE):
+    """
+    Warmup bars for an EMA bank (``spans``), a Wilder ADX (``period``, or
+    None for no ADX) and, with ``heikin_ashi``, HA candles under them.
+    """
+    chains = [[2 / (span + 1)] for span in spans]
+    if period is not None:
+        chains.append([1 / period, 1 / period])
+    if heikin_ashi:
+        chains = [[HA_ALPHA]] + [[HA_ALPHA] + chain for chain in chains]
+    bars = max((chain_warmup(chain, tolerance) for chain in chains), default=0)
+    if period is not None:
+        bars += 1
+    return bars
+
+
+def session_intervals(day, sessions=CME_SESSIONS, tz=CME_TIMEZONE):
+    """Open intervals of one local calendar day as UTC timestamp pairs"""
+    day = pd.Timestamp(day).normalize()
+    return [
+        (
+            (day + pd.Timedelta(hours=open_hour)).tz_localize(tz).tz_convert('UTC'),
+            (day + pd.Timedelta(hours=close_hour)).tz_localize(tz).tz_convert('UTC'),
+        )
+        for open_hour, close_hour in sessions[day.weekday()]
+    ]
+
+
+def session_start(start, duration, sessions=CME_SESSIONS, tz=CME_TIMEZONE, max_days=60):
+    """
+    Timestamp ``duration`` of trading time before ``start``, skipping the
+    daily halt and weekends.
+    """
+    start = pd.Timestamp(start)
+    if start.tzinfo is None:
+        start = start.tz_localize('UTC')
+    remaining = pd.Timedelta(duration)
+    if remaining <= pd.Timedelta(0):
+        return start
+    day = start.tz_convert(tz).tz_localize(None).normalize()
+    for _ in range(max_days):
+        for open_ts, close_ts in reversed(session_intervals(day, sessions, tz)):
+            close_ts = min(close_ts, start)
+            if close_ts <= open_ts:
+                continue
+            if close_ts - open_ts >= remaining:
+                return close_ts - remaining
+            remaining -= close_ts - open_ts
+        day -= pd.Timedelta(days=1)
+    raise ValueError(f'no {duration} of trading time within {max_days} days before {start}')
+
+
+class WarmupPlan:
+    """Where to fetch from so ``start`` is warm; from ``plan_warmup``"""
+
+    def __init__(self, start, fetch_start, bars, freq, tolerance):
+        self.start = start
+        self.fetch_start = fetch_start
+        self.bars = bars
+        self.freq = freq
+        self.tolerance = tolerance
+
+    @property
+    def duration(self):
+        return self.bars * self.freq
+
+    def __repr__(self):
+        return (f'WarmupPlan({self.bars} x {timeframe_label(self.freq)} bars, fetch from '
+                f'{self.fetch_start.isoformat()} for {self.start.isoformat()})')
+
+
+def plan_warmup(start, timeframes=('1min',), spans=EMA_PERIODS, period=ADX_PERIOD,
+                heikin_ashi=False, tolerance=DEFAULT_TOLERANCE,
+                sessions=CME_SESSIONS, tz=CME_TIMEZONE):
+    """
+    Plan the warmup for ``start``: bars come from ``warmup_bars`` and are
+    counted at the largest of ``timeframes``.
+    """
+    start = pd.Timestamp(start)
+    if start.tzinfo is None:
+        start = start.tz_localize('UTC')
+    freq = max(pd.Timedelta(tf) for tf in timeframes)
+    bars = warmup_bars(spans, period, heikin_ashi, tolerance)
+    return WarmupPlan(start, session_start(start, bars * freq, sessions, tz), bars, freq,
+                      tolerance)
+
+
+def trim_warmup(df, start, time_col='timestamp'):
+    """Rows at or after ``start`` (by ``time_col``, or the index if it is None)"""
+    ts = df.index if time_col is None else df[time_col]
+    keep = ts >= start
+    if keep.all():
+        return df
+    out = df[np.asarray(keep)]
+    return out if time_col is None else out.reset_index(drop=True)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The pipeline package lives next to the scripts in MarketDownload/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeStore:
+    """Stands in for a DBNStore holding a ``to_df()``-shaped frame (ts_recv index)"""
+
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(pd.read_pickle(path))
+
+    def to_df(self, count=None):
+        if count is None:
+            return self.df.copy()
+        return (self.df.iloc[i:i + count].copy() for i in range(0, len(self.df), count))
+
+
+class FakeTimeseries:
+    """
+    ``timeseries.get_range`` over a fixed trade frame, filtered on symbol and
+    on ``[start, end)`` of its ts_recv index, written to ``path`` if given.
+    ``failures`` maps a request start to a list of errors to raise (one per
+    call) before the request succeeds.
+    """
+
+    def __init__(self, trades, failures=None):
+        self.trades = trades
+        self.failures = {k: list(v) for k, v in (failures or {}).items()}
+        self.calls = []
+
+    def get_range(self, dataset, symbols, schema, start, end, stype_in='raw_symbol', path=None,
+                  **kwargs):
+        self.calls.append((start, end))
+        pending = self.failures.get(start)
+        if pending:
+            raise pending.pop(0)
+        df = self.trades if symbols is None else self.trades[self.trades['symbol'].isin(symbols)]
+        ts = df.index
+        df = df[(ts >= pd.Timestamp(start)) & (ts < pd.Timestamp(end))]
+        if path is not None:
+            df.to_pickle(path)
+        return FakeStore(df)
+
+
+class FakeClient:
+    def __init__(self, trades, failures=None):
+        self.timeseries = FakeTimeseries(trades, failures)
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient
+
+
+@pytest.fixture
+def fake_store():
+    return FakeStore
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from pipeline import BAR_KINDS, activity_bar_starts, synthetic_trades
+
+
+def reference_starts(kind, price, size, threshold, multiplier=5.0):
+    """One trade at a time: a bar closes on the trade that meets the threshold"""
+    starts, start, total = [], 0, 0.0
+    for i in range(len(price)):
+        if i == start:
+            starts.append(i)
+            high = low = price[i]
+            total = 0.0
+        high, low = max(high, price[i]), min(low, price[i])
+        if kind == 'tick':
+            total += 1
+        elif kind == 'volume':
+            total += size[i]
+        elif kind == 'dollar':
+            total += price[i] * size[i] * multiplier
+        if (high - low if kind == 'range' else total) >= threshold:
+            start = i + 1
+    return np.array(starts, dtype=np.int64)
+
+
+@pytest.mark.parametrize('kind, threshold', [
+    ('tick', 7), ('volume', 1), ('volume', 40), ('dollar', 2e5), ('range', 0.25), ('range', 1.5),
+])
+def test_matches_trade_by_trade(kind, threshold):
+    df = synthetic_trades(5_000, seed=11)
+    price, size = df['price'].to_numpy(), df['size'].to_numpy()
+    expected = reference_starts(kind, price, size, threshold)
+    np.testing.assert_array_equal(activity_bar_starts(kind, price, size, threshold), expected)
+
+
+def test_range_bar_without_close_runs_to_the_end():
+    price = np.array([100.0, 100.25, 100.0, 101.0, 101.25, 101.0])
+    np.testing.assert_array_equal(activity_bar_starts('range', price, None, 1.0), [0, 4])
+    np.testing.assert_array_equal(activity_bar_starts('range', price, None, 50.0), [0])
+
+
+@pytest.mark.parametrize('kind, threshold', [(kind, t) for kind in BAR_KINDS for t in (0, -1)]
+                         + [('tick', 0.5)])
+def test_rejects_thresholds_that_never_close(kind, threshold):
+    price, size = np.full(3, 100.0), np.ones(3, dtype=np.uint32)
+    with pytest.raises(ValueError):
+        activity_bar_starts(kind, price, size, threshold)
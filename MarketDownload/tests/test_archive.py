@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import TradeArchive
+
+
+def ts(text):
+    return pd.Timestamp(text, tz='UTC')
+
+
+def pull(times, price=100.0):
+    """A to_df()-style frame with one trade at each of ``times``"""
+    stamps = pd.to_datetime([ts(t) for t in times], utc=True)
+    return pd.DataFrame({
+        'ts_event': stamps,
+        'price': np.full(len(times), price),
+        'size': np.ones(len(times), dtype=np.uint32),
+        'side': 'B',
+    }, index=pd.DatetimeIndex(stamps, name='ts_recv'))
+
+
+def times(records):
+    return [pd.Timestamp(t, tz='UTC') for t in records['ts_recv']]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return TradeArchive(str(tmp_path))
+
+
+def test_rewrite_replaces_only_its_window(archive):
+    archive.write('MES', pull(['2025-07-14 10:30', '2025-07-14 11:00', '2025-07-14 11:30']),
+                  '2025-07-14 10:00', '2025-07-14 12:00')
+    archive.write('MES', pull(['2025-07-14 11:05'], price=101.0),
+                  '2025-07-14 10:45', '2025-07-14 11:15')
+
+    records = archive.slice('MES', '2025-07-14 10:00', '2025-07-14 12:00')
+    assert times(records) == [ts('2025-07-14 10:30'), ts('2025-07-14 11:05'),
+                              ts('2025-07-14 11:30')]
+    assert archive.missing('MES', '2025-07-14 10:00', '2025-07-14 12:00') == []
+
+
+def test_window_over_midnight_joins_both_days(archive):
+    archive.write('MES', pull(['2025-07-14 23:30', '2025-07-15 00:30']),
+                  '2025-07-14 23:00', '2025-07-15 01:00')
+
+    assert archive.days('MES') == [ts('2025-07-14'), ts('2025-07-15')]
+    records = archive.slice('MES', '2025-07-14 23:00', '2025-07-15 01:00')
+    assert times(records) == [ts('2025-07-14 23:30'), ts('2025-07-15 00:30')]
+    assert times(archive.slice('MES', '2025-07-15 00:00', '2025-07-15 01:00')) == \
+        [ts('2025-07-15 00:30')]
+
+
+def test_slice_of_an_uncovered_window_raises(archive):
+    archive.write('MES', pull(['2025-07-14 10:30']), '2025-07-14 10:00', '2025-07-14 11:00')
+
+    with pytest.raises(ValueError, match='2025-07-14 09:00'):
+        archive.slice('MES', '2025-07-14 09:00', '2025-07-14 10:30')
+    with pytest.raises(ValueError):
+        archive.slice('MES', '2025-07-14 10:30', '2025-07-15 00:30')
+    with pytest.raises(ValueError):
+        archive.slice('MNQ', '2025-07-14 10:00', '2025-07-14 11:00')
+
+
+def test_missing_returns_the_exact_gaps(archive):
+    archive.write('MES', pull([]), '2025-07-14 10:00', '2025-07-14 12:00')
+    archive.write('MES', pull([]), '2025-07-14 13:00', '2025-07-14 14:00')
+    archive.write('MES', pull([]), '2025-07-15 01:00', '2025-07-15 02:00')
+
+    assert archive.missing('MES', '2025-07-14 09:00', '2025-07-15 03:00') == [
+        (ts('2025-07-14 09:00'), ts('2025-07-14 10:00')),
+        (ts('2025-07-14 12:00'), ts('2025-07-14 13:00')),
+        (ts('2025-07-14 14:00'), ts('2025-07-15 01:00')),
+        (ts('2025-07-15 02:00'), ts('2025-07-15 03:00')),
+    ]
+    # An empty but covered window is not a gap
+    assert len(archive.slice('MES', '2025-07-14 10:00', '2025-07-14 12:00')) == 0
+
+
+def test_write_leaves_no_temp_files(archive, tmp_path):
+    archive.write('MES', pull(['2025-07-14 10:30']), '2025-07-14 10:00', '2025-07-14 11:00')
+    names = sorted(os.listdir(tmp_path / 'MES'))
+    assert names == ['2025-07-14.idx.npy', '2025-07-14.ranges.json', '2025-07-14.trades']
+    reopened = TradeArchive(str(tmp_path))
+    assert times(reopened.slice('MES', '2025-07-14 10:00', '2025-07-14 11:00')) == \
+        [ts('2025-07-14 10:30')]
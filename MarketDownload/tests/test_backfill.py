@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import (
+    PipelineConfig, build_bars, normalize_trades, run_backfill, session_chunks, synthetic_trades,
+)
+
+START = '2025-07-14T00:00:00Z'
+
+
+@pytest.fixture(scope='module')
+def trades():
+    """A few sessions of MESU5 trades, none in the daily halt"""
+    df = synthetic_trades(150_000, seed=7, start=START, trades_per_second=0.5)
+    df['symbol'] = 'MESU5'
+    df.index = pd.DatetimeIndex(df['ts_event'], name='ts_recv')
+    keep = np.zeros(len(df), dtype=bool)
+    for s, e in session_chunks(START, df['ts_event'].iat[-1] + pd.Timedelta('1s')):
+        keep |= ((df['ts_event'] >= s) & (df['ts_event'] < e)).to_numpy()
+    return df[keep]
+
+
+def config(tmp_path, start=START, end='2025-07-17T12:00:00Z'):
+    return PipelineConfig(start=start, end=end, output_dir=str(tmp_path),
+                          products=['traditional'])
+
+
+def expected_bars(trades, start, end):
+    ts = trades['ts_event']
+    df = trades[(ts >= pd.Timestamp(start)) & (ts < pd.Timestamp(end))].copy()
+    return build_bars(normalize_trades(df))
+
+
+def assert_bars_equal(result, expected):
+    pd.testing.assert_frame_equal(result['bars']['MESU5']['1min'], expected,
+                                  check_freq=False, check_index_type=False)
+
+
+def test_transient_errors_are_retried(tmp_path, trades, fake_client):
+    cfg = config(tmp_path)
+    first = session_chunks(cfg.start, cfg.end)[0][0].isoformat()
+    client = fake_client(trades, {first: [ConnectionError('reset'), TimeoutError('slow')]})
+    sleeps = []
+    result = run_backfill(client, cfg, workers=2, retries=3, backoff=0.5, sleep=sleeps.append)
+    assert sleeps == [0.5, 1.0]
+    assert_bars_equal(result, expected_bars(trades, cfg.start, cfg.end))
+
+
+def test_non_transient_errors_are_not_retried(tmp_path, trades, fake_client):
+    cfg = config(tmp_path)
+    first = session_chunks(cfg.start, cfg.end)[0][0].isoformat()
+    client = fake_client(trades, {first: [ValueError('bad request')]})
+    sleeps = []
+    with pytest.raises(ValueError, match='bad request'):
+        run_backfill(client, cfg, workers=1, retries=3, sleep=sleeps.append)
+    assert sleeps == []
+
+
+def test_failed_chunks_resume(tmp_path, trades, fake_client):
+    cfg = config(tmp_path)
+    chunks = session_chunks(cfg.start, cfg.end)
+    failing = chunks[1][0].isoformat()
+    client = fake_client(trades, {failing: [ConnectionError('down')] * 3})
+    with pytest.raises(RuntimeError, match='1 of 4 chunks failed'):
+        run_backfill(client, cfg, workers=2, retries=2, sleep=lambda s: None)
+
+    client = fake_client(trades)
+    result = run_backfill(client, cfg, sleep=lambda s: None)
+    assert [start for start, _ in client.timeseries.calls] == [failing]
+    assert_bars_equal(result, expected_bars(trades, cfg.start, cfg.end))
+
+
+def test_widened_window_refetches_the_cut_short_chunk(tmp_path, trades, fake_client):
+    run_backfill(fake_client(trades), config(tmp_path, end='2025-07-15T12:00:00Z'))
+
+    cfg = config(tmp_path)
+    client = fake_client(trades)
+    result = run_backfill(client, cfg)
+    cut_short = session_chunks(cfg.start, '2025-07-15T12:00:00Z')[-1][0].isoformat()
+    assert cut_short in [start for start, _ in client.timeseries.calls]
+    assert_bars_equal(result, expected_bars(trades, cfg.start, cfg.end))
+
+
+def test_later_start_leaves_out_old_chunks(tmp_path, trades, fake_client):
+    run_backfill(fake_client(trades), config(tmp_path))
+
+    cfg = config(tmp_path, start='2025-07-15T06:00:00Z')
+    result = run_backfill(fake_client(trades), cfg)
+    bars = result['bars']['MESU5']['1min']
+    assert bars.index.is_unique
+    assert bars.index[0] >= pd.Timestamp(cfg.start)
+    assert_bars_equal(result, expected_bars(trades, cfg.start, cfg.end))
+
+
+def test_cvd_carries_across_chunks(tmp_path, trades, fake_client):
+    cfg = config(tmp_path)
+    bars = run_backfill(fake_client(trades), cfg)['bars']['MESU5']['1min']
+    # Each session's first bar continues from the previous session's last
+    for chunk_start, _ in session_chunks(cfg.start, cfg.end)[1:]:
+        i = bars.index.searchsorted(chunk_start)
+        assert bars['cvd_close'].iat[i] == bars['cvd_close'].iat[i - 1] + bars['delta'].iat[i]
+    np.testing.assert_array_equal(bars['cvd_close'].to_numpy(), bars['delta'].cumsum().to_numpy())
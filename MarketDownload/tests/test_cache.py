@@ -0,0 +1,154 @@
+import os
+
+import pandas as pd
+import pytest
+
+from pipeline import CachedHistorical, synthetic_trades
+
+
+@pytest.fixture(scope='module')
+def trades():
+    df = synthetic_trades(20_000, seed=3, start='2025-07-14T09:00:00Z', trades_per_second=2)
+    df['symbol'] = 'MESU5'
+    df.index = pd.DatetimeIndex(df['ts_event'], name='ts_recv')
+    return df
+
+
+@pytest.fixture
+def cached(tmp_path, trades, fake_client, fake_store):
+    def make(**kwargs):
+        client = fake_client(trades)
+        return client, CachedHistorical(client, str(tmp_path / 'cache'),
+                                        open_store=fake_store.from_file, **kwargs)
+    return make
+
+
+def pull(cache, start, end, **kwargs):
+    return cache.timeseries.get_range(dataset='GLBX.MDP3', symbols=['MESU5'], schema='trades',
+                                      start=start, end=end, **kwargs)
+
+
+def window(trades, start, end):
+    ts = trades.index
+    return trades[(ts >= pd.Timestamp(start)) & (ts < pd.Timestamp(end))]
+
+
+def test_hit_and_miss(cached, trades):
+    client, cache = cached()
+    pd.testing.assert_frame_equal(pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z').to_df(),
+                                  window(trades, '2025-07-14T10:00Z', '2025-07-14T11:00Z'))
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z').to_df()
+    assert (cache.hits, cache.misses, cache.fetches) == (1, 1, 1)
+    assert len(client.timeseries.calls) == 1
+
+
+def test_sub_range_is_served_from_the_cache(cached, trades):
+    client, cache = cached()
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T12:00Z')
+    df = pull(cache, '2025-07-14T10:30Z', '2025-07-14T10:45Z').to_df()
+    pd.testing.assert_frame_equal(df, window(trades, '2025-07-14T10:30Z', '2025-07-14T10:45Z'))
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(client.timeseries.calls) == 1
+
+
+def test_overlapping_request_fetches_only_the_gaps(cached, trades):
+    client, cache = cached()
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z')
+    pull(cache, '2025-07-14T12:00Z', '2025-07-14T13:00Z')
+    store = pull(cache, '2025-07-14T09:30Z', '2025-07-14T13:30Z')
+    expected = window(trades, '2025-07-14T09:30Z', '2025-07-14T13:30Z')
+    pd.testing.assert_frame_equal(store.to_df(), expected)
+    pd.testing.assert_frame_equal(pd.concat(store.to_df(count=500)), expected)
+
+    gaps = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in client.timeseries.calls[2:]]
+    assert gaps == [(pd.Timestamp('2025-07-14T09:30Z'), pd.Timestamp('2025-07-14T10:00Z')),
+                    (pd.Timestamp('2025-07-14T11:00Z'), pd.Timestamp('2025-07-14T12:00Z')),
+                    (pd.Timestamp('2025-07-14T13:00Z'), pd.Timestamp('2025-07-14T13:30Z'))]
+    assert (cache.hits, cache.misses, cache.partial, cache.fetches) == (0, 3, 1, 5)
+
+    # Now fully covered by the stitched pieces
+    pd.testing.assert_frame_equal(pull(cache, '2025-07-14T09:45Z', '2025-07-14T13:15Z').to_df(),
+                                  window(trades, '2025-07-14T09:45Z', '2025-07-14T13:15Z'))
+    assert cache.hits == 1 and len(client.timeseries.calls) == 5
+
+
+def test_extra_arguments_are_part_of_the_key(cached):
+    client, cache = cached()
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z', limit=10)
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z')
+    pull(cache, '2025-07-14T10:10Z', '2025-07-14T10:20Z', limit=10)
+    assert len(client.timeseries.calls) == 3
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z', limit=10)
+    assert cache.hits == 1 and len(client.timeseries.calls) == 3
+
+
+def test_all_symbols(cached, trades):
+    client, cache = cached()
+    df = cache.timeseries.get_range(dataset='GLBX.MDP3', symbols=None, schema='trades',
+                                    start='2025-07-14T10:00Z', end='2025-07-14T10:05Z').to_df()
+    pd.testing.assert_frame_equal(df, window(trades, '2025-07-14T10:00Z', '2025-07-14T10:05Z'))
+
+
+def test_eviction_by_size(cached):
+    client, cache = cached()
+    for hour in (10, 11, 12):
+        pull(cache, f'2025-07-14T{hour}:00Z', f'2025-07-14T{hour}:30Z')
+    files = sorted(os.listdir(cache.cache_dir))
+    sizes = [os.path.getsize(os.path.join(cache.cache_dir, f)) for f in files if f.endswith('.dbn')]
+
+    # Room for two pulls: the least recently used one goes
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T10:30Z')
+    cache.max_bytes = sum(sizes) - min(sizes)
+    cache.evict()
+    assert cache.evictions == 1
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T10:30Z')
+    pull(cache, '2025-07-14T11:00Z', '2025-07-14T11:30Z')
+    assert cache.hits == 2 and cache.misses == 4
+
+
+def test_eviction_by_age(cached):
+    client, cache = cached(max_age=0)
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T10:30Z')
+    pull(cache, '2025-07-14T11:00Z', '2025-07-14T11:30Z')
+    assert cache.evictions == 1
+    assert len([f for f in os.listdir(cache.cache_dir) if f.endswith('.dbn')]) == 1
+
+
+def during_fetch(client, hook):
+    """Run ``hook`` while the client downloads, i.e. between a pull's plan and its reads"""
+    get_range = client.timeseries.get_range
+
+    def wrapped(*args, **kwargs):
+        hook()
+        return get_range(*args, **kwargs)
+    client.timeseries.get_range = wrapped
+
+
+def test_eviction_during_a_pull_keeps_its_planned_pieces(cached, trades, tmp_path, fake_store):
+    client, cache = cached()
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z')
+
+    # Another script on the same cache dir evicts everything it can
+    other = CachedHistorical(client, str(tmp_path / 'cache'), max_bytes=1,
+                             open_store=fake_store.from_file)
+    during_fetch(client, other.evict)
+    df = pull(cache, '2025-07-14T10:00Z', '2025-07-14T12:00Z').to_df()
+    pd.testing.assert_frame_equal(df, window(trades, '2025-07-14T10:00Z', '2025-07-14T12:00Z'))
+    assert other.evictions == 0
+
+    # Once the pull is done its pieces are no longer leased
+    other.evict()
+    assert other.evictions == 2
+
+
+def test_planned_piece_that_disappears_is_downloaded_again(cached, trades):
+    client, cache = cached()
+    pull(cache, '2025-07-14T10:00Z', '2025-07-14T11:00Z')
+
+    def clear_index():
+        if len(client.timeseries.calls) == 1:
+            os.remove(os.path.join(cache.cache_dir, 'index.json'))
+    during_fetch(client, clear_index)
+    df = pull(cache, '2025-07-14T10:00Z', '2025-07-14T12:00Z').to_df()
+    pd.testing.assert_frame_equal(df, window(trades, '2025-07-14T10:00Z', '2025-07-14T12:00Z'))
+    assert [pd.Timestamp(s).hour for s, _ in client.timeseries.calls] == [10, 11, 10]
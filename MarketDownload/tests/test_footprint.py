@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from pipeline import TradeIndex, footprint
+
+
+def one_bar(volume_by_price):
+    """A single 1-minute bar with one buy per price level"""
+    prices = list(volume_by_price)
+    return pd.DataFrame({
+        'ts_event': pd.Timestamp('2024-01-02 15:00', tz='UTC') + pd.to_timedelta(np.arange(len(prices)), 's'),
+        'price': prices,
+        'size': [volume_by_price[p] for p in prices],
+        'side': 'B',
+    })
+
+
+def test_value_area_grows_outward_from_the_poc():
+    # 51 contracts, 70% is 35.7. From the POC (30 @ 100.50) the neighbours
+    # tie at 1 and both go in (32), then 10 below beats 9 above (42).
+    # Ranking by volume alone would take 30 + 10 and stop at VAH 100.50.
+    df = one_bar({100.00: 10, 100.25: 1, 100.50: 30, 100.75: 1, 101.00: 9})
+    row = footprint(TradeIndex(df)).summary.iloc[0]
+    assert (row['poc'], row['poc_volume']) == (100.50, 30)
+    assert (row['val'], row['vah']) == (100.00, 100.75)
+
+
+def test_value_area_stops_at_the_edge_of_the_bar():
+    df = one_bar({100.00: 30, 100.25: 25, 100.50: 1})
+    row = footprint(TradeIndex(df)).summary.iloc[0]
+    assert (row['poc'], row['val'], row['vah']) == (100.00, 100.00, 100.25)
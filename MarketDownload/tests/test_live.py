@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import (
+    HA_ADX_COLUMNS, HA_EMA_SOURCES, LiveBarEngine, build_bars, compute_indicators, heikin_ashi,
+    normalize_trades, synthetic_trades,
+)
+
+
+@pytest.fixture(scope='module')
+def trades():
+    """About 25 minutes of trades"""
+    return normalize_trades(synthetic_trades(30_000, seed=3, trades_per_second=20.0))
+
+
+def batch_bars(trades):
+    """The batch pipeline: bars, indicators and Heikin Ashi with HA indicators"""
+    bars = build_bars(trades)
+    ha = heikin_ashi(bars)
+    ha_bars = pd.concat([ha, bars[['volume', 'delta']]], axis=1)
+    ha_indicators = compute_indicators(ha_bars, HA_EMA_SOURCES, adx_columns=HA_ADX_COLUMNS,
+                                       adx_prefix='ha_')
+    return pd.concat([bars, compute_indicators(bars), ha, ha_indicators], axis=1)
+
+
+def streamed(rows):
+    return pd.DataFrame(rows).set_index('timestamp')
+
+
+def assert_same_bars(rows, expected):
+    got = streamed(rows)
+    assert len(got) == len(expected)
+    np.testing.assert_array_equal(got.index.asi8, expected.index.asi8)
+    assert set(got.columns) == set(expected.columns)
+    for c in expected.columns:
+        np.testing.assert_array_equal(got[c].to_numpy(dtype=np.float64),
+                                      expected[c].to_numpy(dtype=np.float64), err_msg=c)
+
+
+def test_on_trade_matches_the_batch_pipeline(trades):
+    engine = LiveBarEngine()
+    rows = []
+    for ts, price, size, side in zip(pd.DatetimeIndex(trades['ts_event']).asi8,
+                                     trades['price'].to_numpy(), trades['size'].to_numpy(),
+                                     trades['side'].to_numpy()):
+        rows.extend(engine.on_trade(int(ts), price, size, side))
+    rows.extend(engine.flush())
+    assert engine.late_trades == 0
+    assert_same_bars(rows, batch_bars(trades))
+
+
+def test_on_trades_matches_the_batch_pipeline(trades):
+    engine = LiveBarEngine()
+    rows = []
+    # Uneven micro-batches so bars are split across batches
+    bounds = np.unique(np.r_[0, np.arange(0, len(trades), 997), len(trades)])
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        chunk = trades.iloc[a:b]
+        rows.extend(engine.on_trades(chunk['ts_event'], chunk['price'], chunk['size'], chunk['side']))
+    rows.extend(engine.flush())
+    assert_same_bars(rows, batch_bars(trades))
+
+
+def minute(m, s=0):
+    return pd.Timestamp('2025-07-14T13:30:00Z').value + m * 60_000_000_000 + s * 1_000_000_000
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_late_print_is_counted_in_the_open_bar(batched):
+    engine = LiveBarEngine(heikin_ashi=False)
+    trades = [(minute(0, 5), 100.0, 1, 'B'), (minute(1, 5), 101.0, 2, 'B'),
+              (minute(0, 50), 99.0, 4, 'A'), (minute(2), 102.0, 1, 'B')]
+    if batched:
+        ts, price, size, side = (np.array(v) for v in zip(*trades))
+        rows = engine.on_trades(ts, price, size, side)
+    else:
+        rows = [row for t in trades for row in engine.on_trade(*t)]
+    rows.extend(engine.flush())
+
+    bars = streamed(rows)
+    assert engine.late_trades == 1
+    assert bars.index.tolist() == [pd.Timestamp(minute(m), tz='UTC') for m in range(3)]
+    # The 13:30:50 print lands in the 13:31 bar, which was open when it came
+    late_bar = bars.iloc[1]
+    assert (late_bar['open'], late_bar['high'], late_bar['low'], late_bar['close']) == \
+        (101.0, 101.0, 99.0, 99.0)
+    assert (late_bar['volume'], late_bar['delta'], late_bar['cvd_close']) == (6, -2, -1)
+    assert bars.iloc[0]['volume'] == 1
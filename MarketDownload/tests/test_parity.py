@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.parity import compare_bars, load_bars
+
+
+def bars(minutes, close):
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-02 15:00', tz='UTC') + pd.to_timedelta(minutes, 'min'),
+        'close': np.asarray(close, dtype=np.float64),
+        'volume': np.arange(len(minutes), dtype=np.int64),
+    })
+
+
+def test_identical_files_are_ok():
+    df = bars([0, 1, 2], [1.0, 2.0, 3.0])
+    report = compare_bars(df, df.copy())
+    assert report.ok
+    assert report.first_divergence() is None
+    assert report.as_dict()['duplicates_left'] == 0
+
+
+def test_duplicate_timestamps_fail_the_check():
+    left = bars([0, 1, 1, 2], [1.0, 2.0, 9.0, 3.0])
+    right = bars([0, 1, 2], [1.0, 2.0, 3.0])
+    right['volume'] = [0, 1, 3]
+    report = compare_bars(left, right)
+    assert not report.mismatch.any()
+    assert (report.duplicates_left, report.duplicates_right) == (1, 0)
+    assert not report.ok
+    assert report.as_dict()['duplicates_left'] == 1
+    assert '1 duplicate timestamps in left' in report.summary()
+    # The first row of the duplicated minute is the one kept
+    assert load_bars(left)['close'].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_first_divergence_gives_each_sides_row():
+    # Left has an extra bar up front and is stored out of order
+    left = bars([3, -1, 0, 1, 2], [4.0, 0.0, 1.0, 2.0, 3.0])
+    right = bars([0, 1, 2, 3], [1.0, 2.5, 3.0, 4.0])
+    left['volume'] = right['volume'] = 0
+    first = compare_bars(left, right).first_divergence()
+    assert first['columns'] == ['close']
+    assert (first['left_row'], first['right_row']) == (3, 1)
+    assert (first['left']['close'], first['right']['close']) == (2.0, 2.5)